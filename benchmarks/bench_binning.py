@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the binning of `fed3.metrics`, comparing the integer bin ids
+(reduced with NumPy) against `pandas.Grouper`, which was used for all
+binned metrics before.
+
+A long FED3 log is made by concatenating copies of an example file.  Each
+metric is binned at a few frequencies, and the results are checked to be
+identical.  Run from the repository root:
+
+    python benchmarks/bench_binning.py [n_repeats]
+"""
+
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+import fed3
+from fed3.examples import DATADIR
+from fed3.metrics.core import _binned
+
+SOURCE = f'{DATADIR}/fr1/FED001_061322_03.CSV'
+
+# metrics and the aggregation used when they are binned
+METRICS = {'binary_pellets': 'sum',
+           'cumulative_pokes': 'max',
+           'cumulative_left_percent': 'last',
+           'motor': 'mean',
+           'battery': 'mean'}
+
+BINS = [('15min', 'start_day'), ('1h', 'start'), ('1D', pd.Timestamp('2020-01-01 07:00'))]
+
+def make_long(n_repeats):
+    '''Return a FEDFrame of `n_repeats` copies of `SOURCE`, one after another.'''
+    fed = fed3.load(SOURCE)
+    span = fed.duration + pd.Timedelta('1min')
+    copies = [fed.set_alignment('datetime', inplace=False) for _ in range(n_repeats)]
+    for i, copy in enumerate(copies):
+        copy.index = copy.index + i * span
+    return fed3.concat(copies)
+
+def timeit(func, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main(n_repeats=50):
+    warnings.simplefilter('ignore')
+    data = make_long(n_repeats)
+    print(f'pandas {pd.__version__}; {len(data)} rows')
+
+    for key, agg in METRICS.items():
+        vals = fed3.get_metric(key).func(data)
+        for bins, origin in BINS:
+            grouper = lambda: vals.groupby(pd.Grouper(freq=bins, origin=origin)).agg(agg)
+            kernel = lambda: _binned(vals, bins, origin, agg)
+            t_base, expected = timeit(grouper)
+            t_new, result = timeit(kernel)
+            label = f'{key} ({agg}, {bins})'
+            if result is None:
+                print(f'{label:>42}: {t_base * 1000:7.2f} ms  (uses pandas.Grouper)')
+                continue
+            assert result.equals(expected) and result.dtype == expected.dtype
+            assert result.index.equals(expected.index)
+            print(f'{label:>42}: {t_base * 1000:7.2f} -> {t_new * 1000:6.2f} ms  '
+                  f'({t_base / t_new:.1f}x)')
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
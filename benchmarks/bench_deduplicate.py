@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for `fed3.FEDFrame.deduplicate_index()`, comparing the one-pass
+offset calculation against the previous loop, which shifted every
+duplicate by the offset until the index was unique.
+
+Data with long runs of duplicate timestamps (as in files saved by Excel,
+which drops the seconds) are simulated by rounding the timestamps of a
+long FED3 log to the minute.  Run from the repository root:
+
+    python benchmarks/bench_deduplicate.py [n_repeats]
+"""
+
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import fed3
+from fed3.examples import DATADIR
+
+SOURCE = f'{DATADIR}/fr1/FED001_061322_03.CSV'
+
+def make_duplicated(n_repeats):
+    '''Return a FEDFrame of `n_repeats` copies of `SOURCE`, with
+    timestamps rounded to the minute.'''
+    fed = fed3.load(SOURCE)
+    span = fed.duration + pd.Timedelta('1min')
+    copies = [fed.set_alignment('datetime', inplace=False) for _ in range(n_repeats)]
+    for i, copy in enumerate(copies):
+        copy.index = copy.index + i * span
+    data = fed3.concat(copies)
+    data.index = data.index.floor('min')
+    return data
+
+def legacy_offset(fed, offset='1S'):
+    '''The `'offset'` method used before the one-pass calculation.'''
+    dt = pd.to_timedelta(offset)
+    while fed.check_duplicated_index():
+        fed.index = np.where(fed.index.duplicated(),
+                             fed.index + dt,
+                             fed.index)
+
+def legacy_keep(fed, keep='first'):
+    '''The `'keep_*'` methods used before, via `DataFrame.query()`.'''
+    mask = ~ fed.index.duplicated(keep=keep)
+    fed.query('@mask', inplace=True)
+
+def timeit(func, data, repeats=3, **kwargs):
+    best = float('inf')
+    for _ in range(repeats):
+        fed = data.copy()
+        t0 = time.perf_counter()
+        func(fed, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best, fed
+
+def main(n_repeats=50):
+    warnings.simplefilter('ignore')
+    data = make_duplicated(n_repeats)
+    runs = data.index.value_counts()
+    print(f'pandas {pd.__version__}; {len(data)} rows; '
+          f'longest duplicate run: {runs.max()}')
+
+    # speedups are relative to the last legacy case
+    cases = [('offset (loop)', legacy_offset, {}),
+             ('offset', fed3.FEDFrame.deduplicate_index, {'method': 'offset'}),
+             ('stable_ns', fed3.FEDFrame.deduplicate_index, {'method': 'stable_ns'}),
+             ('keep_first (query)', legacy_keep, {}),
+             ('keep_first', fed3.FEDFrame.deduplicate_index, {'method': 'keep_first'})]
+
+    results = {}
+    base = None
+    for label, func, kwargs in cases:
+        t, fed = timeit(func, data, **kwargs)
+        results[label] = fed
+        if func in [legacy_offset, legacy_keep]:
+            base = t
+        print(f'{label:>20}: {t * 1000:9.1f} ms  ({base / t:.2f}x)')
+
+    assert results['offset'].index.equals(results['offset (loop)'].index)
+    assert results['keep_first'].index.equals(results['keep_first (query)'].index)
+    assert results['stable_ns'].index.is_unique
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for `fed3.load()`, comparing the schema-aware CSV reader against
+the previous approach of letting pandas infer the timestamp format and
+column types, followed by fuzzy matching of every column name.
+
+A long FED3 log is simulated by repeating one of the example files with
+shifted timestamps.  Run from the repository root:
+
+    python benchmarks/bench_load.py [n_repeats]
+"""
+
+from difflib import SequenceMatcher
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+import fed3
+from fed3.core.fedframe import FIXED_COLS, _COLUMN_FIXES
+from fed3.examples import DATADIR
+
+SOURCE = os.path.join(DATADIR, 'fr1', 'FED001_061322_03.CSV')
+INDEX_COL = 'MM:DD:YYYY hh:mm:ss'
+
+def make_long_log(path, n_repeats):
+    '''Write a FED3 CSV made of `n_repeats` copies of `SOURCE`.'''
+    raw = pd.read_csv(SOURCE, dtype=str)
+    times = pd.to_datetime(raw[INDEX_COL], format='%m/%d/%Y %H:%M:%S')
+    span = times.iloc[-1] - times.iloc[0] + pd.Timedelta('1min')
+    copies = []
+    for i in range(n_repeats):
+        copy = raw.copy()
+        shifted = times + i * span
+        copy[INDEX_COL] = [f'{t.month}/{t.day}/{t.year} {t:%H:%M:%S}' for t in shifted]
+        copies.append(copy)
+    pd.concat(copies).to_csv(path, index=False)
+
+def legacy_load(path):
+    '''The loading procedure used before the schema-aware reader.'''
+    data = pd.read_csv(path, parse_dates=True, index_col=INDEX_COL)
+    data = data.dropna(how='all')
+    f = fed3.FEDFrame(data)
+    for col in f.columns:
+        for fix in FIXED_COLS:
+            if SequenceMatcher(a=col, b=fix).ratio() > 0.85:
+                f.rename(columns={col: fix}, inplace=True)
+                break
+    f['Retrieval_Time'] = pd.to_numeric(f['Retrieval_Time'], errors='coerce')
+    return f
+
+def timeit(func, *args, repeats=5, **kwargs):
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main(n_repeats=200):
+    warnings.simplefilter('ignore')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'FED001_long.CSV')
+        make_long_log(path, n_repeats)
+        rows = len(fed3.load(path))
+        print(f'pandas {pd.__version__}; {rows} rows')
+
+        cases = [('legacy', legacy_load, {}),
+                 ('fed3.load', fed3.load, {})]
+        try:
+            import pyarrow # noqa: F401
+            cases.append(('fed3.load (pyarrow)', fed3.load, {'engine': 'pyarrow'}))
+        except ImportError:
+            pass
+
+        base = None
+        for label, func, kwargs in cases:
+            _COLUMN_FIXES.clear()
+            t = timeit(func, path, **kwargs)
+            base = t if base is None else base
+            print(f'{label:>22}: {t * 1000:8.1f} ms  ({base / t:.2f}x)')
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
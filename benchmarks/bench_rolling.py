@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the rolling metrics of `fed3.metrics` (e.g. the pellets in
+the trailing hour, at every event).  `_rolling()` uses the time-based
+`pandas.Series.rolling()`, which moves the edges of the window forward over
+the events (a two-pointer pass).  It is compared against the difference of
+cumulative sums at window edges found by binary search, and against the
+previous workaround of binning finely (one minute) and summing over the bins
+in the window, which is not exact.
+
+A long FED3 log is made by concatenating copies of an example file.  Run
+from the repository root:
+
+    python benchmarks/bench_rolling.py [n_repeats]
+"""
+
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import fed3
+from fed3.examples import DATADIR
+from fed3.metrics.core import _rolling
+
+SOURCE = f'{DATADIR}/fr1/FED001_061322_03.CSV'
+
+WINDOWS = ['10min', '1h', '6h']
+
+def make_long(n_repeats):
+    '''Return a FEDFrame of `n_repeats` copies of `SOURCE`, one after another.'''
+    fed = fed3.load(SOURCE)
+    span = fed.duration + pd.Timedelta('1min')
+    copies = [fed.set_alignment('datetime', inplace=False) for _ in range(n_repeats)]
+    for i, copy in enumerate(copies):
+        copy.index = copy.index + i * span
+    return fed3.concat(copies)
+
+def cumulative_sums(vals, window):
+    '''Rolling sums from the cumulative sums at the window edges.'''
+    times = vals.index.asi8
+    start = np.searchsorted(times, times - pd.Timedelta(window).value, side='right')
+    sums = np.concatenate([[0.], np.cumsum(vals.to_numpy(dtype=np.float64))])
+    out = sums[1:] - sums[start]
+    return pd.Series(out, index=vals.index, name=vals.name)
+
+def fine_bins(vals, window, bins='1min'):
+    '''The previous workaround: sum in fine bins, then over the bins in
+    the window, read back at each event.'''
+    binned = vals.groupby(pd.Grouper(freq=bins)).sum()
+    rolled = binned.rolling(window).sum()
+    return rolled.reindex(vals.index.floor(bins)).set_axis(vals.index)
+
+def timeit(func, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main(n_repeats=50):
+    warnings.simplefilter('ignore')
+    data = make_long(n_repeats)
+    vals = data.pellets(cumulative=False)
+    print(f'pandas {pd.__version__}; {len(data)} rows')
+
+    for window in WINDOWS:
+        t_new, result = timeit(lambda: _rolling(vals, window, 'sum'))
+        t_cumsum, sums = timeit(lambda: cumulative_sums(vals, window))
+        t_fine, approx = timeit(lambda: fine_bins(vals, window))
+        assert sums.equals(result)
+        wrong = int((approx.to_numpy() != result.to_numpy()).sum())
+        print(f'{window:>6}: two pointers {t_new * 1000:6.2f} ms, cumulative sums '
+              f'{t_cumsum * 1000:6.2f} ms, fine bins {t_fine * 1000:7.2f} ms '
+              f'({wrong} of {len(vals)} wrong)')
+
+    # all rolling metrics at once, as for plotting
+    keys = [key for key in fed3.list_metrics() if key.startswith('rolling_')]
+    t, table = timeit(lambda: fed3.compute_metrics(data, keys), repeats=3)
+    print(f'{len(keys)} rolling metrics with compute_metrics(): {t * 1000:.1f} ms '
+          f'({np.prod(table.shape)} values)')
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -17,30 +17,50 @@ del v
 
 #imports for package namespace
 from fed3.core import (FEDFrame,
+                       LazyFEDFrame,
+                       SparseCounts,
                        as_aligned,
                        can_concat,
                        concat,
+                       crop_many,
+                       follow,
+                       iter_load,
                        load,
+                       load_archive,
+                       load_many,
+                       meal_sweep,
                        split,
+                       split_by,
                        timecrop)
 
 from fed3.examples import list_examples, load_examples
 
 from fed3.lightcycle import set_lightcycle
 
-from fed3.metrics import get_metric, list_metrics
+from fed3.metrics import compute_metrics, get_metric, list_metrics, register_metric
 
 __all__ = [
     'FEDFrame',
+    'LazyFEDFrame',
+    'SparseCounts',
     'as_aligned',
     'can_concat',
     'concat',
+    'crop_many',
+    'follow',
+    'iter_load',
     'load',
+    'load_archive',
+    'load_many',
+    'meal_sweep',
     'split',
+    'split_by',
     'timecrop',
     'list_examples',
     'load_examples',
     'set_lightcycle',
+    'compute_metrics',
     'get_metric',
-    'list_metrics'
+    'list_metrics',
+    'register_metric'
     ]
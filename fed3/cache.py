@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of loaded FED3 data.  When enabled, `fed3.core.fedfuncs.load()`
+stores each FEDFrame it creates (after parsing and cleaning), and later loads
+of the same file with the same arguments read the stored copy instead.
+
+The cache is off by default:
+
+```python
+import fed3
+
+fed3.cache.enable()                 # use the default directory
+fed3.load('/some/file.csv')         # parsed & stored
+fed3.load('/some/file.csv')         # read from the cache
+fed3.cache.info()
+fed3.cache.clear()
+```
+
+Entries are keyed by the file path, size, and modification time, and the
+arguments used for loading, so edited files are parsed again.  Data are
+stored as Parquet when pyarrow is installed, or as pickles otherwise.
+When the cache exceeds its maximum size, the least recently used entries
+are removed.
+"""
+
+__all__ = ['clear',
+           'disable',
+           'enable',
+           'info',
+           'CACHE']
+
+import hashlib
+import json
+import os
+import warnings
+
+import pandas as pd
+
+from fed3.core.fedframe import FEDFrame
+
+CACHE = {'enabled': False,
+         'directory': os.path.join(os.path.expanduser('~'), '.fed3', 'cache'),
+         'max_size': 2**30}
+'''Dictionary of cache settings.  `'enabled'` determines whether
+`fed3.core.fedfuncs.load()` uses the cache by default, `'directory'`
+is where entries are stored, and `'max_size'` is the maximum total size of
+the stored data (in bytes).'''
+
+# ---- "Private"
+
+def _cache_key(path, load_args):
+    '''Hash a file's path, size, and modification time along with the
+    arguments used to load it.'''
+    stat = os.stat(path)
+    args = sorted((k, repr(v)) for k, v in load_args.items())
+    ident = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns, args]
+    return hashlib.sha1(json.dumps(ident).encode()).hexdigest()
+
+def _entries(directory):
+    '''Return the data files currently in the cache.'''
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, f) for f in os.listdir(directory)
+            if os.path.splitext(f)[1] in ['.parquet', '.pkl']]
+
+def _evict(directory, max_size):
+    '''Remove least recently used entries until the cache fits `max_size`.
+    Entries are timestamped (via their modification time) when accessed.'''
+    entries = []
+    for file in _entries(directory):
+        try:
+            stat = os.stat(file)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, file))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, file in sorted(entries):
+        if total <= max_size:
+            break
+        _remove_entry(file)
+        total -= size
+
+def _get(path, load_args):
+    '''Return the cached FEDFrame for a file, or None if not cached.'''
+    directory = CACHE['directory']
+    key = _cache_key(path, load_args)
+    meta_file = os.path.join(directory, key + '.json')
+    try:
+        with open(meta_file) as f:
+            meta = json.load(f)
+        data_file = os.path.join(directory, meta['file'])
+        if meta['format'] == 'parquet':
+            data = pd.read_parquet(data_file)
+        else:
+            data = pd.read_pickle(data_file)
+        os.utime(data_file)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    fed = FEDFrame(data)
+    fed.name = meta['name']
+    fed.path = meta['path']
+    fed.foreign_columns = meta['foreign_columns']
+    fed.missing_columns = meta['missing_columns']
+    fed.skipped_columns = meta.get('skipped_columns', [])
+    fed._alignment = meta['alignment']
+    fed._current_offset = pd.Timedelta(meta['current_offset'])
+    fed._lazy_offset = pd.Timedelta(0)
+
+    return fed
+
+def _put(path, load_args, fed):
+    '''Store a FEDFrame in the cache, then evict old entries if needed.'''
+    directory = CACHE['directory']
+    key = _cache_key(path, load_args)
+    data = pd.DataFrame(fed)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        try:
+            fmt, file = 'parquet', key + '.parquet'
+            data.to_parquet(os.path.join(directory, file))
+        except (ImportError, ValueError, TypeError, NotImplementedError):
+            _remove_entry(os.path.join(directory, file))
+            fmt, file = 'pickle', key + '.pkl'
+            data.to_pickle(os.path.join(directory, file))
+
+        meta = {'file': file,
+                'format': fmt,
+                'source': os.path.abspath(path),
+                'name': fed.name,
+                'path': fed.path,
+                'foreign_columns': list(fed.foreign_columns),
+                'missing_columns': list(fed.missing_columns),
+                'skipped_columns': list(fed.skipped_columns),
+                'alignment': fed._alignment,
+                'current_offset': fed._current_offset.value}
+        tmp = os.path.join(directory, f'{key}.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, key + '.json'))
+    except Exception as e:
+        warnings.warn(f'Unable to cache "{path}": {e!r}', RuntimeWarning)
+        return
+
+    _evict(directory, CACHE['max_size'])
+
+def _remove_entry(data_file):
+    '''Delete a data file and its metadata from the cache.'''
+    key = os.path.splitext(data_file)[0]
+    for file in [data_file, key + '.json']:
+        try:
+            os.remove(file)
+        except FileNotFoundError:
+            pass
+
+# ---- Public
+
+def clear():
+    '''
+    Remove all entries from the cache.
+
+    Returns
+    -------
+    None.
+
+    '''
+    for file in _entries(CACHE['directory']):
+        _remove_entry(file)
+
+def disable():
+    '''
+    Stop `fed3.core.fedfuncs.load()` from using the cache by default.
+    Existing entries are kept; see `clear()`.
+
+    Returns
+    -------
+    None.
+
+    '''
+    CACHE['enabled'] = False
+
+def enable(directory=None, max_size=None):
+    '''
+    Make `fed3.core.fedfuncs.load()` use the cache by default.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Folder for storing cached data.  The default is None, in which case
+        the current setting is kept (initially `~/.fed3/cache`).
+    max_size : int, optional
+        Maximum size of the cache, in bytes.  The default is None, in which
+        case the current setting is kept (initially 1 GiB).
+
+    Returns
+    -------
+    None.
+
+    '''
+    CACHE['enabled'] = True
+    if directory is not None:
+        CACHE['directory'] = os.path.abspath(os.path.expanduser(directory))
+    if max_size is not None:
+        CACHE['max_size'] = max_size
+        _evict(CACHE['directory'], max_size)
+
+def info():
+    '''
+    Report the status of the cache.
+
+    Returns
+    -------
+    dict
+        Dictionary with the cache settings (`'enabled'`, `'directory'`,
+        and `'max_size'`), the number of cached files (`'entries'`), and
+        their total size in bytes (`'size'`).
+
+    '''
+    entries = _entries(CACHE['directory'])
+    size = 0
+    for file in entries:
+        try:
+            size += os.path.getsize(file)
+        except FileNotFoundError:
+            pass
+
+    return {'enabled': CACHE['enabled'],
+            'directory': CACHE['directory'],
+            'max_size': CACHE['max_size'],
+            'entries': len(entries),
+            'size': size}
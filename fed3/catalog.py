@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local catalog of FED3 data files, for finding files without loading them.
+`scan()` parses only the header and the first and last rows of each CSV
+file in a folder (the number of rows comes from a scan of the file for line
+breaks, without parsing), and records a summary of each file in a SQLite
+database.
+`query()` then searches these summaries:
+
+```python
+import fed3.catalog
+
+fed3.catalog.scan('/data/cohort1')
+paths = fed3.catalog.query(start='2022-06-01', end='2022-06-08', device=3)
+```
+
+The following are recorded for each file:
+
+- `path`: absolute path of the file
+- `name`: file name, without the extension (as for `fed3.FEDFrame.name`)
+- `device`: the first value of the 'Device_Number' column
+- `start_time`, `end_time`: first and last timestamps
+- `rows`: number of rows of data, i.e. lines with values after the
+timestamp (matching the length of the data from `fed3.load()`)
+- `mode`: FED3 mode, from `fed3.FEDFrame.determine_mode()` applied to the
+first and last rows only.  This matches loading the whole file unless the
+file has no 'Session_Type' column and its FR ratio changes partway through
+with the same ratio at both ends (a full load reports `'PR'`, while the
+catalog reports `'FR<n>'`)
+- `size`, `mtime_ns`: file size and modification time
+- `fingerprint`: hash of the file size and its first and last bytes
+
+Rescanning a folder only reads files whose size or modification time
+has changed, and removes files which no longer exist.
+"""
+
+__all__ = ['query',
+           'scan',
+           'CATALOG']
+
+from collections.abc import Iterable
+import contextlib
+import hashlib
+import os
+import sqlite3
+import warnings
+
+import pandas as pd
+
+from fed3.core.fedfuncs import _peek_fed3_csv
+from fed3.core.fedfuncs import load as _load
+
+CATALOG = {'path': os.path.join(os.path.expanduser('~'), '.fed3', 'catalog.sqlite')}
+'''Dictionary of catalog settings.  `'path'` is the location of the SQLite
+database used when none is given.'''
+
+COLUMNS = ['path', 'name', 'device', 'start_time', 'end_time', 'rows',
+           'mode', 'size', 'mtime_ns', 'fingerprint']
+
+# ---- "Private"
+
+def _connect(db=None):
+    '''Open the catalog database, creating it if needed.'''
+    db = CATALOG['path'] if db is None else db
+    if db != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(db)), exist_ok=True)
+    conn = sqlite3.connect(db)
+    conn.execute('CREATE TABLE IF NOT EXISTS files ('
+                 'path TEXT PRIMARY KEY, name TEXT, device, '
+                 'start_time TEXT, end_time TEXT, rows INTEGER, mode TEXT, '
+                 'size INTEGER, mtime_ns INTEGER, fingerprint TEXT)')
+    conn.execute('CREATE INDEX IF NOT EXISTS files_time ON files (start_time, end_time)')
+    return conn
+
+def _count_rows(path):
+    '''Count the rows of data in a file, skipping the header and lines
+    without any values after the timestamp (which `load()` drops as empty
+    rows).'''
+    with open(path, 'rb') as f:
+        n = sum(1 for line in f if line.partition(b',')[2].strip(b' \t\r\n,'))
+    return max(n - 1, 0)
+
+def _describe(path, stat):
+    '''Return the catalog entry for one file.'''
+    fed = _peek_fed3_csv(path)
+    times = [None, None]
+    if isinstance(fed.index, pd.DatetimeIndex) and len(fed):
+        times = [str(fed.index[0]), str(fed.index[-1])]
+    device = None
+    if 'Device_Number' in fed.columns and len(fed):
+        device = _python(fed['Device_Number'].iloc[0])
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            mode = fed.determine_mode()
+    except Exception:
+        mode = None
+    # the mode is determined from the first and last rows only (see the
+    # module docstring)
+
+    return (os.path.abspath(path), fed.name, device, times[0], times[1],
+            _count_rows(path), mode, stat.st_size, stat.st_mtime_ns,
+            _fingerprint(path, stat.st_size))
+
+def _fingerprint(path, size, n=4096):
+    '''Hash the size and the first and last `n` bytes of a file.'''
+    h = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(n))
+        f.seek(max(0, size - n))
+        h.update(f.read(n))
+    return h.hexdigest()
+
+def _in_list(column, values, clauses, params):
+    '''Add an SQL condition matching one or more values.'''
+    if values is None:
+        return
+    if not isinstance(values, Iterable) or isinstance(values, str):
+        values = [values]
+    values = [_python(v) for v in values]
+    clauses.append(f'{column} IN ({", ".join("?" * len(values))})')
+    params.extend(values)
+
+def _list_files(directory, recursive):
+    '''Return the absolute paths of CSV files in a directory.'''
+    directory = os.path.abspath(directory)
+    if recursive:
+        walk = ((root, files) for root, _, files in os.walk(directory))
+    else:
+        walk = [(directory, os.listdir(directory))]
+    return sorted(os.path.join(root, f) for root, files in walk for f in files
+                  if os.path.splitext(f)[1].lower() == '.csv')
+
+def _python(value):
+    '''Convert numpy scalars to Python objects for SQLite.'''
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+# ---- Public
+
+def query(start=None, end=None, device=None, mode=None, db=None, load=False):
+    '''
+    Find cataloged files matching some criteria.  Files must first be
+    added with `scan()`.
+
+    Parameters
+    ----------
+    start, end : datetime str or object, optional
+        Return files with any data between these times (inclusive).
+        The default is None, in which case files are not filtered by time.
+    device : int or list-like, optional
+        Return files from these device numbers.  The default is None.
+    mode : str or list-like, optional
+        Return files recorded in these modes (see
+        `fed3.FEDFrame.determine_mode()`; the recorded mode is determined
+        from the first and last rows of each file).  The default is None.
+    db : str, optional
+        Path to the catalog database.  The default is None, in which
+        case `CATALOG['path']` is used.
+    load : bool, optional
+        When True, return the loaded data rather than file paths.
+        The default is False.
+
+    Returns
+    -------
+    list or generator
+        Paths of the matching files, ordered by start time.  With `load=True`,
+        a generator which loads each file (with `fed3.core.fedfuncs.load()`)
+        as it is iterated.
+
+    '''
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append('end_time >= ?')
+        params.append(str(pd.Timestamp(start)))
+    if end is not None:
+        clauses.append('start_time <= ?')
+        params.append(str(pd.Timestamp(end)))
+    _in_list('device', device, clauses, params)
+    _in_list('mode', mode, clauses, params)
+
+    sql = 'SELECT path FROM files'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    sql += ' ORDER BY start_time, path'
+    with contextlib.closing(_connect(db)) as conn:
+        paths = [row[0] for row in conn.execute(sql, params)]
+
+    if load:
+        return (_load(path) for path in paths)
+    return paths
+
+def scan(directory, db=None, recursive=False):
+    '''
+    Add the CSV files in a folder to the catalog, or update them.  Only
+    the header, first row, and last row of each file are parsed; the rows
+    are counted from a full scan of the file for line breaks.  Files
+    already in the catalog are skipped unless their size or modification time
+    has changed, and files which no longer exist are removed.
+
+    Parameters
+    ----------
+    directory : str
+        Folder containing FED3 CSV files.
+    db : str, optional
+        Path to the catalog database.  The default is None, in which
+        case `CATALOG['path']` is used.
+    recursive : bool, optional
+        Also scan subfolders. The default is False.
+
+    Returns
+    -------
+    entries : pandas.DataFrame
+        The catalog entries for the files in `directory`, indexed by path.
+
+    '''
+    directory = os.path.abspath(directory)
+    files = _list_files(directory, recursive)
+    with contextlib.closing(_connect(db)) as conn, conn:
+        prefix = os.path.join(directory, '')
+        known = {path: (size, mtime) for path, size, mtime in
+                 conn.execute('SELECT path, size, mtime_ns FROM files '
+                              'WHERE substr(path, 1, ?) = ?',
+                              (len(prefix), prefix))}
+        for path in files:
+            stat = os.stat(path)
+            if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            try:
+                entry = _describe(path, stat)
+            except Exception as e:
+                warnings.warn(f'Unable to scan "{path}": {e!r}', RuntimeWarning)
+                continue
+            conn.execute(f'INSERT OR REPLACE INTO files ({", ".join(COLUMNS)}) '
+                         f'VALUES ({", ".join("?" * len(COLUMNS))})', entry)
+
+        current = set(files)
+        for path in known:
+            in_scope = recursive or os.path.dirname(path) == directory
+            if in_scope and path not in current:
+                conn.execute('DELETE FROM files WHERE path = ?', (path,))
+
+        entries = pd.read_sql_query(f'SELECT {", ".join(COLUMNS)} FROM files '
+                                    'WHERE substr(path, 1, ?) = ? ORDER BY path',
+                                    conn, params=(len(prefix), prefix))
+
+    if not recursive:
+        entries = entries[entries['path'].map(os.path.dirname) == directory]
+    return entries.set_index('path')
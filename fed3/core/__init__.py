@@ -7,17 +7,37 @@ Other functions are defined for manipulating FEDFrames.'''
 
 from .fedframe import FEDFrame
 
+from .lazy import LazyFEDFrame
+
+from .sparse import SparseCounts
+
 from .fedfuncs import (as_aligned,
                        can_concat,
                        concat,
+                       crop_many,
                        load,
+                       load_archive,
+                       load_many,
+                       meal_sweep,
                        split,
+                       split_by,
                        timecrop)
 
+from .stream import follow, iter_load
+
 __all__ = ['FEDFrame',
+           'LazyFEDFrame',
+           'SparseCounts',
            'as_aligned',
            'can_concat',
            'concat',
+           'crop_many',
+           'follow',
+           'iter_load',
            'load',
+           'load_archive',
+           'load_many',
+           'meal_sweep',
            'split',
+           'split_by',
            'timecrop']
@@ -6,17 +6,24 @@ to FED3 data, defining additional attributes and methods for FED3-specific
 operations.
 """
 
-__all__ = ['FEDFrame']
+__all__ = ['FEDFrame',
+           'EventTable',
+           'EVENT_CODES',
+           'EVENT_FLAGS']
 
 __pdoc__ = {'FEDFrame._load_init':True,
             'FEDFrame.ipi':False}
 
+from collections import namedtuple
 from difflib import SequenceMatcher
+import functools
 import warnings
 
 import numpy as np
 import pandas as pd
 
+from fed3.lightcycle import LIGHTCYCLE, is_at_night
+
 
 FIXED_COLS = ['Device_Number',
               'Battery_Voltage',
@@ -35,6 +42,75 @@ NEEDED_COLS = ['Pellet_Count',
 
 ZERO_DATE = pd.Timestamp(year=2000, month=1, day=1)
 
+FLOAT32_COLS = ['Battery_Voltage',
+                'Retrieval_Time']
+'''Columns stored as 32-bit floats by `FEDFrame.compact()`.'''
+
+EVENT_CODES = (np.nan, 'Pellet', 'Left', 'Right')
+'''Event labels for the codes of `FEDFrame.decode_events()` (0 for rows
+which are neither pellets nor pokes).'''
+
+EVENT_FLAGS = {'pellet': 1, 'left': 2, 'right': 4, 'correct': 8, 'error': 16}
+'''Bits used to flag each type of event in `FEDFrame.decode_events()`.'''
+
+EventTable = namedtuple('EventTable', ['time', 'code', 'flags', 'exact'])
+'''Columnar summary of the events in a FEDFrame, returned by
+`FEDFrame.decode_events()`.'''
+
+_COLUMN_FIXES = {}
+
+def _column_fixes(columns):
+    '''Return a `(renames, foreign)` tuple for a FED3 header, where `renames`
+    maps misnamed columns to their name in `FIXED_COLS` and `foreign` lists
+    the columns not matching any of `FIXED_COLS`.  Results are cached by
+    header, so the fuzzy matching only runs for headers not seen before.'''
+    columns = tuple(columns)
+    if columns in _COLUMN_FIXES:
+        return _COLUMN_FIXES[columns]
+
+    renames = {}
+    foreign = []
+    for col in columns:
+        if col in FIXED_COLS:
+            continue
+        for fix in FIXED_COLS:
+            likeness = SequenceMatcher(a=col, b=fix).ratio()
+            if likeness > 0.85:
+                renames[col] = fix
+                break
+        else:
+            foreign.append(col)
+
+    _COLUMN_FIXES[columns] = (renames, foreign)
+    return renames, foreign
+
+def _compact_dtype(series, name):
+    '''Return a smaller data type for a column (see `FEDFrame.compact()`),
+    or None if the column should not be changed.'''
+    dtype = series.dtype
+    if name in FLOAT32_COLS and (pd.api.types.is_float_dtype(dtype) or
+                                 pd.api.types.is_integer_dtype(dtype)):
+        return None if dtype == np.float32 else np.dtype(np.float32)
+
+    if pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+        if series.empty:
+            return None
+        lo, hi = series.min(), series.max()
+        for small in (np.int8, np.int16, np.int32):
+            info = np.iinfo(small)
+            if info.min <= lo and hi <= info.max:
+                return None if dtype.itemsize <= info.bits // 8 else np.dtype(small)
+        return None
+
+    if dtype == object and len(series):
+        values = series.dropna()
+        if not all(isinstance(v, str) for v in values.unique()):
+            return None
+        if values.nunique() <= len(series) // 2:
+            return 'category'
+
+    return None
+
 def _filterout(series, dropna=False, dropzero=False, deduplicate=False):
     """Helper func for condensing series returned from FEDFrame methods."""
 
@@ -47,6 +123,107 @@ def _filterout(series, dropna=False, dropzero=False, deduplicate=False):
 
     return series
 
+def _count_flags(values, first):
+    '''Flag the rows where a cumulative count increases, for
+    `FEDFrame.decode_events()`.  `first` is the flag for the first row.
+    Returns the flags and whether the count only ever steps by 0 or 1.'''
+    values = np.asarray(values, dtype=np.float64)
+    flags = np.zeros(len(values), dtype=bool)
+    if not len(values):
+        return flags, True
+    step = np.diff(values)
+    flags[1:] = step > 0
+    flags[0] = first
+    exact = bool(((step == 0) | (step == 1)).all())
+    return flags, exact
+
+def _interpellet_minutes(times, segments=None):
+    '''Return the interpellet intervals (in minutes) for pellet timestamps
+    given as int64 nanoseconds.  The first interval, and the first interval
+    of each segment (e.g. the 'Concat_#' of each pellet), are NaN.'''
+    times = np.asarray(times, dtype=np.int64)
+    minutes = np.full(len(times), np.nan)
+    if len(times) > 1:
+        # same arithmetic as pandas Timedelta.total_seconds() / 60
+        minutes[1:] = (np.diff(times) / 1_000_000_000) / 60
+    if segments is not None and len(times) > 1:
+        codes = pd.factorize(segments)[0]
+        minutes[1:][codes[1:] != codes[:-1]] = np.nan
+    return minutes
+
+def _meal_bounds(ipi, intermeal_interval):
+    '''Return the positions of the first and last pellet of each meal, given
+    the condensed interpellet intervals used by `FEDFrame.meals()` (before
+    `pellet_minimum` is applied).'''
+    ipi = np.asarray(ipi, dtype=np.float64)
+    if not len(ipi):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    new = ~(ipi < intermeal_interval)
+    new[0] = True
+    starts = np.flatnonzero(new)
+    ends = np.append(starts[1:], len(ipi)) - 1
+    return starts, ends
+
+def _offset_duplicates(index, offset):
+    '''Shift duplicated timestamps by `offset` until the index is unique,
+    as for `FEDFrame.deduplicate_index(method='offset')`.  Each pass of
+    this process shifts every timestamp which equals an earlier one, so
+    each ends at the first free step (of `offset`) at or after its value,
+    with earlier rows claiming steps first.  For sorted datetimes this is
+    computed in one pass; otherwise, the passes are run in a loop.
+    Returns the index unchanged when there are no duplicates.'''
+    if not index.duplicated().any():
+        return index
+    offset = pd.to_timedelta(offset)
+
+    vectorize = (isinstance(index, pd.DatetimeIndex)
+                 and index.dtype == 'datetime64[ns]'
+                 and index.is_monotonic_increasing
+                 and not index.hasnans
+                 and offset > pd.Timedelta(0))
+    if not vectorize:
+        while index.duplicated().any():
+            index = pd.DatetimeIndex(np.where(index.duplicated(),
+                                              index + offset,
+                                              index))
+        return index
+
+    # only timestamps an exact number of offsets apart can collide, so
+    # rows are grouped by their remainder; within each group, the n-th row
+    # is placed at max(own step, step of the previous row + 1)
+    steps, rem = np.divmod(index.asi8, offset.value)
+    if (rem == rem[0]).all():
+        k = np.arange(len(steps))
+        placed = np.maximum.accumulate(steps - k) + k
+    else:
+        groups = pd.Series(rem)
+        k = groups.groupby(rem).cumcount().to_numpy()
+        placed = pd.Series(steps - k).groupby(rem).cummax().to_numpy() + k
+    values = placed * offset.value + rem
+    return pd.DatetimeIndex(values.view('datetime64[ns]'))
+
+def _cached_signal(method):
+    '''Decorator for FEDFrame methods which compute signals from the data
+    (e.g. binary pellets), storing the results in the signal cache of the
+    FEDFrame (see `FEDFrame.signal_cache_info()`).  Results are keyed by
+    the method, its arguments, and `FEDFrame.LR_POKE_METHOD`; copies are
+    returned so that callers cannot modify the cached values.'''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self._signal_cache()
+        key = (method.__name__, args, tuple(sorted(kwargs.items())),
+               self.LR_POKE_METHOD)
+        try:
+            value = cache[key]
+            self._signal_stats['hits'] += 1
+        except KeyError:
+            value = method(self, *args, **kwargs)
+            cache[key] = value
+            self._signal_stats['misses'] += 1
+        return value.copy() if isinstance(value, (pd.Series, pd.DataFrame)) else value
+    return wrapper
+
 class FEDFrame(pd.DataFrame):
     '''The main object interface for FED3 data in the fed3 library.  Provides
     a 2D table for storing FED3 data.
@@ -75,7 +252,10 @@ class FEDFrame(pd.DataFrame):
 
     # ---- Class variables
     _metadata = ['name', 'path', 'foreign_columns', 'missing_columns',
-                 '_alignment', '_current_offset']
+                 'skipped_columns', '_alignment', '_current_offset', '_lazy_offset']
+
+    _internal_names = pd.DataFrame._internal_names + ['_signals', '_signal_stats']
+    _internal_names_set = set(_internal_names)
 
     LR_POKE_METHOD_OPTIONS = ('from_columns', 'from_events')
     LR_POKE_METHOD = 'from_columns'
@@ -98,7 +278,7 @@ class FEDFrame(pd.DataFrame):
     @property
     def end_time(self):
         """Last timestamp in file."""
-        return pd.Timestamp(self.index.values[-1])
+        return self._aligned(pd.Timestamp(self.index.values[-1]))
 
     @property
     def events(self):
@@ -113,11 +293,46 @@ class FEDFrame(pd.DataFrame):
     @property
     def start_time(self):
         '''First timestamp in file.'''
-        return pd.Timestamp(self.index.values[0])
+        return self._aligned(pd.Timestamp(self.index.values[0]))
 
     # ---- "Private"
 
+    def __getitem__(self, key):
+        try:
+            return super().__getitem__(key)
+        except KeyError:
+            if isinstance(key, str):
+                self._require(key)
+            raise
+
+    def _aligned(self, times):
+        '''Apply the offset of a lazy alignment (see `set_alignment()`) to
+        timestamps read from the index.'''
+        offset = getattr(self, '_lazy_offset', None)
+        return times + offset if offset else times
+
+    def _applied_alignment(self):
+        '''Return the data with the offset of a lazy alignment applied to the
+        index (as a shallow copy), or the data itself when there is none.'''
+        if not getattr(self, '_lazy_offset', None):
+            return self
+        newfed = self.copy(deep=False)
+        newfed.index = self._aligned(self.index)
+        newfed._lazy_offset = pd.Timedelta(0)
+        return newfed
+
+    def _clear_item_cache(self):
+        # pandas calls this whenever the data or index are modified
+        super()._clear_item_cache()
+        if getattr(self, '_signals', None):
+            self._signals = {}
+
+    @_cached_signal
     def _binary_correct_pokes(self):
+        decoded = self._decoded_flags('correct')
+        if decoded is not None:
+            return decoded
+
         l = self._binary_pokes('left')
         r = self._binary_pokes('right')
         active_l = self['Active_Poke'] == 'Left'
@@ -126,7 +341,12 @@ class FEDFrame(pd.DataFrame):
 
         return correct
 
+    @_cached_signal
     def _binary_error_pokes(self):
+        decoded = self._decoded_flags('error')
+        if decoded is not None:
+            return decoded
+
         l = self._binary_pokes('left')
         r = self._binary_pokes('right')
         active_l = self['Active_Poke'] == 'Left'
@@ -135,20 +355,32 @@ class FEDFrame(pd.DataFrame):
 
         return error
 
+    @_cached_signal
     def _binary_pellets(self):
+        decoded = self._decoded_flags('pellet', 'Pellet_Count')
+        if decoded is not None:
+            return decoded
+
         bp = self['Pellet_Count'].diff().copy()
         if not bp.empty:
             bp.iloc[0] = int(self._first_event_type() == 'pellet')
 
         return bp
 
+    @_cached_signal
     def _binary_poke_for_side(self, side):
         if self.LR_POKE_METHOD == 'from_columns':
             col = {'left': 'Left_Poke_Count', 'right': 'Right_Poke_Count'}[side]
+            decoded = self._decoded_flags(side, col)
+            if decoded is not None:
+                return decoded
             bp = self[col].diff().copy()
             if not bp.empty:
                 bp.iloc[0] = int(self._first_event_type() == side)
         elif self.LR_POKE_METHOD == 'from_events':
+            decoded = self._decoded_flags(side, 'Event')
+            if decoded is not None:
+                return decoded
             search = {'left': self.L_POKE_EVENTS, 'right': self.R_POKE_EVENTS}[side]
             bp = self['Event'].isin(search).astype(int)
         else:
@@ -177,6 +409,7 @@ class FEDFrame(pd.DataFrame):
 
         return bp
 
+    @_cached_signal
     def _cumulative_poke_for_side(self, side):
         if self.LR_POKE_METHOD == 'from_columns':
             col = {'left': 'Left_Poke_Count', 'right': 'Right_Poke_Count'}[side]
@@ -198,9 +431,9 @@ class FEDFrame(pd.DataFrame):
             raise ValueError(f'`kind` must be one of  {kinds}, not {kind}')
 
         if kind == 'any':
-            l = self._cumulative_poke_for_side('left')
-            r = self._cumulative_poke_for_side('right')
-            cp = (l + r).astype(int)
+            l = self._cumulative_poke_for_side('left').astype(int)
+            r = self._cumulative_poke_for_side('right').astype(int)
+            cp = l + r
 
         elif kind in ['left', 'right']:
             cp = self._cumulative_poke_for_side(kind).astype(int)
@@ -211,15 +444,43 @@ class FEDFrame(pd.DataFrame):
 
         return cp
 
+    def _compact_dtypes(self):
+        '''Return a dictionary of columns to convert with `compact()`,
+        mapping each to its new data type.'''
+        dtypes = {}
+        for col in self.columns:
+            dtype = _compact_dtype(self[col], col)
+            if dtype is not None:
+                dtypes[col] = dtype
+        return dtypes
+
+    @_cached_signal
+    def _decoded_flags(self, kind, column=None):
+        '''Return the binary signal for one kind of event from
+        `decode_events()`, typed and named as the pandas computation of the
+        signal would be.  Returns None if the decoded flags do not match that
+        computation exactly (e.g. counts which are reset within the data).'''
+        table = self.decode_events()
+        bit = EVENT_FLAGS[kind]
+        if not table.exact & bit:
+            return None
+        values = (table.flags & bit) != 0
+        if column is None:
+            return pd.Series(values.astype(int), index=self.index)
+        elif column == 'Event':
+            return pd.Series(values.astype(int), index=self.index, name=column)
+        dtype = self[column].iloc[:0].diff().dtype
+        return pd.Series(values.astype(dtype), index=self.index, name=column)
+
     def _first_event_type(self):
         '''
         Get the type of event for the first entry.  Special case implementation
         of `event_type()`.  Returns either "pellet", "left", "right", or "unknown".
         '''
-        ts = self.index[0]
-        left = self.loc[ts, 'Left_Poke_Count'] == 1
-        right = self.loc[ts, 'Right_Poke_Count'] == 1
-        pellet = self.loc[ts, 'Pellet_Count'] == 1
+        self._require('Left_Poke_Count', 'Right_Poke_Count', 'Pellet_Count')
+        left = self['Left_Poke_Count'].iloc[0] == 1
+        right = self['Right_Poke_Count'].iloc[0] == 1
+        pellet = self['Pellet_Count'].iloc[0] == 1
 
         if sum([left, right, pellet]) != 1:
             return 'unknown'
@@ -237,20 +498,18 @@ class FEDFrame(pd.DataFrame):
         None.
 
         '''
-        self.foreign_columns = []
-        for col in self.columns:
-            for fix in FIXED_COLS:
-                likeness = SequenceMatcher(a=col, b=fix).ratio()
-                if likeness > 0.85:
-                    self.rename(columns={col:fix}, inplace=True)
-                    break
-                self.foreign_columns.append(col)
+        renames, foreign = _column_fixes(self.columns)
+        if renames:
+            self.rename(columns=renames, inplace=True)
+        self.foreign_columns = list(foreign)
         self.missing_columns = [col for col in NEEDED_COLS if
                                 col not in self.columns]
 
     def _handle_retrieval_time(self):
         if 'Retrieval_Time' not in self.columns:
             return
+        if pd.api.types.is_numeric_dtype(self['Retrieval_Time']):
+            return
         self['Retrieval_Time'] = pd.to_numeric(self['Retrieval_Time'], errors='coerce')
 
 
@@ -295,10 +554,12 @@ class FEDFrame(pd.DataFrame):
         '''
         self.name = name
         self.path = path
+        self.skipped_columns = []
         self._fix_column_names()
         self._handle_retrieval_time()
         self._alignment = 'datetime'
         self._current_offset = pd.Timedelta(0)
+        self._lazy_offset = pd.Timedelta(0)
         if deduplicate_index is not None:
             self.deduplicate_index(method=deduplicate_index,
                                    offset=offset,
@@ -309,8 +570,145 @@ class FEDFrame(pd.DataFrame):
                           "fed3 operations.  Use the deuplicate_index() method "
                           "to remove duplicate timestamps.", RuntimeWarning)
 
+    @_cached_signal
+    def _mode_runs(self):
+        '''Run-length encoding of the mode and FR ratio of each row, for
+        `mode_segments()`.  Returns the position where each run starts, with
+        its mode and ratio (as read-only arrays).'''
+        n = len(self)
+        ratio_col = mode_col = None
+        for col in ['FR', 'FR_Ratio', ' FR_Ratio']:
+            if col in self.columns:
+                ratio_col = col
+        for col in ['Mode', 'Session_Type']:
+            if col in self.columns:
+                mode_col = col
+
+        ratio = np.full(n, np.nan)
+        if ratio_col is not None:
+            ratio = pd.to_numeric(self[ratio_col], errors='coerce').to_numpy(dtype=np.float64)
+        ratio_codes = pd.factorize(ratio)[0]
+        if mode_col is not None:
+            codes, uniques = pd.factorize(self[mode_col])
+        else:
+            codes, uniques = ratio_codes, []
+
+        changes = np.flatnonzero((codes[1:] != codes[:-1]) |
+                                 (ratio_codes[1:] != ratio_codes[:-1])) + 1
+        starts = np.concatenate([[0], changes]).astype(np.int64) if n else np.zeros(0, dtype=np.int64)
+
+        ratios = ratio[starts]
+        if mode_col is not None:
+            labels = np.array([str(u) for u in uniques] + ['Unknown'], dtype=object)
+            modes = labels[codes[starts]]
+        else:
+            modes = np.array(['Unknown' if np.isnan(r) else f'FR{r:g}' for r in ratios],
+                             dtype=object)
+
+        for array in (starts, modes, ratios):
+            array.setflags(write=False)
+        return starts, modes, ratios
+
+    def _signal_cache(self):
+        '''Return the dictionary of cached signals, creating it if needed.'''
+        if getattr(self, '_signals', None) is None:
+            self._signals = {}
+            self._signal_stats = {'hits': 0, 'misses': 0}
+        return self._signals
+
+    def _require(self, *columns):
+        '''Raise a KeyError if any of `columns` were skipped when loading
+        the data (see the `columns` argument of `fed3.core.load()`).'''
+        skipped = [col for col in columns
+                   if col in getattr(self, 'skipped_columns', ())]
+        if skipped:
+            name = getattr(self, 'name', None)
+            raise KeyError(f'Column(s) {skipped} were not loaded for "{name}" '
+                           f'(skipped with the `columns` or `metrics` arguments '
+                           f'of fed3.load()).  Load the data again including '
+                           f'them.')
+
     # ---- Public
 
+    def append_segment(self, other,
+                       reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+                       add_concat_number=True):
+        '''
+        Add data recorded after the end of this FEDFrame, as with
+        `fed3.core.concat()`.  Cumulative counts and the 'Concat_#' column
+        continue from the last segment of this data, so data from a device
+        can be extended one file at a time with the same result as
+        concatenating all of the files at once.
+
+        Parameters
+        ----------
+        other : fed3.FEDFrame
+            FED3 data to add; must start after this data ends.
+        reset_columns : list-like, optional
+            Columns whose counts should be continued from this data.
+            The default is ('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count').
+        add_concat_number : bool, optional
+            Number the new data in the 'Concat_#' column. The default is True.
+
+        Raises
+        ------
+        ValueError
+            The new data do not start after this data.
+
+        Returns
+        -------
+        newfed : fed3.FEDFrame
+            New FEDFrame with the data added.
+
+        '''
+        from fed3.core.fedfuncs import _stitch_segments, concat
+
+        if self.empty:
+            return concat([other], name=self.name, add_concat_number=add_concat_number,
+                          reset_columns=reset_columns)
+        if not other.empty and other.start_time <= self.end_time:
+            raise ValueError('FEDFrame dates overlap, cannot append.')
+
+        head = self._applied_alignment()
+        tail = other._applied_alignment()
+
+        # the last segment of this data, which the new data continue from
+        last = np.ones(len(head), dtype=bool)
+        number = 0
+        if 'Concat_#' in head.columns:
+            concat_numbers = head['Concat_#'].to_numpy()
+            number = concat_numbers[-1]
+            last = concat_numbers == number
+        numbers = None
+        if add_concat_number:
+            numbers = [None if 'Concat_#' in head.columns else 0, number + 1]
+
+        offsets = {}
+        for col in reset_columns:
+            if col in head.columns:
+                offsets[col] = [0, head[col][last].max()]
+        newfed = None
+        if all(col in tail.columns and not pd.isna(offset[1])
+               for col, offset in offsets.items()):
+            newfed = _stitch_segments([head, tail], offsets, numbers)
+        if newfed is None:
+            tail = tail.copy()
+            if add_concat_number:
+                tail['Concat_#'] = numbers[1]
+            for col, offset in offsets.items():
+                if pd.api.types.is_integer_dtype(tail[col]):
+                    tail[col] = tail[col].astype(np.int64)
+                tail[col] += offset[1]
+            if add_concat_number and 'Concat_#' not in head.columns:
+                head = head.copy()
+                head['Concat_#'] = 0
+            newfed = pd.concat([head, tail])
+
+        newfed._load_init(name=self.name)
+        skipped = [col for fed in [self, other] for col in getattr(fed, 'skipped_columns', ())]
+        newfed.skipped_columns = list(dict.fromkeys(skipped))
+        return newfed
+
     def check_duplicated_index(self):
         '''
         Checks if the data has duplicated timestamps.
@@ -323,6 +721,153 @@ class FEDFrame(pd.DataFrame):
         '''
         return self.index.duplicated().any()
 
+    def clear_signal_cache(self):
+        '''
+        Remove the signals (e.g. binary pellets and pokes) cached for
+        this FEDFrame, and reset the hit and miss counts.  The cache is
+        already cleared automatically when the data are modified through
+        pandas (e.g. setting columns or the index), so this is only needed
+        after modifying the underlying arrays directly.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._signals = {}
+        self._signal_stats = {'hits': 0, 'misses': 0}
+
+    def compact(self, inplace=True):
+        '''
+        Convert columns to smaller data types, to reduce memory usage.
+        This is also available when loading data, with
+        `fed3.core.load(..., compact=True)`.
+
+        - Integer columns (e.g. counts) are stored with the smallest signed
+        integer type which can hold their values.
+        - Text columns which repeat a limited set of values (e.g.
+        'Event', 'Active_Poke', and 'Session_Type') are stored as pandas
+        categoricals.
+        - Columns listed in `FLOAT32_COLS` ('Battery_Voltage' and
+        'Retrieval_Time') are stored as 32-bit floats.
+
+        Other columns are not changed.  Use `memory_report()` to see the
+        effect on each column.
+
+        Note that adding to compacted columns may overflow their types;
+        convert them back (e.g. with `astype(int)`) before doing so.
+
+        Parameters
+        ----------
+        inplace : bool, optional
+            When True (default), the current FEDFrame is modified.  Else, a
+            copy is returned with the new data types.
+
+        Returns
+        -------
+        newfed : fed3.FEDFrame
+            FED3 data with compacted columns.
+
+        '''
+        dtypes = self._compact_dtypes()
+        newfed = self if inplace else self.copy()
+        for col, dtype in dtypes.items():
+            newfed[col] = newfed[col].astype(dtype)
+
+        return newfed
+
+    @_cached_signal
+    def decode_events(self):
+        '''
+        Decode the pellet and poke events of the data in one pass.  Pellets
+        and left/right pokes are found from increases of the
+        'Pellet_Count', 'Left_Poke_Count', and 'Right_Poke_Count' columns
+        (or the 'Event' column for pokes, when `LR_POKE_METHOD` is
+        `'from_events'`), and correct/error pokes from the 'Active_Poke'
+        column.  The first row is labeled with `_first_event_type()`.
+
+        This is used by `pellets()`, `pokes()`, and `reassign_events()`,
+        and thus most of `fed3.metrics`.  The result is cached until the
+        data are modified.
+
+        Returns
+        -------
+        fed3.core.fedframe.EventTable
+            Named tuple of read-only NumPy arrays, with one value per row:
+
+            - `time`: timestamps as int64 nanoseconds (None when the index
+            is not datetime)
+            - `code`: uint8 code for the type of each event, which indexes
+            `EVENT_CODES` (a pellet, left poke, or right poke; a poke is used
+            when a row has more than one event)
+            - `flags`: uint8 bit flags for each event type (see `EVENT_FLAGS`)
+
+            `exact` is an int of the `EVENT_FLAGS` bits which match the
+            count columns exactly; bits are not set if needed columns are
+            missing, or if counts change by anything other than 0 or 1
+            (e.g. when counts are reset).  In these cases the flags only
+            mark increases, and the methods above use pandas instead.
+
+        '''
+        n = len(self)
+        exact = 0
+        flags = np.zeros(n, dtype=np.uint8)
+        counts = ['Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count']
+
+        first = 'unknown'
+        counts_ok = all(col in self.columns for col in counts)
+        if counts_ok and n:
+            try:
+                first = self._first_event_type()
+            except (ValueError, TypeError):
+                # e.g. a missing (pd.NA) count in the first row of a
+                # nullable integer column
+                counts_ok = False
+
+        sides = {}
+        for kind, col in zip(['pellet', 'left', 'right'], counts):
+            if kind != 'pellet' and self.LR_POKE_METHOD == 'from_events':
+                if 'Event' not in self.columns:
+                    continue
+                search = {'left': self.L_POKE_EVENTS, 'right': self.R_POKE_EVENTS}[kind]
+                values = self['Event'].isin(search).to_numpy()
+                ok = True
+            elif col in self.columns and pd.api.types.is_numeric_dtype(self[col]):
+                values, ok = _count_flags(self[col].to_numpy(), first == kind)
+                ok = ok and counts_ok
+            else:
+                continue
+            sides[kind] = values
+            flags |= values.astype(np.uint8) * np.uint8(EVENT_FLAGS[kind])
+            if ok:
+                exact |= EVENT_FLAGS[kind]
+
+        if 'Active_Poke' in self.columns and 'left' in sides and 'right' in sides:
+            active = self['Active_Poke'].to_numpy(dtype=object)
+            active_l = active == 'Left'
+            active_r = active == 'Right'
+            left, right = sides['left'], sides['right']
+            correct = (left & active_l) | (right & active_r)
+            error = (left & active_r) | (right & active_l)
+            flags |= correct.astype(np.uint8) * np.uint8(EVENT_FLAGS['correct'])
+            flags |= error.astype(np.uint8) * np.uint8(EVENT_FLAGS['error'])
+            both = EVENT_FLAGS['left'] | EVENT_FLAGS['right']
+            if exact & both == both:
+                exact |= EVENT_FLAGS['correct'] | EVENT_FLAGS['error']
+
+        code = np.zeros(n, dtype=np.uint8)
+        for i, kind in enumerate(['pellet', 'left', 'right'], start=1):
+            code[(flags & EVENT_FLAGS[kind]) != 0] = i
+
+        time = None
+        if isinstance(self.index, pd.DatetimeIndex):
+            time = self.index.values.astype('datetime64[ns]').view(np.int64)
+            time.setflags(write=False)
+        code.setflags(write=False)
+        flags.setflags(write=False)
+
+        return EventTable(time=time, code=code, flags=flags, exact=exact)
+
     def deduplicate_index(self, method='keep_first', offset='1S',
                           reset_counts=False,
                           reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count')):
@@ -362,11 +907,15 @@ class FEDFrame(pd.DataFrame):
             - `'remove'`: delete any rows with duplicate timestamps
             - `'offset'`: add a small time offset to each date - does so
             iteratively until the index is not duplicated.
+            - `'stable_ns'`: like `'offset'`, but with an offset of one
+            nanosecond, which makes the index unique while keeping the
+            timestamps (and their order) practically unchanged
             - `'interpolate'`: offset duplicates such that they are spaced
             evenly between their value and the next timestamp in the series
 
-            Note that `'interpolate'` and `'offset'` should preserve the
-            length of the FEDFrame, while other options can reduce it.
+            Note that `'interpolate'`, `'offset'`, and `'stable_ns'` should
+            preserve the length of the FEDFrame, while other options can
+            reduce it.
 
         offset : str, optional
             Pandas time offset string, only used when `method='offset'`.
@@ -389,25 +938,21 @@ class FEDFrame(pd.DataFrame):
 
         '''
 
-        if method not in ['keep_first', 'keep_last', 'remove',
-                             'offset', 'interpolate']:
-            raise ValueError(f'`method` must be one of {method}, not "{method}"')
-
-        if method == 'keep_first':
-            mask = ~ self.index.duplicated(keep='first')
-            self.query('@mask', inplace=True)
-        elif method == 'keep_last':
-            mask = ~ self.index.duplicated(keep='last')
-            self.query('@mask', inplace=True)
-        elif method == 'remove':
-            mask = ~ self.index.duplicated(keep=False)
-            self.query('@mask', inplace=True)
-        elif method == 'offset':
-            dt = pd.to_timedelta(offset)
-            while self.check_duplicated_index():
-                self.index = np.where(self.index.duplicated(),
-                                      self.index + dt,
-                                      self.index)
+        methods = ['keep_first', 'keep_last', 'remove', 'offset', 'stable_ns',
+                   'interpolate']
+        if method not in methods:
+            raise ValueError(f'`method` must be one of {methods}, not "{method}"')
+
+        if method in ['keep_first', 'keep_last', 'remove']:
+            keep = {'keep_first': 'first', 'keep_last': 'last', 'remove': False}
+            mask = ~ self.index.duplicated(keep=keep[method])
+            if not mask.all():
+                self._update_inplace(self[mask])
+        elif method in ['offset', 'stable_ns']:
+            dt = '1ns' if method == 'stable_ns' else offset
+            index = _offset_duplicates(self.index, dt)
+            if index is not self.index:
+                self.index = index
         elif method == 'interpolate':
             if self.index.duplicated()[-1]:
                 raise ValueError("Cannot interpolate when the last "
@@ -423,12 +968,17 @@ class FEDFrame(pd.DataFrame):
             for column in reset_columns:
                 self.reset_cumulative_column(column)
 
+    @_cached_signal
     def determine_mode(self):
         '''
         Return the recording mode of the current FED data.  This function tries
         to take this literally from the data headers.  There are likely
         to be problems for custom programs or particular FED software versions.
 
+        Only one mode is reported for the whole data; see `mode_segments()`
+        for data which change mode.  The result is cached until the data
+        are modified.
+
         Returns
         -------
         mode : str
@@ -441,15 +991,22 @@ class FEDFrame(pd.DataFrame):
             if col in self.columns:
                 column = self[col]
         if not column.empty:
-            if all(isinstance(i,int) for i in column):
-                if len(set(column)) == 1:
-                    mode = 'FR' + str(column[0])
+            first = column.iloc[0]
+            if pd.api.types.is_integer_dtype(column.dtype):
+                integers = True
+            elif column.dtype == object and isinstance(first, int):
+                integers = pd.api.types.infer_dtype(column, skipna=False) == 'integer'
+            else:
+                integers = False
+            if integers:
+                if column.nunique(dropna=False) == 1:
+                    mode = 'FR' + str(first)
                 else:
                     mode = 'PR'
-            elif 'PR' in column[0]:
+            elif 'PR' in first:
                 mode = 'PR'
             else:
-                mode = str(column[0])
+                mode = str(first)
         return mode
 
     def event_type(self, timestamp):
@@ -482,6 +1039,7 @@ class FEDFrame(pd.DataFrame):
         else:
             raise Exception('Missing "Event" column.')
 
+    @_cached_signal
     def interpellet_intervals(self, check_concat=True, condense=False):
         '''
         Calculate the interpellet intervals for each pellet event.
@@ -489,6 +1047,10 @@ class FEDFrame(pd.DataFrame):
 
         Note that there is a shortcut for this method: `ipi`.
 
+        Intervals are computed from the timestamps of the pellet rows only,
+        so duplicated timestamps are supported (each pellet row has its own
+        interval).  The result is cached until the data are modified.
+
         Parameters
         ----------
         check_concat : bool, optional
@@ -506,26 +1068,107 @@ class FEDFrame(pd.DataFrame):
             Pandas Series containing the interpellet intervals.
 
         '''
-        bp = self._binary_pellets()
-        bp = bp[bp == 1]
-        diff = bp.index.to_series().diff().dt.total_seconds() / 60
-
-        interpellet = pd.Series(np.nan, index = self.index)
-        interpellet.loc[diff.index] = diff
+        positions = np.flatnonzero(self._binary_pellets().to_numpy() == 1)
+        times = self.decode_events().time
+        if times is None:
+            times = pd.DatetimeIndex(self.index).values.astype('datetime64[ns]').view(np.int64)
 
+        segments = None
         if check_concat and 'Concat_#' in self.columns:
-            #this can't do duplicate indexes
-            if not any(self.index.duplicated()):
-                #thanks to this answer https://stackoverflow.com/a/47115490/13386979
-                dropped = interpellet.dropna()
-                pos = dropped.index.to_series().groupby(self['Concat_#']).first()
-                interpellet.loc[pos[1:]] = np.nan
+            segments = self['Concat_#'].to_numpy()[positions]
+        values = _interpellet_minutes(times[positions], segments)
 
         if condense:
-            interpellet = interpellet.loc[bp.index]
-            interpellet = _filterout(interpellet, dropna=True)
+            keep = ~np.isnan(values)
+            return pd.Series(values[keep], index=self.index[positions[keep]])
+
+        interpellet = np.full(len(self), np.nan)
+        interpellet[positions] = values
+        return pd.Series(interpellet, index=self.index)
+
+    def memory_report(self):
+        '''
+        Report the memory used by each column, before and after
+        converting to smaller data types with `compact()`.
 
-        return interpellet
+        Returns
+        -------
+        report : pandas.DataFrame
+            Table with one row for the index, each column, and the total.
+            Its columns are the current data type (`'dtype'`) and size in
+            bytes (`'bytes'`), and the same after compacting
+            (`'compact_dtype'` and `'compact_bytes'`).
+
+        '''
+        dtypes = self._compact_dtypes()
+        rows = {}
+        rows['Index'] = [self.index.dtype, self.index.memory_usage(deep=True)] * 2
+        for col in self.columns:
+            before = [self[col].dtype, self[col].memory_usage(index=False, deep=True)]
+            after = before
+            if col in dtypes:
+                compacted = self[col].astype(dtypes[col])
+                after = [compacted.dtype, compacted.memory_usage(index=False, deep=True)]
+            rows[col] = before + after
+        rows['Total'] = [None, sum(r[1] for r in rows.values()),
+                         None, sum(r[3] for r in rows.values())]
+
+        report = pd.DataFrame.from_dict(rows, orient='index',
+                                        columns=['dtype', 'bytes',
+                                                 'compact_dtype', 'compact_bytes'])
+
+        return report
+
+    def meal_table(self, pellet_minimum=1, intermeal_interval=1):
+        '''
+        Summarize each meal, as assigned by `FEDFrame.meals()`.
+
+        Parameters
+        ----------
+        pellet_minimum : int, optional
+            Number of pellets required in one meal. The default is 1.
+        intermeal_interval : int, optional
+            Maximum length of time (in minutes) that can pass between any
+            two consecutive pellets assigned to the same meal. The default is 1.
+
+        Returns
+        -------
+        table : pandas.DataFrame
+            One row per meal, indexed by the meal number, with columns:
+
+            - `'start'`, `'end'`: timestamps of the first and last pellet
+            - `'pellets'`: number of pellets in the meal
+            - `'duration'`: time (in minutes) from the first to the last pellet
+            - `'intermeal_interval'`: time (in minutes) since the end of the
+            previous meal (NaN for the first meal)
+            - `'phase'`: `'day'` or `'night'` at the start of the meal,
+            following `fed3.lightcycle.LIGHTCYCLE`.  This uses the recorded
+            timestamps, regardless of the alignment of the data.
+
+        '''
+        ipi = self.interpellet_intervals(condense=True)
+        starts, ends = _meal_bounds(ipi.to_numpy(), intermeal_interval)
+        keep = (ends - starts + 1) >= pellet_minimum
+        starts, ends = starts[keep], ends[keep]
+
+        start = self._aligned(ipi.index[starts])
+        end = self._aligned(ipi.index[ends])
+        duration = np.asarray((end - start).total_seconds()) / 60
+        intermeal = np.full(len(start), np.nan)
+        intermeal[1:] = np.asarray((start[1:] - end[:-1]).total_seconds()) / 60
+
+        recorded = start - getattr(self, '_current_offset', pd.Timedelta(0))
+        night = np.asarray(is_at_night(recorded, LIGHTCYCLE['on'], LIGHTCYCLE['off']),
+                           dtype=bool)
+
+        table = pd.DataFrame({'start': start,
+                              'end': end,
+                              'pellets': ends - starts + 1,
+                              'duration': duration,
+                              'intermeal_interval': intermeal,
+                              'phase': np.where(night, 'night', 'day')},
+                             index=pd.RangeIndex(1, len(start) + 1, name='meal'))
+        return table
 
     def meals(self, pellet_minimum=1, intermeal_interval=1, condense=False):
         '''
@@ -565,6 +1208,52 @@ class FEDFrame(pd.DataFrame):
             meals = meals.reindex(self.index)
         return meals
 
+    def mode_segments(self):
+        '''
+        Return a table of the segments of the data with a constant mode and
+        FR ratio, e.g. for sessions which change ratio or mode partway
+        through a file.  The table is built in one pass over the data, and
+        cached until the data are modified.
+
+        The mode is read from the 'Session_Type' column (or 'Mode', for
+        older files), and the ratio from the 'FR' column (or 'FR_Ratio').
+        When there is no mode column, the mode is `'FR#'`, from the ratio.
+
+        Returns
+        -------
+        segments : pandas.DataFrame
+            One row per segment, with columns `'start'` and `'end'` (the
+            first and last timestamp of the segment), `'mode'`, `'ratio'`
+            (NaN when there is no ratio column), and `'start_row'` and
+            `'stop_row'` (the positions of the segment's rows, such that
+            `fed.iloc[start_row:stop_row]` selects them).  See
+            `fed3.core.split_by()` with `freq='mode'` to split the data at
+            these segments.
+
+        '''
+        starts, modes, ratios = self._mode_runs()
+        if len(self) == 0:
+            # no segments; keep the columns and types of the table
+            stops = starts
+            times = self._aligned(self.index[:0])
+            return pd.DataFrame({'start': times,
+                                 'end': times,
+                                 'mode': modes,
+                                 'ratio': ratios,
+                                 'start_row': starts,
+                                 'stop_row': stops},
+                                index=pd.RangeIndex(0, name='segment'))
+        stops = np.append(starts[1:], len(self)).astype(np.int64)
+        table = pd.DataFrame({'start': self._aligned(self.index[starts]),
+                              'end': self._aligned(self.index[stops - 1]),
+                              'mode': modes,
+                              'ratio': ratios,
+                              'start_row': starts,
+                              'stop_row': stops},
+                             index=pd.RangeIndex(len(starts), name='segment'))
+        return table
+
+    @_cached_signal
     def pellets(self, cumulative=True, condense=False):
         '''
         Provide a series containing pellet retrieval information.
@@ -596,6 +1285,7 @@ class FEDFrame(pd.DataFrame):
 
         return y
 
+    @_cached_signal
     def pokes(self, kind='any', cumulative=True, condense=False):
         '''
         Get an array of poke events.
@@ -658,7 +1348,19 @@ class FEDFrame(pd.DataFrame):
         None.
 
         '''
+        table = self.decode_events()
+        needed = EVENT_FLAGS['pellet']
         if include_side:
+            needed |= EVENT_FLAGS['left'] | EVENT_FLAGS['right']
+
+        if table.exact & needed == needed:
+            if not include_side:
+                events = np.where(table.flags & EVENT_FLAGS['pellet'], 'Pellet', 'Poke')
+            elif table.code.any():
+                events = np.array(EVENT_CODES, dtype=object)[table.code]
+            else:
+                events = np.full(len(self), np.nan)
+        elif include_side:
             events = pd.Series(np.nan, index=self.index)
             events.loc[self._binary_pellets().astype(bool)] = 'Pellet'
             events.loc[self._binary_pokes('left').astype(bool)] = 'Left'
@@ -687,7 +1389,24 @@ class FEDFrame(pd.DataFrame):
         reset += self[column].iloc[0]
         self[column] = reset
 
-    def set_alignment(self, alignment, inplace=True):
+    def signal_cache_info(self):
+        '''
+        Report the use of the signal cache.  Signals derived from the data
+        (e.g. the binary pellets and pokes used by `fed3.metrics`) are
+        computed once and cached, until the data are modified.
+
+        Returns
+        -------
+        dict
+            Dictionary with the number of cached signals (`'size'`),
+            and the number of times signals were read from the cache
+            (`'hits'`) or computed (`'misses'`).
+
+        '''
+        self._signal_cache()
+        return {'size': len(self._signals), **self._signal_stats}
+
+    def set_alignment(self, alignment, inplace=True, lazy=False):
         '''
         Shift the timestamps of a FEDFrame to allow for comparisons with other data
         recorded at different times.
@@ -720,6 +1439,17 @@ class FEDFrame(pd.DataFrame):
         Note that for 'elapsed' and 'time' alignment, the common date is set
         by the `ZERO_DATE` variable in this module.
 
+        With `lazy=True`, the index is not modified; only the offset to the
+        new alignment is stored, so changing the alignment takes constant
+        time.  The offset is applied when timestamps are read by
+        `fed3.metrics` (and thus `fed3.plot`), `start_time`, `end_time`,
+        `meal_table()`, and `to_sparse()`, and by `fed3.concat()`,
+        `fed3.split()`, and `fed3.timecrop()`.  Note that the index itself
+        keeps the recorded timestamps; use `lazy=False` to shift them.
+        With `inplace=False`, a lazy alignment returns a shallow copy
+        which shares its data (and cached signals) with the original, so
+        it should not be modified in place.
+
         Parameters
         ----------
         alignment : str, 'datetime', 'time', or 'elapsed'
@@ -727,6 +1457,9 @@ class FEDFrame(pd.DataFrame):
         inplace : bool, optional
             When True, the current FEDFrame is modified.  Else, a copy is
             returned with the new alignment.
+        lazy : bool, optional
+            Store the new alignment as an offset, rather than shifting
+            the index. The default is False.
 
         Raises
         ------
@@ -747,17 +1480,66 @@ class FEDFrame(pd.DataFrame):
         if alignment == 'datetime':
             new_diff = self._current_offset
         elif alignment == 'time':
-            new_diff = self.index[0].date() - ZERO_DATE.date()
+            new_diff = self._aligned(self.index[0]).date() - ZERO_DATE.date()
         elif alignment == 'elapsed':
-            new_diff = self.index[0] - ZERO_DATE
+            new_diff = self._aligned(self.index[0]) - ZERO_DATE
 
-        newfed = self if inplace else self.copy()
-        newfed.index -= new_diff
+        offset = getattr(self, '_lazy_offset', None) or pd.Timedelta(0)
+        if lazy:
+            if inplace:
+                newfed = self
+            else:
+                newfed = self.copy(deep=False)
+                newfed._signals = self._signal_cache()
+                newfed._signal_stats = self._signal_stats
+            newfed._lazy_offset = offset - new_diff
+        else:
+            newfed = self if inplace else self.copy()
+            if offset:
+                newfed.index = newfed.index + offset
+            newfed.index -= new_diff
+            newfed._lazy_offset = pd.Timedelta(0)
         newfed._current_offset -= new_diff
         newfed._alignment = alignment
 
         return newfed
 
+    def to_sparse(self, columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count')):
+        '''
+        Store cumulative count columns in a compact form, keeping only the
+        rows where they change.  See `fed3.core.sparse.SparseCounts`.
+
+        Parameters
+        ----------
+        columns : list-like, optional
+            Columns to store. The default is
+            ('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count').
+
+        Raises
+        ------
+        ValueError
+            The index is not datetime, or not sorted.
+
+        Returns
+        -------
+        fed3.core.sparse.SparseCounts
+            Change points of the columns.
+
+        '''
+        from fed3.core.sparse import SparseCounts
+
+        kinds = {'Pellet_Count': 'pellet',
+                 'Left_Poke_Count': 'left',
+                 'Right_Poke_Count': 'right'}
+        try:
+            first_type = self._first_event_type() if len(self) else 'unknown'
+        except (KeyError, ValueError, TypeError):
+            first_type = 'unknown'
+        first = {col: int(kinds.get(col) == first_type) for col in columns}
+        data = {col: self[col].to_numpy() for col in columns}
+
+        return SparseCounts(self._aligned(self.index), data, first=first, name=self.name)
+
     # ---- Aliases
     ipi = interpellet_intervals
 
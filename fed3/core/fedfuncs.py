@@ -9,21 +9,560 @@ temporal alignment.
 __all__ = ['as_aligned',
            'can_concat',
            'concat',
+           'crop_many',
            'load',
+           'load_archive',
+           'load_many',
+           'meal_sweep',
            'screen_mixed_alignment',
            'split',
+           'split_by',
            'timecrop']
 
 from collections.abc import Iterable
+import concurrent.futures
+import contextlib
+import csv
+import fnmatch
+import glob
+import io
 import os
+import tarfile
 import warnings
+import zipfile
 
+import numpy as np
 import pandas as pd
 
+from fed3 import cache as _cache
 from fed3.core import FEDFrame
+from fed3.core.fedframe import _column_fixes, _meal_bounds
+from fed3.core.lazy import LazyFEDFrame
+from fed3.lightcycle import LIGHTCYCLE
+from fed3.metrics.core import required_columns
+
+FED3_DTYPES = {'Battery_Voltage': 'float64',
+               'Session_Type': 'object',
+               'Event': 'object',
+               'Active_Poke': 'object'}
+'''Known data types of FED3 columns, used when reading CSV files.  Columns
+not listed here have their type inferred by pandas.'''
+
+TIMESTAMP_FORMATS = ('%m/%d/%Y %H:%M:%S',
+                     '%Y-%m-%d %H:%M:%S')
+'''Timestamp formats tried (in order) when parsing the index of FED3 CSV files.
+The first is the format written by FED3 devices, the second is the format
+written by pandas (e.g. for data saved with fed3).'''
+
+COMPRESSIONS = ('.gz', '.bz2', '.xz', '.zst', '.zip', '.tar')
+'''Extensions of compressed files which can be read by `load()`, e.g.
+`'FED001.csv.gz'`.  Files are decompressed by pandas as they are read;
+reading `'.zst'` files requires the zstandard package.'''
 
 '''Date to use when aligning data based on elapsed time or time of day.'''
 
+def _expand_paths(paths):
+    '''Helper function for parsing the `paths` parameter within `load_many()`.
+    Strings are treated as a directory (all CSV/Excel files within it) or
+    as a glob pattern; other iterables are returned as a list, in order.'''
+    if isinstance(paths, (str, os.PathLike)):
+        paths = os.fspath(paths)
+        if os.path.isdir(paths):
+            files = sorted(os.listdir(paths))
+            paths = [os.path.join(paths, f) for f in files
+                     if _split_path(f)[1] in ['.csv', '.xlsx']]
+        else:
+            paths = sorted(glob.glob(paths))
+    return list(paths)
+
+def _archive_members(path, pattern='*.csv'):
+    '''Return the names of files within a zip or tar archive which match
+    a (case-insensitive) glob pattern, in sorted order.'''
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as z:
+            names = [info.filename for info in z.infolist() if not info.is_dir()]
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path) as t:
+            names = [info.name for info in t.getmembers() if info.isfile()]
+    else:
+        raise ValueError(f'"{path}" is not a zip or tar archive.')
+
+    pattern = pattern.lower()
+    return sorted(name for name in names
+                  if fnmatch.fnmatchcase(os.path.basename(name).lower(), pattern))
+
+def _load_fed3(read, name, path, cache_path=None, cache_args=None,
+               index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+               deduplicate_index=None, offset='1S', reset_counts=False,
+               reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+               date_format=None, cache=None, compact=False, columns=None,
+               metrics=None):
+    '''Shared steps of `load()` and `_load_member()`: checking (and filling)
+    the cache, choosing the columns to read, removing empty rows, and
+    creating the FEDFrame.  The data are read by calling `read(select)`,
+    which returns a DataFrame of raw data (or an already loaded FEDFrame).
+    `read` should pass the column names of the data to `select()`, which
+    returns the raw names of the columns to read (None for all columns) and
+    the `reset_columns` which remain.  The cache is keyed by `cache_path`
+    (`path` by default) and any extra `cache_args`.'''
+    wanted = _wanted_columns(columns, metrics)
+
+    # check the cache
+    cache_path = path if cache_path is None else cache_path
+    use_cache = _cache.CACHE['enabled'] if cache is None else cache
+    if use_cache:
+        cache_args = dict({} if cache_args is None else cache_args,
+                          index_col=index_col,
+                          dropna=dropna,
+                          deduplicate_index=deduplicate_index,
+                          offset=offset,
+                          reset_counts=reset_counts,
+                          reset_columns=reset_columns,
+                          date_format=date_format,
+                          compact=compact,
+                          columns=wanted)
+        cached = _cache._get(cache_path, cache_args)
+        if cached is not None:
+            return cached
+
+    skipped = []
+    def select(header):
+        if wanted is None:
+            return None, reset_columns
+        usecols, found = _resolve_usecols(header, wanted, index_col=index_col,
+                                          requested=() if columns is None else columns)
+        skipped[:] = found
+        return usecols, [col for col in reset_columns if col not in found]
+
+    # read the data
+    data = read(select)
+    if isinstance(data, FEDFrame):
+        f = data
+    else:
+        if dropna:
+            data = data.dropna(how='all')
+        f = FEDFrame(data)
+        f._load_init(name=name,
+                     path=path,
+                     deduplicate_index=deduplicate_index,
+                     offset=offset,
+                     reset_counts=reset_counts,
+                     reset_columns=[col for col in reset_columns if col not in skipped])
+
+    if skipped:
+        f.skipped_columns = skipped
+        f.missing_columns = [col for col in f.missing_columns if col not in skipped]
+
+    if compact:
+        f.compact()
+
+    if use_cache:
+        _cache._put(cache_path, cache_args, f)
+
+    return f
+
+def _load_job(job):
+    '''Load one file for `load_many()`.  Returns a (FEDFrame, exception)
+    tuple, so that errors can be collected instead of halting the batch.'''
+    path, kwargs = job
+    try:
+        return load(path, **kwargs), None
+    except Exception as e:
+        return None, e
+
+def _load_member(archive, member, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+                 deduplicate_index=None, offset='1S', reset_counts=False,
+                 reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+                 engine=None, date_format=None, cache=None, compact=False,
+                 columns=None, metrics=None):
+    '''Load one CSV file from within a zip or tar archive, as `load()`
+    does for files.  The member is decompressed as it is read.'''
+    def read(select):
+        with _open_member(archive, member) as stream:
+            head = stream.readline()
+            stream.seek(0)
+            header = next(csv.reader([head.decode('utf-8-sig', errors='replace')]), [])
+            usecols, _ = select(header)
+            return _read_fed3_csv(stream,
+                                  header=header,
+                                  index_col=index_col,
+                                  engine=engine,
+                                  date_format=date_format,
+                                  usecols=usecols)
+
+    return _load_fed3(read,
+                      name=os.path.basename(os.path.splitext(member)[0]),
+                      path=os.path.join(archive, member),
+                      cache_path=archive,
+                      cache_args=dict(member=member),
+                      index_col=index_col,
+                      dropna=dropna,
+                      deduplicate_index=deduplicate_index,
+                      offset=offset,
+                      reset_counts=reset_counts,
+                      reset_columns=reset_columns,
+                      date_format=date_format,
+                      cache=cache,
+                      compact=compact,
+                      columns=columns,
+                      metrics=metrics)
+
+def _load_member_job(job):
+    '''Load one archive member for `load_archive()`.  Returns a
+    (FEDFrame, exception) tuple, as `_load_job()` does.'''
+    archive, member, kwargs = job
+    try:
+        return _load_member(archive, member, **kwargs), None
+    except Exception as e:
+        return None, e
+
+@contextlib.contextmanager
+def _open_member(archive, member):
+    '''Open a file within a zip or tar archive, as a binary stream which
+    is decompressed as it is read.'''
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as z, z.open(member) as stream:
+            yield stream
+    else:
+        with tarfile.open(archive) as t, t.extractfile(member) as stream:
+            yield stream
+
+def _run_jobs(func, jobs, workers=None, executor='process'):
+    '''Map `func` over `jobs` serially or with a pool of workers, returning
+    results in the same order as `jobs`.'''
+    executors = {'process': concurrent.futures.ProcessPoolExecutor,
+                 'thread': concurrent.futures.ThreadPoolExecutor}
+    if executor not in executors:
+        raise ValueError(f'`executor` must be one of {list(executors)}, '
+                         f'not "{executor}"')
+
+    workers = os.cpu_count() if workers is None else workers
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        return [func(job) for job in jobs]
+
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with executors[executor](max_workers=workers) as pool:
+        if executor == 'process':
+            results = list(pool.map(func, jobs, chunksize=chunksize))
+        else:
+            results = list(pool.map(func, jobs))
+
+    return results
+
+def _parse_timestamps(index, date_format=None):
+    '''Convert the index of raw FED3 data to datetimes.  Tries `date_format`
+    (or each of `TIMESTAMP_FORMATS`), then falls back to letting pandas
+    infer the format.  Returns the index unchanged if it cannot be parsed.'''
+    if isinstance(index, pd.DatetimeIndex):
+        return index.astype('datetime64[ns]')
+
+    formats = TIMESTAMP_FORMATS if date_format is None else (date_format,)
+    for fmt in formats:
+        try:
+            return _strptime(index, fmt)
+        except (ValueError, TypeError):
+            continue
+
+    try:
+        return pd.to_datetime(index)
+    except (ValueError, TypeError, OverflowError):
+        return index
+
+def _peek_fed3_csv(path, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+                   date_format=None, block=8192):
+    '''Read the first and last rows of a FED3 CSV file, without reading
+    the rest of it.  Small blocks are read from the start and end of the
+    file (growing until a row is found), and parsed as in `load()`.  Returns
+    a FEDFrame with the first and last rows, or only one row if the file has
+    just one.'''
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        head = f.readline()
+        header = next(csv.reader([head.decode('utf-8-sig', errors='replace')]), [])
+
+        def parse(body):
+            data = _read_fed3_csv(io.BytesIO(head + body), header=header,
+                                  index_col=index_col, date_format=date_format)
+            return data.dropna(how='all') if dropna else data
+
+        start = len(head)
+        if size - start <= 2 * block:
+            data = parse(f.read())
+            rows = data.iloc[[0, -1]] if len(data) > 1 else data
+        else:
+            k = block
+            while True:
+                f.seek(start)
+                body = f.read(k)
+                first = parse(body[:body.rfind(b'\n') + 1])
+                if len(first) or start + k >= size:
+                    break
+                k *= 2
+            k = block
+            while True:
+                f.seek(max(start, size - k))
+                body = f.read()
+                if size - k > start:
+                    body = body[body.find(b'\n') + 1:]
+                last = parse(body)
+                if len(last) or size - k <= start:
+                    break
+                k *= 2
+            rows = pd.concat([first.iloc[:1], last.iloc[-1:]])
+
+    fed = FEDFrame(rows)
+    fed.name = os.path.basename(os.path.splitext(path)[0])
+    fed.path = path
+    fed._fix_column_names()
+    fed._handle_retrieval_time()
+    fed._alignment = 'datetime'
+    fed._current_offset = pd.Timedelta(0)
+    fed._lazy_offset = pd.Timedelta(0)
+
+    return fed
+
+def _read_csv_header(path):
+    '''Return the column names of a CSV file, read from the first line.'''
+    if _split_path(path)[2]:
+        return list(pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns)
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        return next(csv.reader(f), [])
+
+def _read_csv_options(header, index_col='MM:DD:YYYY hh:mm:ss', engine=None,
+                      usecols=None):
+    '''Return keyword arguments for `pandas.read_csv()` when reading FED3
+    data with the given header, setting the data types of known FED3 columns
+    (see `FED3_DTYPES`).  `usecols` optionally lists the (raw) columns to
+    read.'''
+    renames, _ = _column_fixes(header)
+    dtype = {}
+    for col in header:
+        canonical = renames.get(col, col)
+        if usecols is not None and col not in usecols:
+            continue
+        if col != index_col and canonical in FED3_DTYPES:
+            dtype[col] = FED3_DTYPES[canonical]
+
+    opts = dict(dtype=dtype, engine=engine)
+    if usecols is not None:
+        opts['usecols'] = list(usecols)
+    return opts
+
+def _resolve_usecols(header, columns, index_col='MM:DD:YYYY hh:mm:ss', requested=()):
+    '''Return the raw names of the columns to read for a header, given
+    the (fixed) names of the columns wanted, and the fixed names of the
+    columns which are skipped.  Raises a ValueError if any of the
+    `requested` columns (those named by the user) are not in the header.'''
+    renames, _ = _column_fixes(header)
+    known = [renames.get(col, col) for col in header]
+    unknown = [col for col in requested if col not in known and col != index_col]
+    if unknown:
+        raise ValueError(f'Column(s) {unknown} passed to `columns` are not in '
+                         f'the data; the columns are {known}.')
+    usecols = []
+    skipped = []
+    for col, canonical in zip(header, known):
+        if col == index_col or canonical in columns:
+            usecols.append(col)
+        else:
+            skipped.append(canonical)
+    return usecols, skipped
+
+def _wanted_columns(columns=None, metrics=None):
+    '''Return the (sorted) columns to load given the `columns` and `metrics`
+    arguments of `load()`, or None if all columns should be loaded.'''
+    if columns is None and metrics is None:
+        return None
+    wanted = list(columns) if columns is not None else []
+    if metrics is not None:
+        wanted += required_columns(metrics)
+    return sorted(set(wanted))
+
+def _read_fed3_csv(source, header=None, index_col='MM:DD:YYYY hh:mm:ss',
+                   engine=None, date_format=None, parse_dates=True, usecols=None):
+    '''Read FED3 CSV data (a path or a file-like object) into a pandas
+    DataFrame with a datetime index, using known column types and timestamp
+    formats.  Falls back to letting pandas infer types if the data do not
+    match them.  `header` is the list of column names, which is read from
+    the file when not given.  With `parse_dates=False`, the timestamps are
+    left as text.  `usecols` optionally lists the (raw) columns to read.'''
+    if header is None:
+        header = _read_csv_header(source)
+    opts = _read_csv_options(header, index_col=index_col, engine=engine,
+                             usecols=usecols)
+    start = source.tell() if hasattr(source, 'tell') else None
+    try:
+        data = pd.read_csv(source, **opts)
+    except (ValueError, TypeError):
+        if start is not None:
+            source.seek(start)
+        opts.pop('dtype')
+        data = pd.read_csv(source, **opts)
+
+    # the index is set here rather than with `index_col`, which is
+    # much slower when combined with `dtype`
+    timestamps = pd.Index(data.pop(index_col))
+    if parse_dates:
+        timestamps = _parse_timestamps(timestamps, date_format=date_format)
+    data.index = timestamps
+
+    return data
+
+def _iter_fed3_csv(path, chunksize, index_col='MM:DD:YYYY hh:mm:ss',
+                   engine=None, date_format=None, parse_dates=True, usecols=None):
+    '''Chunked version of `_read_fed3_csv()`, yielding DataFrames of at
+    most `chunksize` rows.  If the data do not match the known column types,
+    reading restarts without them, skipping the chunks already yielded.'''
+    opts = _read_csv_options(_read_csv_header(path), index_col=index_col,
+                             engine=engine, usecols=usecols)
+    done = 0
+    while True:
+        try:
+            with pd.read_csv(path, chunksize=chunksize, **opts) as reader:
+                for i, data in enumerate(reader):
+                    if i * chunksize < done:
+                        continue
+                    timestamps = pd.Index(data.pop(index_col))
+                    if parse_dates:
+                        timestamps = _parse_timestamps(timestamps, date_format=date_format)
+                    data.index = timestamps
+                    done += len(data)
+                    yield data
+            return
+        except (ValueError, TypeError):
+            if 'dtype' not in opts:
+                raise
+            opts.pop('dtype')
+
+def _split_path(path):
+    '''Split a file path into its name (without extensions), its extension,
+    and the extension of any compression (see `COMPRESSIONS`), e.g.
+    `'FED001.csv.gz'` gives `('FED001', '.csv', '.gz')`.  Compressed files
+    are taken to be CSV when there is no other extension.'''
+    name, ext = os.path.splitext(path)
+    compression = ''
+    if ext.lower() in COMPRESSIONS:
+        compression = ext.lower()
+        name, ext = os.path.splitext(name)
+        if name.lower().endswith('.tar'):
+            name = name[:-4]
+        ext = ext or '.csv'
+    return name, ext.lower(), compression
+
+def _strptime(values, date_format):
+    '''Parse an array of strings to a DatetimeIndex with an exact format.'''
+    if date_format == TIMESTAMP_FORMATS[0]:
+        parsed = _parse_device_timestamps(values)
+        return pd.DatetimeIndex(parsed, name=getattr(values, 'name', None))
+
+    return pd.to_datetime(values, format=date_format)
+
+def _parse_device_timestamps(values):
+    '''Vectorized parser for timestamps written by FED3 devices, i.e.
+    `'%m/%d/%Y %H:%M:%S'` (with or without zero padding).  This is much faster
+    than `pandas.to_datetime()` for this format.  Raises a `ValueError` if
+    any value does not match the format.'''
+    arr = np.asarray(values)
+    if arr.dtype.kind not in 'OSU' or arr.size == 0:
+        raise ValueError('Timestamps must be strings.')
+    try:
+        arr = arr.astype('S')
+    except (UnicodeEncodeError, TypeError) as e:
+        raise ValueError(str(e)) from e
+
+    # character matrix, with one row per timestamp
+    n, w = len(arr), arr.dtype.itemsize
+    chars = arr.view(np.uint8).reshape(n, w)
+    flat = chars.ravel()
+    isdigit = (chars - 48) < 10
+    issep = (chars == 47) | (chars == 32) | (chars == 58)
+    isnull = chars == 0
+    if not (isdigit | issep | isnull).all():
+        raise ValueError('Unexpected character in timestamps.')
+
+    # locate the separators ('/', '/', ' ', ':', ':') of each timestamp
+    rows, cols = np.nonzero(issep)
+    if len(cols) != 5 * n or (flat[rows * w + cols].reshape(n, 5) != [47, 47, 32, 58, 58]).any():
+        raise ValueError('Timestamps do not match the FED3 format.')
+    cols = cols.reshape(n, 5)
+    starts = np.column_stack([np.zeros(n, dtype=cols.dtype), cols + 1])
+    ends = np.column_stack([cols, w - isnull.sum(axis=1)])
+    widths = (2, 2, 4, 2, 2, 2)
+    lengths = ends - starts
+    if ((lengths < 1) | (lengths > widths) | (lengths[:, 2] != 4)[:, None]).any():
+        raise ValueError('Timestamps do not match the FED3 format.')
+
+    # read each field from its last digit backwards
+    offset = np.arange(n) * w
+    fields = []
+    for k, width in enumerate(widths):
+        field = np.zeros(n, dtype=np.int64)
+        for i in range(width):
+            pos = ends[:, k] - 1 - i
+            digit = np.where(pos >= starts[:, k], flat[offset + pos] - 48, 0)
+            field += digit.astype(np.int64) * 10 ** i
+        fields.append(field)
+
+    month, day, year, hour, minute, second = fields
+    if ((month < 1) | (month > 12) | (day < 1) | (hour > 23) |
+        (minute > 59) | (second > 59) | (year < 1678) | (year > 2261)).any():
+        raise ValueError('Timestamps contain out of range values.')
+    months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    days = months.astype('datetime64[D]') + (day - 1)
+    if (days.astype('datetime64[M]') != months).any():
+        raise ValueError('Timestamps contain out of range values.')
+    seconds = hour * 3600 + minute * 60 + second
+
+    return (days.astype('datetime64[s]') + seconds).astype('datetime64[ns]')
+
+def _crop_windows(fed, starts, ends, reset_columns=(), copy=True):
+    '''Return a list of the data within each window from `starts`
+    (inclusive) to `ends` (exclusive), with `reset_columns` reset to count
+    from the start of each window.  For a sorted index, the windows are
+    found with one binary search and taken as slices; the reset offsets are
+    the running maximum of each column just before each window.'''
+    index = fed.index
+    starts = pd.DatetimeIndex(pd.to_datetime(starts))
+    ends = pd.DatetimeIndex(pd.to_datetime(ends))
+
+    if index.is_monotonic_increasing:
+        lo = index.searchsorted(starts, side='left')
+        hi = np.maximum(index.searchsorted(ends, side='left'), lo)
+        subsets = [fed.iloc[a:b] for a, b in zip(lo, hi)]
+        running = {col: fed[col].cummax().ffill() for col in reset_columns}
+        offsets = [{col: running[col].iloc[a - 1] for col in reset_columns}
+                   if a > 0 else {} for a in lo]
+    else:
+        subsets = []
+        offsets = []
+        for start, end in zip(starts, ends):
+            prior = fed[(index < start)]
+            subsets.append(fed[(index >= start) & (index < end)])
+            offsets.append({col: prior[col].max() for col in reset_columns}
+                           if not prior.empty else {})
+
+    output = []
+    for subset, offset in zip(subsets, offsets):
+        subset = subset.copy(deep=copy)
+        for col, value in offset.items():
+            subset[col] = subset[col] - value
+        output.append(subset)
+
+    return output
+
+def _lightcycle_edges(start, end):
+    '''Return the times when lights turn on or off (see
+    `fed3.lightcycle.LIGHTCYCLE`), from the last one at or before `start`
+    to the first one after `end`.'''
+    days = pd.date_range(start.normalize() - pd.Timedelta('1D'),
+                         end.normalize() + pd.Timedelta('1D'), freq='1D')
+    changes = [pd.Timedelta(hours=t.hour, minutes=t.minute) for t in LIGHTCYCLE.values()]
+    edges = np.unique(np.concatenate([(days + c).values for c in changes]))
+    first = np.searchsorted(edges, start.to_datetime64(), side='right') - 1
+    last = np.searchsorted(edges, end.to_datetime64(), side='right')
+    return pd.DatetimeIndex(edges[first:last + 1])
+
 def _split_handle_dates(dates):
     '''Helper function for parsing the `dates` parameter within `split().'''
     old = pd.Timestamp('01-01-1970')
@@ -36,11 +575,89 @@ def _split_handle_dates(dates):
 
     return dates
 
-def as_aligned(feds, alignment, inplace=False):
+def _stitch_segments(segments, offsets, numbers=None):
+    '''Concatenate sorted FEDFrames by writing each one into preallocated
+    column arrays.  `offsets[col][i]` is added to column `col` of segment
+    `i` (integer columns become int64 when there are multiple segments, as
+    with `pandas.concat()` after the offsets are added).  When `numbers` is
+    given, the 'Concat_#' column of segment `i` is set to `numbers[i]`
+    (or kept, when None).  Returns None if the segments are not compatible
+    (different columns or data types, extension data types, or non-datetime
+    indices), in which case `pandas.concat()` should be used.'''
+    first = segments[0]
+    if not first.columns.is_unique:
+        return None
+    # 'Concat_#' is replaced when `numbers` are given
+    base = [col for col in first.columns if numbers is None or col != 'Concat_#']
+    dtypes = dict(zip(first.columns, first.dtypes))
+    for seg in segments:
+        same = [col for col in seg.columns if numbers is None or col != 'Concat_#'] == base
+        seg_dtypes = dict(zip(seg.columns, seg.dtypes))
+        if not same or any(seg_dtypes[col] != dtypes[col] for col in base):
+            return None
+        if not isinstance(seg.index, pd.DatetimeIndex) or seg.index.tz is not None:
+            return None
+    if any(pd.api.types.is_extension_array_dtype(dtypes[col]) for col in base):
+        return None
+
+    columns = list(first.columns)
+    if numbers is not None and 'Concat_#' not in columns:
+        columns.append('Concat_#')
+    lengths = np.array([len(seg) for seg in segments], dtype=np.int64)
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+
+    data = {}
+    for col in columns:
+        if col == 'Concat_#' and numbers is not None:
+            if any(n is None and 'Concat_#' not in seg.columns
+                   for n, seg in zip(numbers, segments)):
+                return None
+            out = np.empty(bounds[-1], dtype=np.int64)
+            for i, (seg, number) in enumerate(zip(segments, numbers)):
+                if number is None:
+                    out[bounds[i]:bounds[i + 1]] = seg['Concat_#'].to_numpy()
+                else:
+                    out[bounds[i]:bounds[i + 1]] = number
+            data[col] = out
+            continue
+
+        dtype = dtypes[col]
+        if col in offsets and len(segments) > 1 and pd.api.types.is_integer_dtype(dtype):
+            dtype = np.dtype(np.int64)
+        out = np.empty(bounds[-1], dtype=dtype)
+        for i, seg in enumerate(segments):
+            out[bounds[i]:bounds[i + 1]] = seg[col].to_numpy()
+            if col in offsets and offsets[col][i]:
+                out[bounds[i]:bounds[i + 1]] += offsets[col][i]
+        data[col] = out
+
+    names = set(seg.index.name for seg in segments)
+    index = pd.DatetimeIndex(np.concatenate([seg.index.values for seg in segments]),
+                             name=names.pop() if len(names) == 1 else None)
+
+    return FEDFrame(data, index=index, columns=columns)
+
+def _tag_windows(subsets, name, return_empty=False, tag_name=True):
+    '''Name the FEDFrames returned by `split()` (and similar) with a `'_#'`
+    tag, and drop the empty ones.'''
+    output = []
+    for i, subset in enumerate(subsets):
+        if tag_name:
+            subset.name = f"{name}_{i}"
+        if not return_empty and subset.empty:
+            continue
+        output.append(subset)
+    return output
+
+def as_aligned(feds, alignment, inplace=False, lazy=True):
     '''
     Helper function for setting the alignment of one or more FEDFrames.
     See `fed3.core.fedframe.FEDFrame.set_alignment()` for more information.
 
+    By default, the alignment is lazy: the returned FEDFrames are shallow
+    copies which share data with the originals, and only store the offset
+    to the new alignment.  This takes constant time for each FEDFrame.
+
     Parameters
     ----------
     feds : FEDFrame or collection of FEDFrames
@@ -48,19 +665,25 @@ def as_aligned(feds, alignment, inplace=False):
     alignment: 'str':
         Alignment string.
     inplace : bool
-        When True, the FEDFrames are modified in place; otherwise,
-        new copies are created.
+        When True, the FEDFrames are modified in place; otherwise, new
+        FEDFrames are returned.  With `lazy=True` (the default), these are
+        views sharing data with the originals, so writing values into them
+        also changes the originals; use `lazy=False` for independent copies.
+    lazy : bool
+        Store the alignment as an offset rather than shifting the index.
+        The default is True.
 
     Returns
     -------
     aligned or None
-        Either one FEDFrame or a list of FEDFrames with new alignment..
+        Either one FEDFrame or a list of FEDFrames with new alignment.
+        Unless `lazy=False`, these share data with `feds` (see `inplace`).
 
     '''
-    if isinstance(feds, FEDFrame):
-        aligned = feds.set_alignment(alignment, inplace=inplace)
+    if isinstance(feds, (FEDFrame, LazyFEDFrame)):
+        aligned = feds.set_alignment(alignment, inplace=inplace, lazy=lazy)
     else:
-        aligned = [f.set_alignment(alignment) for f in feds]
+        aligned = [f.set_alignment(alignment, inplace=inplace, lazy=lazy) for f in feds]
 
     return aligned
 
@@ -90,6 +713,12 @@ def concat(feds, name=None, add_concat_number=True,
     '''
     Concatenated FED3 data in time.
 
+    When all the FEDFrames have the same columns and data types, each one
+    is written directly into preallocated arrays; otherwise, they are
+    joined with `pandas.concat()`.  See also
+    `fed3.core.fedframe.FEDFrame.append_segment()`, for adding data to the
+    end of concatenated data.
+
     Parameters
     ----------
     feds : collection of FEDFrame objects
@@ -123,10 +752,28 @@ def concat(feds, name=None, add_concat_number=True,
     if not can_concat(feds):
         raise ValueError('FEDFrame dates overlap, cannot concat.')
 
-    output=[]
+    sorted_feds = sorted(feds, key=lambda x: x.start_time)
+    sorted_feds = [fed._applied_alignment() for fed in sorted_feds]
+
+    # each segment is offset by the sum of the maxima before it
     offsets = {}
+    for col in reset_columns:
+        if col in sorted_feds[0].columns and all(col in f.columns for f in sorted_feds):
+            maxima = np.array([f[col].max() for f in sorted_feds[:-1]])
+            if not np.isnan(maxima.astype(np.float64)).any():
+                offsets[col] = np.concatenate([[0], np.cumsum(maxima)])
+    newfed = None
+    if len(offsets) == len([col for col in reset_columns if col in sorted_feds[0].columns]):
+        numbers = list(range(len(sorted_feds))) if add_concat_number else None
+        newfed = _stitch_segments(sorted_feds, offsets, numbers)
+    if newfed is not None:
+        newfed._load_init(name=name)
+        skipped = [col for fed in feds for col in getattr(fed, 'skipped_columns', ())]
+        newfed.skipped_columns = list(dict.fromkeys(skipped))
+        return newfed
 
-    sorted_feds = sorted(feds, key=lambda x: x.start_time)
+    output=[]
+    offsets = {}
 
     for i, fed in enumerate(sorted_feds):
         df = fed.copy()
@@ -140,6 +787,9 @@ def concat(feds, name=None, add_concat_number=True,
 
         else:
             for col, offset in offsets.items():
+                # compacted counts may overflow
+                if pd.api.types.is_integer_dtype(df[col]):
+                    df[col] = df[col].astype(np.int64)
                 df[col] += offset
                 offsets[col] = df[col].max()
 
@@ -147,9 +797,63 @@ def concat(feds, name=None, add_concat_number=True,
 
     newfed = pd.concat(output)
     newfed._load_init(name=name)
+    skipped = [col for fed in feds for col in getattr(fed, 'skipped_columns', ())]
+    newfed.skipped_columns = list(dict.fromkeys(skipped))
 
     return newfed
 
+def crop_many(feds, windows,
+              reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+              copy=True):
+    '''
+    Crop one or more FEDFrames to one or more windows of time, as with
+    `timecrop()`.  The boundaries of all windows are found in one binary
+    search for each FEDFrame.
+
+    Parameters
+    ----------
+    feds : fed3.FEDFrame or list of such
+        FED3 data.
+    windows : tuple or list of tuples
+        A `(start, end)` pair of datetime strings or objects, or a list of
+        such.  Each window includes data from the start (inclusive) to the
+        end (exclusive).
+    reset_columns : list-like, optional
+        Columns whose cumulative totals should be reset when cropping the data.
+        The default is ('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count').
+    copy : bool, optional
+        Copy the data of each new FEDFrame. The default is True.  See
+        `timecrop()`.
+
+    Returns
+    -------
+    output : list
+        With one window, a list of the cropped FEDFrames (one per FEDFrame
+        in `feds`, keeping their names).  With a list of windows, a list
+        with one list for each FEDFrame in `feds`, containing one FEDFrame
+        for each window (tagged with `'_#'` as for `split()`).
+
+    '''
+    if isinstance(feds, (FEDFrame, LazyFEDFrame)):
+        feds = [feds]
+    single = (len(windows) == 2 and
+              not any(isinstance(w, (tuple, list)) for w in windows))
+    if single:
+        windows = [windows]
+    starts = [start for start, _ in windows]
+    ends = [end for _, end in windows]
+
+    output = []
+    for fed in feds:
+        fed = fed._applied_alignment()
+        cropped = _crop_windows(fed, starts, ends, reset_columns, copy=copy)
+        if single:
+            output.append(cropped[0])
+        else:
+            output.append(_tag_windows(cropped, fed.name, return_empty=True))
+
+    return output
+
 def determine_alignment(feds):
     '''
     Return the temporal alignment for a FEDFrame or group of FEDFrames.
@@ -172,12 +876,23 @@ def determine_alignment(feds):
 
 def load(path, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
          deduplicate_index=None, offset='1S', reset_counts=False,
-         reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count')):
+         reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+         engine=None, date_format=None, cache=None, chunksize=None,
+         compact=False, lazy=False, columns=None, metrics=None):
     '''
     Load FED3 data from a CSV/Excel file.  This is the typical
     recommended way for importing FED3 data.  Relies mostly
     on `pandas.read_csv()` and `pandas.read_excel()` for the parsing.
 
+    For CSV files, the data types of standard FED3 columns (see `FED3_DTYPES`)
+    and the format of the timestamps (see `TIMESTAMP_FORMATS`) are
+    provided to pandas, rather than being inferred.  When these
+    do not match the data, pandas falls back to inferring them.
+
+    Compressed CSV files (e.g. `'FED001.csv.gz'`, see `COMPRESSIONS`) are
+    decompressed as they are read.  Zip or tar files must contain a single
+    file; use `load_archive()` for archives with several.
+
     Parameters
     ----------
     path : str
@@ -189,35 +904,357 @@ def load(path, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
     deduplicate_index, offset, reset_counts, reset_columns: optional
         Arguments passed to `fed3.FEDFrame.deduplicate_index()`, used
         to remove duplicate timestamps as the data are loaded.
+    engine : str, optional
+        Parser engine passed to `pandas.read_csv()`.  The default is None,
+        which uses the pandas default.  `'pyarrow'` can be faster for
+        large files, but requires the pyarrow package to be installed.
+    date_format : str, optional
+        `strftime` format of the timestamps.  The default is None, in which
+        case each of `TIMESTAMP_FORMATS` is tried.
+    cache : bool, optional
+        Read the data from (and store the data in) the on-disk cache.
+        The default is None, in which case the cache is used when it has
+        been turned on with `fed3.cache.enable()`.  See `fed3.cache`.
+    chunksize : int, optional
+        Read CSV files this many lines at a time, to limit the memory used
+        while loading.  The default is None, in which case the file is read
+        at once.  Each chunk is cleaned as it is read (see
+        `fed3.core.stream.iter_load()`) and copied into the final FEDFrame;
+        the `'interpolate'` method for `deduplicate_index` is not available.
+    compact : bool, optional
+        Store columns with smaller data types (small integers, categoricals,
+        and 32-bit floats), which can greatly reduce memory usage.
+        The default is False.  See `fed3.core.fedframe.FEDFrame.compact()`.
+    lazy : bool, optional
+        Return a `fed3.core.lazy.LazyFEDFrame`, which only loads the data
+        (with the other arguments given here) when they are first used.
+        The default is False.
+    columns : list-like, optional
+        Only load these columns (along with the timestamps), which is faster
+        and uses less memory.  The default is None, in which case all
+        columns are loaded.  Names of the skipped columns are stored in
+        the `skipped_columns` attribute; accessing them raises a KeyError.
+    metrics : str or list-like, optional
+        Only load the columns needed for these metrics (see
+        `fed3.metrics.list_metrics()` and
+        `fed3.metrics.core.required_columns()`), in addition to any `columns`.
+        The default is None.
+
+    Raises
+    ------
+    ValueError
+        `chunksize` used for a file which is not CSV, or `columns` which
+        are not in the file.
 
     Returns
     -------
-    f : fed3.FEDFrame
+    f : fed3.FEDFrame or fed3.core.lazy.LazyFEDFrame
         New FEDFrame object.
 
     '''
-    # read the path
-    name, ext = os.path.splitext(path)
-    ext = ext.lower()
-
-    read_opts = {'.csv':pd.read_csv, '.xlsx':pd.read_excel}
-    func = read_opts[ext]
-    feddata = func(path,
-                   parse_dates=True,
-                   index_col=index_col)
-    if dropna:
-        feddata = feddata.dropna(how='all')
-
-    name = os.path.basename(name)
-    f = FEDFrame(feddata)
-    f._load_init(name=name,
-                 path=path,
-                 deduplicate_index=deduplicate_index,
-                 offset=offset,
-                 reset_counts=reset_counts,
-                 reset_columns=reset_columns)
+    if lazy:
+        return LazyFEDFrame(path,
+                            index_col=index_col,
+                            dropna=dropna,
+                            deduplicate_index=deduplicate_index,
+                            offset=offset,
+                            reset_counts=reset_counts,
+                            reset_columns=reset_columns,
+                            engine=engine,
+                            date_format=date_format,
+                            cache=cache,
+                            chunksize=chunksize,
+                            compact=compact,
+                            columns=columns,
+                            metrics=metrics)
+
+    name, ext, _ = _split_path(path)
+    if chunksize is not None and ext != '.csv':
+        raise ValueError('`chunksize` can only be used with CSV files.')
+
+    def read(select):
+        if ext != '.csv':
+            read_opts = {'.xlsx':pd.read_excel}
+            func = read_opts[ext]
+            feddata = func(path,
+                           parse_dates=True,
+                           index_col=index_col)
+            usecols, _ = select(feddata.columns)
+            return feddata if usecols is None else feddata[usecols]
+
+        usecols, reset = select(_read_csv_header(path))
+        if chunksize is not None:
+            from fed3.core.stream import _load_chunked
+            return _load_chunked(path, chunksize,
+                                 index_col=index_col,
+                                 dropna=dropna,
+                                 deduplicate_index=deduplicate_index,
+                                 offset=offset,
+                                 reset_counts=reset_counts,
+                                 reset_columns=reset,
+                                 engine=engine,
+                                 date_format=date_format,
+                                 usecols=usecols)
+        return _read_fed3_csv(path,
+                              index_col=index_col,
+                              engine=engine,
+                              date_format=date_format,
+                              usecols=usecols)
+
+    return _load_fed3(read,
+                      name=os.path.basename(name),
+                      path=path,
+                      index_col=index_col,
+                      dropna=dropna,
+                      deduplicate_index=deduplicate_index,
+                      offset=offset,
+                      reset_counts=reset_counts,
+                      reset_columns=reset_columns,
+                      date_format=date_format,
+                      cache=cache,
+                      compact=compact,
+                      columns=columns,
+                      metrics=metrics)
+
+def load_archive(path, pattern='*.csv', workers=None, executor='process',
+                 errors='warn', return_errors=False,
+                 index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+                 deduplicate_index=None, offset='1S', reset_counts=False,
+                 reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+                 **kwargs):
+    '''
+    Load the FED3 CSV files within a zip or tar archive (including
+    compressed tar files, e.g. `'.tar.gz'`), optionally in parallel.  Each
+    file is decompressed as it is read, without being extracted to disk.
 
-    return f
+    As for `load_many()`, calls using `executor='process'` in scripts
+    should be placed under an `if __name__ == '__main__':` guard on
+    Windows and macOS.
+
+    Parameters
+    ----------
+    path : str
+        System path to the archive.
+    pattern : str, optional
+        Glob pattern for the names of the files to load (ignoring any folders
+        within the archive, and case).  The default is `'*.csv'`.
+    workers, executor, errors, return_errors : optional
+        Options for loading many files, as for `load_many()`.
+    index_col, dropna, deduplicate_index, offset, reset_counts, reset_columns: optional
+        Arguments passed to `fed3.core.fedfuncs.load()`.
+    **kwargs : optional
+        Other keyword arguments for `fed3.core.fedfuncs.load()`: `engine`,
+        `date_format`, `cache`, `compact`, `columns`, and `metrics`.
+
+    Raises
+    ------
+    ValueError
+        `path` is not an archive, or unrecognized option for `executor`
+        or `errors`.
+
+    Returns
+    -------
+    feds : list
+        Loaded FEDFrames, in order of their names within the archive.  The
+        `path` of each is the archive path joined with the name of the file.
+        Files which failed to load are omitted.
+    failed : dict
+        Only returned when `return_errors` is True.  Maps the names of
+        files which failed to load to the exception raised.
+
+    '''
+    if errors not in ['raise', 'warn', 'ignore']:
+        raise ValueError('`errors` must be "ignore", "warn", or "raise"')
+
+    members = _archive_members(path, pattern)
+    kwargs.update(index_col=index_col,
+                  dropna=dropna,
+                  deduplicate_index=deduplicate_index,
+                  offset=offset,
+                  reset_counts=reset_counts,
+                  reset_columns=reset_columns)
+    jobs = [(path, member, kwargs) for member in members]
+    results = _run_jobs(_load_member_job, jobs, workers=workers, executor=executor)
+
+    feds = []
+    failed = {}
+    for member, (fed, error) in zip(members, results):
+        if error is None:
+            feds.append(fed)
+            continue
+        failed[member] = error
+        if errors == 'raise':
+            raise error
+        elif errors == 'warn':
+            warnings.warn(f'Unable to load "{member}" from "{path}": {error!r}',
+                          RuntimeWarning)
+
+    return (feds, failed) if return_errors else feds
+
+def load_many(paths, workers=None, executor='process', errors='warn',
+              return_errors=False, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+              deduplicate_index=None, offset='1S', reset_counts=False,
+              reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+              **kwargs):
+    '''
+    Load many FED3 data files, optionally in parallel.  Each file is
+    loaded with `fed3.core.fedfuncs.load()`.
+
+    When using `executor='process'` on platforms which spawn new processes
+    (Windows and macOS), calls to this function in scripts should be placed
+    under an `if __name__ == '__main__':` guard.
+
+    Parameters
+    ----------
+    paths : str or list-like
+        Files to load.  Can be a list of paths, a path to a directory
+        (in which case all CSV/Excel files in the directory are loaded), or a
+        glob pattern (e.g. `'/data/cohort1/*.CSV'`).  Directory and glob
+        matches are loaded in sorted order.
+    workers : int, optional
+        Number of workers used to load the files.  The default is None,
+        in which case the number of CPUs is used.  Use 1 to load files
+        serially, without creating any workers.
+    executor : str, optional
+        Use `'process'` (default) for a pool of processes, or `'thread'` for
+        a pool of threads.
+    errors : str, optional
+        Protocol for files which fail to load.  The default is 'warn',
+        which shows a warning for each failed file.  'ignore' will skip
+        failed files silently, while 'raise' will raise the first error
+        encountered.  In all cases, the remaining files are still loaded.
+    return_errors : bool, optional
+        When True, also return a dictionary mapping the paths of files
+        which failed to load to the exception raised.  The default is False.
+    index_col, dropna, deduplicate_index, offset, reset_counts, reset_columns: optional
+        Arguments passed to `fed3.core.fedfuncs.load()`.
+    **kwargs : optional
+        Other keyword arguments passed to `fed3.core.fedfuncs.load()`.
+
+    Raises
+    ------
+    ValueError
+        Unrecognized option for `executor` or `errors`.
+
+    Returns
+    -------
+    feds : list
+        Loaded FEDFrames, in the order of `paths`.  Files which failed to
+        load are omitted.
+    failed : dict
+        Only returned when `return_errors` is True.
+
+    '''
+    if errors not in ['raise', 'warn', 'ignore']:
+        raise ValueError('`errors` must be "ignore", "warn", or "raise"')
+
+    paths = _expand_paths(paths)
+    kwargs.update(index_col=index_col,
+                  dropna=dropna,
+                  deduplicate_index=deduplicate_index,
+                  offset=offset,
+                  reset_counts=reset_counts,
+                  reset_columns=reset_columns)
+    jobs = [(path, kwargs) for path in paths]
+    results = _run_jobs(_load_job, jobs, workers=workers, executor=executor)
+
+    feds = []
+    failed = {}
+    for path, (fed, error) in zip(paths, results):
+        if error is None:
+            feds.append(fed)
+            continue
+        failed[path] = error
+        if errors == 'raise':
+            raise error
+        elif errors == 'warn':
+            warnings.warn(f'Unable to load "{path}": {error!r}', RuntimeWarning)
+
+    return (feds, failed) if return_errors else feds
+
+def meal_sweep(feds, intervals=(1,), minimums=(1,)):
+    '''
+    Summarize meals for every combination of meal parameters, i.e. the
+    `intermeal_interval` and `pellet_minimum` of `FEDFrame.meals()`.
+
+    The interpellet intervals of each FEDFrame are computed once; each
+    combination of parameters is then evaluated with array operations,
+    without reassigning meals.  The results match
+    `FEDFrame.meal_table()` for the same parameters.
+
+    Parameters
+    ----------
+    feds : fed3.FEDFrame or list of such
+        FED3 data to find meals for.
+    intervals : list-like of numbers, optional
+        Values for the `intermeal_interval` (in minutes). The default is (1,).
+    minimums : list-like of ints, optional
+        Values for the `pellet_minimum`. The default is (1,).
+
+    Returns
+    -------
+    sweep : pandas.DataFrame
+        Long-form table with one row per FEDFrame and combination of
+        parameters.  Columns are `'fed'` (the name of the FEDFrame),
+        `'intermeal_interval'`, `'pellet_minimum'`, `'meals'` (number of
+        meals), `'pellets'` (number of pellets in meals), `'mean_pellets'`,
+        `'mean_duration'`, and `'mean_intermeal_interval'` (the latter two
+        in minutes; NaN when there are too few meals).
+
+    '''
+    if isinstance(feds, (FEDFrame, LazyFEDFrame)):
+        feds = [feds]
+    intervals = np.asarray(intervals, dtype=np.float64).ravel()
+    minimums = np.asarray(minimums, dtype=np.float64).ravel()
+
+    columns = ['fed', 'intermeal_interval', 'pellet_minimum', 'meals', 'pellets',
+               'mean_pellets', 'mean_duration', 'mean_intermeal_interval']
+    parts = {col: [] for col in columns}
+    nmin = len(minimums)
+    for fed in feds:
+        ipi = fed.interpellet_intervals(condense=True)
+        times = ipi.index.values.astype('datetime64[ns]').view(np.int64)
+        if len(times):
+            times = (times - times[0]) / 6e10
+        ipi = ipi.to_numpy(dtype=np.float64)
+
+        for interval in intervals:
+            starts, ends = _meal_bounds(ipi, interval)
+            sizes = ends - starts + 1
+            t_start, t_end = times[starts], times[ends]
+
+            # one row for each minimum, one column for each candidate meal
+            keep = sizes[None, :] >= minimums[:, None]
+            meals = keep.sum(axis=1)
+            pellets = (keep * sizes).sum(axis=1)
+            duration = (keep * (t_end - t_start)).sum(axis=1)
+
+            # the gaps between kept meals sum to the kept start times,
+            # less the first, minus the kept end times, less the last
+            gaps = np.full(nmin, np.nan)
+            multiple = meals > 1
+            if multiple.any():
+                first = keep.argmax(axis=1)
+                last = keep.shape[1] - 1 - keep[:, ::-1].argmax(axis=1)
+                total = ((keep * t_start).sum(axis=1) - t_start[first]
+                         - (keep * t_end).sum(axis=1) + t_end[last])
+                gaps[multiple] = total[multiple] / (meals[multiple] - 1)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                parts['mean_pellets'].append(np.where(meals > 0, pellets / meals, np.nan))
+                parts['mean_duration'].append(np.where(meals > 0, duration / meals, np.nan))
+            parts['fed'].append(np.full(nmin, fed.name, dtype=object))
+            parts['intermeal_interval'].append(np.full(nmin, interval))
+            parts['pellet_minimum'].append(minimums)
+            parts['meals'].append(meals)
+            parts['pellets'].append(pellets)
+            parts['mean_intermeal_interval'].append(gaps)
+
+    if not parts['fed']:
+        return pd.DataFrame(columns=columns)
+    sweep = pd.DataFrame({col: np.concatenate(parts[col]) for col in columns})
+    sweep['pellet_minimum'] = sweep['pellet_minimum'].astype(int)
+    return sweep
 
 def screen_mixed_alignment(feds, option='raise'):
     '''
@@ -263,9 +1300,10 @@ def screen_mixed_alignment(feds, option='raise'):
     return alignment
 
 def split(fed, dates, reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
-          return_empty=False, tag_name=True):
+          return_empty=False, tag_name=True, copy=True):
     '''
     Split one FEDFrame into a multiple based on one or more dates.
+    See `split_by()` for splitting at regular intervals.
 
     Parameters
     ----------
@@ -275,11 +1313,17 @@ def split(fed, dates, reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_P
         Timestamp(s) to split the data on.
     reset_columns : list-like, optional
         Columns whose cumulative totals should be reset when splitting the data.
-        The default is ('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count').
+        Each new FEDFrame counts from the start of its data (i.e. the
+        maximum before it is subtracted).  The default is
+        ('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count').
     return_empty : bool, optional
         Return empty FEDFrames created from splitting. The default is False.
     tag_name : bool, optional
         Add a `'_#'` tag to the name of each new FEDFrame. The default is True.
+    copy : bool, optional
+        Copy the data of each new FEDFrame. The default is True.  When False,
+        the new FEDFrames are shallow copies of slices of `fed`, which share
+        the data of the columns which are not reset.
 
     Returns
     -------
@@ -288,31 +1332,62 @@ def split(fed, dates, reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_P
 
     '''
     dates = _split_handle_dates(dates)
-    output = []
-    offsets = {col: 0 for col in reset_columns}
-    og_name = fed.name
-    for i in range(len(dates[:-1])):
-        start = dates[i]
-        end = dates[i+1]
-        subset = fed[(fed.index >= start) &
-                     (fed.index < end)].copy()
-        if tag_name:
-            subset.name = f"{og_name}_{i}"
-        if not return_empty and subset.empty:
-            continue
-        if offsets:
-            for col in reset_columns:
-                subset[col] -= offsets[col]
-                offsets[col] = subset[col].max()
-        output.append(subset)
-    return output
+    fed = fed._applied_alignment()
+    subsets = _crop_windows(fed, dates[:-1], dates[1:], reset_columns, copy=copy)
+    return _tag_windows(subsets, fed.name, return_empty, tag_name)
+
+def split_by(fed, freq='1D',
+             reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+             return_empty=False, tag_name=True, copy=True):
+    '''
+    Split one FEDFrame at regular intervals, or at each change of the
+    light cycle.  All boundaries are computed up front and found in one
+    binary search.
+
+    Parameters
+    ----------
+    fed : fed3.FEDFrame
+        FED3 data.
+    freq : str, optional
+        A fixed pandas frequency string (e.g. '1D' or '12H'), 'lightcycle'
+        to split each time lights turn on or off (see
+        `fed3.lightcycle.LIGHTCYCLE`), or 'mode' to split each time the mode
+        or FR ratio changes (see
+        `fed3.core.fedframe.FEDFrame.mode_segments()`).  The default is
+        '1D'.  Windows start at the first timestamp of the data, rounded
+        down to the frequency (or at the last change of the light cycle
+        before it).
+    reset_columns, return_empty, tag_name, copy : optional
+        See `split()`.
+
+    Returns
+    -------
+    output : list
+        List of FED3 objects created by split.
+
+    '''
+    fed = fed._applied_alignment()
+    if fed.empty:
+        return []
+    start, end = fed.start_time, fed.end_time
+    if freq == 'lightcycle':
+        edges = _lightcycle_edges(start, end)
+    elif freq == 'mode':
+        starts = pd.DatetimeIndex(fed.mode_segments()['start'])
+        edges = starts.append(pd.DatetimeIndex([end + pd.Timedelta(1, 'ns')]))
+    else:
+        step = pd.tseries.frequencies.to_offset(freq)
+        edges = pd.date_range(start.floor(freq), end.floor(freq) + step, freq=step)
+
+    subsets = _crop_windows(fed, edges[:-1], edges[1:], reset_columns, copy=copy)
+    return _tag_windows(subsets, fed.name, return_empty, tag_name)
 
 def timecrop(fed, start, end,
              reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
-             name=None):
+             name=None, copy=True):
     '''
     Return a new FEDFrame cropped in time to only include data between two
-    dates.
+    dates.  See `crop_many()` for cropping several FEDFrames or windows.
 
     Parameters
     ----------
@@ -327,6 +1402,10 @@ def timecrop(fed, start, end,
         The default is ('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count').
     name : str, optional
         Name for the new FEDFrame produced. The default is None.
+    copy : bool, optional
+        Copy the data of the new FEDFrame. The default is True.  When False,
+        the new FEDFrame is a shallow copy of a slice of `fed`, which shares
+        the data of the columns which are not reset.
 
     Returns
     -------
@@ -335,12 +1414,8 @@ def timecrop(fed, start, end,
 
     '''
 
-    prior = fed[(fed.index < start)]
-    newfed = fed[(fed.index >= start) &
-                 (fed.index < end)].copy()
-    for col in reset_columns:
-        if not prior.empty:
-            newfed[col] -= prior[col].max()
+    fed = fed._applied_alignment()
+    newfed = _crop_windows(fed, [start], [end], reset_columns, copy=copy)[0]
 
     if name is not None:
         newfed.name = name
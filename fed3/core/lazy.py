@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module defines the LazyFEDFrame, a placeholder for FED3 data which
+is only loaded when it is needed.  LazyFEDFrames are created with
+`fed3.core.fedfuncs.load(..., lazy=True)`.
+"""
+
+__all__ = ['LazyFEDFrame',
+           'LAZY']
+
+from collections import OrderedDict
+import os
+import warnings
+import weakref
+
+LAZY = {'max_memory': None}
+'''Dictionary of settings for LazyFEDFrames.  `'max_memory'` is the maximum
+total size (in bytes) of loaded data to keep for all LazyFEDFrames; when
+it is exceeded, the least recently used data are dropped (and loaded again
+if needed).  The default is None, in which case data are always kept.'''
+
+_LOADED = OrderedDict()
+
+_PROXY_ATTRS = ('path', 'name', '_load_kwargs', '_fed', '_peeked')
+
+# ---- "Private"
+
+def _evict(keep):
+    '''Drop the data of the least recently used LazyFEDFrames (other than
+    `keep`) until the loaded data fit within `LAZY['max_memory']`.'''
+    max_memory = LAZY['max_memory']
+    if max_memory is None:
+        return
+    total = sum(size for _, size in _LOADED.values())
+    for key in list(_LOADED):
+        if total <= max_memory:
+            break
+        ref, size = _LOADED[key]
+        proxy = ref()
+        if proxy is keep:
+            continue
+        if proxy is not None:
+            proxy._fed = None
+        del _LOADED[key]
+        total -= size
+
+# ---- Public
+
+class LazyFEDFrame:
+    '''Placeholder for the FED3 data in one file, which is loaded the
+    first time it is needed.
+
+    The `name`, `path`, `start_time`, `end_time`, `duration`, and `fedmode`
+    are available without loading the data; the times and mode are
+    read from the first and last rows of the file (before any removal of
+    duplicate timestamps).  Accessing anything else (e.g. selecting columns,
+    or calling FEDFrame methods) loads the data with
+    `fed3.core.fedfuncs.load()`, and then acts on the loaded
+    `fed3.core.fedframe.FEDFrame`.  Lazy data can generally be passed to
+    `fed3.metrics` and `fed3.plot` in place of FEDFrames.
+
+    The loaded data are kept for later use.  If `LAZY['max_memory']` is
+    set, data are dropped from the least recently used LazyFEDFrames to stay
+    within it; note that changes made to dropped data (e.g. with
+    `set_alignment()`) are lost when they are loaded again.'''
+
+    def __init__(self, path, **kwargs):
+        from fed3.core.fedfuncs import _split_path
+        self.path = path
+        self.name = os.path.basename(_split_path(path)[0])
+        self._load_kwargs = kwargs
+        self._fed = None
+        self._peeked = None
+
+    def __getattr__(self, attr):
+        if attr in _PROXY_ATTRS or attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.fed, attr)
+
+    def __contains__(self, key):
+        return key in self.fed
+
+    def __getitem__(self, key):
+        return self.fed[key]
+
+    def __iter__(self):
+        return iter(self.fed)
+
+    def __len__(self):
+        return len(self.fed)
+
+    def __repr__(self):
+        status = 'loaded' if self.loaded else 'not loaded'
+        return f'{type(self).__name__}(name={self.name!r}, path={self.path!r}, {status})'
+
+    def __setitem__(self, key, value):
+        self.fed[key] = value
+
+    @property
+    def _alignment(self):
+        return self._fed._alignment if self.loaded else 'datetime'
+
+    @property
+    def _peek(self):
+        '''FEDFrame with the first and last rows of the data.'''
+        if self.loaded:
+            return self._fed
+        if self._peeked is None:
+            from fed3.core.fedfuncs import _peek_fed3_csv
+            if os.path.splitext(self.path)[1].lower() != '.csv':
+                return self.fed
+            kwargs = {k: v for k, v in self._load_kwargs.items()
+                      if k in ['index_col', 'dropna', 'date_format']}
+            self._peeked = _peek_fed3_csv(self.path, **kwargs)
+        return self._peeked
+
+    @property
+    def duration(self):
+        """Time delta of last timestamp and first timestamp."""
+        return self.end_time - self.start_time
+
+    @property
+    def end_time(self):
+        """Last timestamp in file."""
+        return self._peek.end_time
+
+    @property
+    def fed(self):
+        '''The loaded data, as a `fed3.core.fedframe.FEDFrame`.  The data
+        are loaded if needed.'''
+        key = id(self)
+        if self._fed is None:
+            from fed3.core.fedfuncs import load
+            fed = load(self.path, **self._load_kwargs)
+            self._fed = fed
+            size = fed.memory_usage(deep=True).sum()
+            ref = weakref.ref(self, lambda r, key=key: _LOADED.pop(key, None))
+            _LOADED[key] = (ref, size)
+            _evict(keep=self)
+        elif key in _LOADED:
+            _LOADED.move_to_end(key)
+
+        self._fed.name = self.name
+        return self._fed
+
+    @property
+    def fedmode(self):
+        '''FED3 operating mode for this data.'''
+        if self.loaded:
+            return self._fed.fedmode
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            return self._peek.determine_mode()
+
+    @property
+    def loaded(self):
+        '''Whether the data are currently loaded.'''
+        return self._fed is not None
+
+    @property
+    def start_time(self):
+        '''First timestamp in file.'''
+        return self._peek.start_time
+
+    def unload(self):
+        '''
+        Drop the loaded data, if any.  They will be loaded again when needed.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._fed = None
+        _LOADED.pop(id(self), None)
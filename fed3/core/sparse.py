@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module defines SparseCounts, a compact form of the cumulative count
+columns of FED3 data ('Pellet_Count', 'Left_Poke_Count', and
+'Right_Poke_Count').  These columns only change when there is an event, so
+only the rows where they change are stored.  SparseCounts are created with
+`fed3.core.fedframe.FEDFrame.to_sparse()`.
+"""
+
+__all__ = ['SparseCounts']
+
+import numpy as np
+import pandas as pd
+
+from fed3.core.fedframe import FEDFrame
+
+# ---- "Private"
+
+def _change_points(values):
+    '''Return the positions where an array differs from its previous value
+    (including the first position).  Missing values are treated as equal
+    to each other.'''
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    na = pd.isna(values)
+    changed = values[1:] != values[:-1]
+    changed = (changed & ~(na[1:] & na[:-1])) | (na[1:] != na[:-1])
+    return np.concatenate([[0], np.flatnonzero(changed) + 1]).astype(np.int64)
+
+# ---- Public
+
+class SparseCounts:
+    '''Change-point form of cumulative FED3 count columns.
+
+    For each column, the positions of the rows where the value changes are
+    stored with the new values, so long periods without events (e.g. rows
+    which only log the battery) take no space.  The timestamps of all
+    rows are kept, so that the dense columns can be recreated with
+    `to_dense()`.
+
+    Lookups use binary search over the change points:
+
+    - `at()`: value of a column as of a time
+    - `count()`: number of events (total increase of a column) within a
+    time range, matching the binned sums of `fed3.metrics` (e.g.
+    `'binary_pellets'`)
+    - `changes()`: the changed values, as a Series
+
+    The timestamps must be sorted.'''
+
+    __slots__ = ('name', 'index', 'columns', 'length', '_points', '_values',
+                 '_times', '_totals')
+
+    def __init__(self, index, data, first=None, name=None):
+        '''
+        Create SparseCounts from dense data.  Typically, use
+        `fed3.core.fedframe.FEDFrame.to_sparse()` instead.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Sorted timestamps of the rows.
+        data : dict
+            Dictionary mapping column names to arrays of their values.
+        first : dict, optional
+            Dictionary mapping column names to the number of events
+            counted in the first row (e.g. 1 if the first row is a pellet
+            for 'Pellet_Count').  The default is None, in which case none
+            are counted.
+        name : str, optional
+            Name of the data. The default is None.
+
+        Raises
+        ------
+        ValueError
+            The index is not datetime, or not sorted.
+
+        Returns
+        -------
+        None.
+
+        '''
+        if not isinstance(index, pd.DatetimeIndex):
+            raise ValueError('SparseCounts require a datetime index.')
+        if not index.is_monotonic_increasing:
+            raise ValueError('SparseCounts require sorted timestamps.')
+        first = {} if first is None else first
+
+        self.name = name
+        self.index = index
+        self.columns = list(data)
+        self.length = len(index)
+        self._points = {}
+        self._values = {}
+        self._times = {}
+        self._totals = {}
+        times = index.values.astype('datetime64[ns]').view(np.int64)
+        for col, values in data.items():
+            values = np.asarray(values)
+            points = _change_points(values)
+            self._points[col] = points
+            self._values[col] = values[points]
+            self._times[col] = times[points]
+            steps = np.diff(self._values[col].astype(np.float64), prepend=np.nan)
+            if len(steps):
+                steps[0] = first.get(col, 0)
+            totals = np.nancumsum(steps)
+            if np.issubdtype(values.dtype, np.integer):
+                totals = totals.astype(np.int64)
+            self._totals[col] = totals
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        points = ', '.join(f'{col}: {len(self._points[col])}' for col in self.columns)
+        return (f'{type(self).__name__}(name={self.name!r}, rows={self.length}, '
+                f'change points={{{points}}})')
+
+    def _column(self, column):
+        if column not in self._points:
+            raise KeyError(f'"{column}" is not in the SparseCounts; '
+                           f'columns are {self.columns}')
+        return column
+
+    def _total_before(self, column, time):
+        '''Total of events before (not including) `time`.'''
+        k = np.searchsorted(self._times[column], self._ns(time), side='left')
+        totals = self._totals[column]
+        return np.where(k > 0, totals[np.maximum(k - 1, 0)] if len(totals) else 0, 0)
+
+    @staticmethod
+    def _ns(time):
+        '''Convert one or more times to int64 nanoseconds.'''
+        if np.ndim(time):
+            return pd.DatetimeIndex(time).values.astype('datetime64[ns]').view(np.int64)
+        return pd.Timestamp(time).value
+
+    @property
+    def nbytes(self):
+        '''Number of bytes used by the stored arrays (including the index).'''
+        arrays = [self._points, self._values, self._times, self._totals]
+        return self.index.nbytes + sum(a.nbytes for d in arrays for a in d.values())
+
+    def at(self, time, column='Pellet_Count'):
+        '''
+        Return the value of a column as of a time, i.e. the value of the
+        last row at or before the time.
+
+        Parameters
+        ----------
+        time : datetime str or object, or list-like of such
+            Time(s) to look up.
+        column : str, optional
+            Column to look up. The default is 'Pellet_Count'.
+
+        Returns
+        -------
+        scalar or numpy.ndarray
+            Value(s) of the column.  NaN for times before the first row.
+
+        '''
+        column = self._column(column)
+        k = np.searchsorted(self._times[column], self._ns(time), side='right') - 1
+        values = self._values[column]
+        if not len(values):
+            return np.full(np.shape(k), np.nan) if np.ndim(k) else np.nan
+        out = np.where(k >= 0, values[np.maximum(k, 0)], np.nan)
+        return out if np.ndim(out) else out.item()
+
+    def changes(self, column='Pellet_Count'):
+        '''
+        Return the rows where a column changes.
+
+        Parameters
+        ----------
+        column : str, optional
+            Column to return. The default is 'Pellet_Count'.
+
+        Returns
+        -------
+        pandas.Series
+            Values of the column where it changes (including the first row),
+            indexed by their timestamps.
+
+        '''
+        column = self._column(column)
+        return pd.Series(self._values[column], index=self.index[self._points[column]],
+                         name=column)
+
+    def count(self, start=None, end=None, column='Pellet_Count'):
+        '''
+        Return the number of events for a column within a time range, i.e.
+        the total increase of the column (including the first row, when it
+        is an event of that column).
+
+        Parameters
+        ----------
+        start : datetime str or object, or list-like of such, optional
+            Start of the range (inclusive). The default is None, in which
+            case events from the start of the data are counted.
+        end : datetime str or object, or list-like of such, optional
+            End of the range (exclusive). The default is None, in which
+            case events up to the end of the data are counted.
+        column : str, optional
+            Column to count. The default is 'Pellet_Count'.
+
+        Returns
+        -------
+        scalar or numpy.ndarray
+            Number of events in each range.
+
+        '''
+        column = self._column(column)
+        totals = self._totals[column]
+        total = totals[-1] if len(totals) else 0
+        before_end = total if end is None else self._total_before(column, end)
+        before_start = 0 if start is None else self._total_before(column, start)
+        out = np.asarray(before_end - before_start)
+        return out if out.ndim else out.item()
+
+    def to_dense(self):
+        '''
+        Recreate the dense count columns.
+
+        Returns
+        -------
+        fed3.FEDFrame
+            FEDFrame with the stored columns, with one row per timestamp.
+
+        '''
+        data = {}
+        for col in self.columns:
+            lengths = np.diff(np.append(self._points[col], self.length))
+            data[col] = np.repeat(self._values[col], lengths)
+        fed = FEDFrame(data, index=self.index)
+        fed.name = self.name
+        return fed
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module defines tools for reading FED3 data incrementally, either for
+files which are still being written by a device, or for files too large
+to parse at once.
+"""
+
+__all__ = ['FEDFollower',
+           'follow',
+           'iter_load']
+
+import csv
+import io
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from fed3.core.fedframe import FEDFrame, _offset_duplicates
+from fed3.core.fedfuncs import _iter_fed3_csv, _read_fed3_csv, _split_path
+
+# ---- "Private"
+
+class _CountReset:
+    '''Incremental version of `fed3.FEDFrame.reset_cumulative_column()`,
+    for one column.  Values are factorized in order of appearance across
+    all slices, and offset by the first value of the column.'''
+
+    def __init__(self):
+        self.base = None
+        self.codes = {}
+        self.uniques = []
+        self.counts = []
+
+    def add(self, values):
+        '''Return the reset values for new rows.'''
+        values = np.asarray(values)
+        if self.base is None and len(values):
+            self.base = values[0]
+        local, uniques = pd.factorize(values)
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, value in enumerate(uniques):
+            code = self.codes.get(value)
+            if code is None:
+                code = len(self.counts)
+                self.codes[value] = code
+                self.uniques.append(value)
+                self.counts.append(0)
+            mapping[i] = code
+        seen = local >= 0
+        for code, n in zip(mapping, np.bincount(local[seen], minlength=len(uniques))):
+            self.counts[code] += n
+
+        reset = np.full(len(values), -1, dtype=np.int64)
+        reset[seen] = mapping[local[seen]]
+        return reset + self.base
+
+    def remove(self, reset_values):
+        '''Forget rows which were previously added (by their reset values).'''
+        if self.base is None:
+            return
+        for code in np.asarray(reset_values) - self.base:
+            if code >= 0:
+                self.counts[int(code)] -= 1
+        while self.counts and self.counts[-1] == 0:
+            self.counts.pop()
+            del self.codes[self.uniques.pop()]
+        if not self.counts:
+            self.base = None
+
+class _StreamCleaner:
+    '''Applies the cleaning of `fed3.FEDFrame._load_init()` to consecutive
+    slices of one file.  Duplicate timestamps are checked against the end
+    of the previous slice, and counts are reset continuously across slices.
+    Assumes the data are in time order.'''
+
+    def __init__(self, name=None, path=None, deduplicate_index=None,
+                 offset='1S', reset_counts=False,
+                 reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count')):
+        methods = [None, 'keep_first', 'keep_last', 'remove', 'offset', 'stable_ns']
+        if deduplicate_index not in methods:
+            raise ValueError(f'`deduplicate_index` must be one of {methods} '
+                             f'when reading data incrementally, not '
+                             f'"{deduplicate_index}"')
+        self.name = name
+        self.path = path
+        self.method = deduplicate_index
+        self.offset = pd.to_timedelta('1ns' if deduplicate_index == 'stable_ns' else offset)
+        self.resets = {}
+        if reset_counts and deduplicate_index is not None:
+            self.resets = {col: _CountReset() for col in reset_columns}
+        self.raw_tail = None
+        self.tail = None
+        self.warned = False
+
+    def clean(self, data):
+        '''Clean a new slice of raw data.  Returns a tuple of the number of
+        previously returned rows which should be removed (from the end),
+        and a FEDFrame of the cleaned new rows.'''
+        new = FEDFrame(data)
+        new.name = self.name
+        new.path = self.path
+        new._fix_column_names()
+        new._handle_retrieval_time()
+        new._alignment = 'datetime'
+        new._current_offset = pd.Timedelta(0)
+        new._lazy_offset = pd.Timedelta(0)
+        if new.empty:
+            return 0, new
+
+        raw = new.index
+        raw_all = raw if self.raw_tail is None else self.raw_tail.append(raw)
+        k = len(raw_all) - len(raw)
+        retract = 0
+
+        if self.method is None:
+            if not self.warned and raw_all.duplicated().any():
+                self.warned = True
+                warnings.warn("Index has duplicate values, which may prevent some "
+                              "fed3 operations.  Use the deuplicate_index() method "
+                              "to remove duplicate timestamps.", RuntimeWarning)
+        elif self.method in ['offset', 'stable_ns']:
+            tail = self.tail.index if self.tail is not None else raw[:0]
+            index = tail.append(raw)
+            k = len(tail)
+            shifted = _offset_duplicates(index, self.offset)
+            if shifted is not index:
+                new.index = shifted[k:].values
+        else:
+            keep = {'keep_first': 'first', 'keep_last': 'last', 'remove': False}
+            mask = ~ raw_all.duplicated(keep=keep[self.method])
+            if self.method != 'keep_first' and self.tail is not None:
+                retract = int(self.tail.index.isin(raw).sum())
+            new = new[mask[k:]]
+
+        # column resetting
+        if retract:
+            for col, state in self.resets.items():
+                state.remove(self.tail[col].values[-retract:])
+        for col, state in self.resets.items():
+            new[col] = state.add(new[col].values)
+
+        # remember the end of the data, for the next slice
+        last = raw_all[-1]
+        self.raw_tail = raw_all[_trailing(raw_all == last)]
+        previous = self.tail if self.tail is not None else new.iloc[:0]
+        if retract:
+            previous = previous.iloc[:-retract]
+        tail = _trailing(new.index >= last)
+        if tail.all() and len(previous):
+            new_tail = pd.concat([previous, new])
+            self.tail = new_tail[_trailing(new_tail.index >= last)]
+        else:
+            self.tail = new[tail]
+
+        return retract, new
+
+class _MixedTimestamps(ValueError):
+    '''Raised when some chunks of a file have timestamps which can be
+    parsed as dates, and others do not.'''
+
+def _count_lines(path):
+    '''Return an upper bound on the number of data rows in a CSV file.'''
+    n = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            n += block.count(b'\n')
+    return n + 1
+
+def _iter_clean(path, chunksize, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+                deduplicate_index=None, offset='1S', reset_counts=False,
+                reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+                engine=None, date_format=None, parse_dates=True, usecols=None):
+    '''Generator for `iter_load()`.  Each cleaned chunk is held back until
+    the next one is read, since removing duplicates may drop its last rows.'''
+    name = os.path.basename(_split_path(path)[0])
+    cleaner = _StreamCleaner(name=name, path=path,
+                             deduplicate_index=deduplicate_index,
+                             offset=offset,
+                             reset_counts=reset_counts,
+                             reset_columns=reset_columns)
+    pending = None
+    is_datetime = None
+    for data in _iter_fed3_csv(path, chunksize,
+                               index_col=index_col,
+                               engine=engine,
+                               date_format=date_format,
+                               usecols=usecols,
+                               parse_dates=parse_dates):
+        if dropna:
+            data = data.dropna(how='all')
+        if len(data):
+            if is_datetime is None:
+                is_datetime = isinstance(data.index, pd.DatetimeIndex)
+            elif is_datetime != isinstance(data.index, pd.DatetimeIndex):
+                raise _MixedTimestamps(f'Some timestamps in "{path}" cannot be '
+                                       f'parsed as dates, so the index would differ '
+                                       f'between chunks.  Use fed3.load() (without '
+                                       f'`chunksize`), which keeps them as text.')
+        retract, new = cleaner.clean(data)
+        if retract:
+            pending = pending.iloc[:-retract]
+        if new.empty:
+            continue
+        if pending is not None and not pending.empty:
+            yield pending
+        pending = new
+
+    if pending is not None and not pending.empty:
+        yield pending
+
+def _load_chunked(path, chunksize, **kwargs):
+    '''Load a CSV file in chunks (see `iter_load()`), copying each chunk
+    into arrays allocated for the whole file.  Keyword arguments are
+    passed to `_iter_clean()`.'''
+    # lines can't be counted in compressed files; the arrays grow as needed
+    capacity = chunksize if _split_path(path)[2] else _count_lines(path)
+    try:
+        chunks = _iter_clean(path, chunksize, **kwargs)
+        return _assemble(chunks, capacity)
+    except _MixedTimestamps:
+        chunks = _iter_clean(path, chunksize, parse_dates=False, **kwargs)
+        return _assemble(chunks, capacity)
+
+def _assemble(chunks, capacity):
+    '''Combine FEDFrame chunks into one FEDFrame.  Columns are written into
+    preallocated arrays, which are upcast if later chunks need a more general
+    type.  Returns None if there are no chunks.'''
+    first = None
+    n = 0
+    for chunk in chunks:
+        if first is None:
+            first = chunk
+            columns = list(chunk.columns)
+            names = {chunk.index.name}
+            arrays = {col: np.empty(capacity, dtype=chunk[col].dtype) for col in columns}
+            index = np.empty(capacity, dtype=chunk.index.dtype)
+        if list(chunk.columns) != columns:
+            raise ValueError('Chunks have different columns.')
+        names.add(chunk.index.name)
+
+        m = n + len(chunk)
+        if m > capacity:
+            capacity = max(2 * capacity, m)
+            index = _resized(index, capacity)
+            arrays = {col: _resized(arr, capacity) for col, arr in arrays.items()}
+        index = _upcast(index, chunk.index.dtype)
+        index[n:m] = chunk.index.values
+        for col in columns:
+            values = chunk[col].values
+            arrays[col] = _upcast(arrays[col], values.dtype)
+            arrays[col][n:m] = values
+        n = m
+
+    if first is None:
+        return None
+
+    name = names.pop() if len(names) == 1 else None
+    data = {col: arr[:n] for col, arr in arrays.items()}
+    fed = FEDFrame(data, index=pd.Index(index[:n], name=name), copy=False)
+    return fed.__finalize__(first)
+
+def _resized(array, size):
+    '''Return a copy of `array` with a new length, keeping its values.'''
+    new = np.empty(size, dtype=array.dtype)
+    k = min(size, len(array))
+    new[:k] = array[:k]
+    return new
+
+def _upcast(array, dtype):
+    '''Return `array`, converted if needed so that it can hold `dtype`.'''
+    common = np.result_type(array.dtype, dtype)
+    return array if common == array.dtype else array.astype(common)
+
+def _trailing(mask):
+    '''Return a boolean array selecting the trailing run of True in `mask`.'''
+    mask = np.asarray(mask)
+    out = np.zeros(len(mask), dtype=bool)
+    false = np.flatnonzero(~mask)
+    start = false[-1] + 1 if len(false) else 0
+    out[start:] = True
+    return out
+
+# ---- Public
+
+class FEDFollower:
+    '''Reader for a FED3 CSV file which is still being written.
+
+    The follower remembers the position of the last complete line it has
+    read.  Each call to `update()` reads and cleans only the lines
+    appended since then, so its cost depends on the amount of new data
+    rather than the length of the file.  The complete data are available
+    as a FEDFrame from `fed`, and metrics can be kept updated with
+    `track()`.
+
+    Create followers with `fed3.core.stream.follow()`.'''
+
+    def __init__(self, path, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+                 deduplicate_index=None, offset='1S', reset_counts=False,
+                 reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+                 engine=None, date_format=None):
+        self.path = path
+        self.name = os.path.basename(os.path.splitext(path)[0])
+        self.index_col = index_col
+        self.dropna = dropna
+        self.engine = engine
+        self.date_format = date_format
+        self._clean_args = dict(deduplicate_index=deduplicate_index,
+                                offset=offset,
+                                reset_counts=reset_counts,
+                                reset_columns=reset_columns)
+        self._states = []
+        self._start(parse_dates=True)
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(path={self.path!r}, '
+                f'rows={sum(len(c) for c in self._chunks)}, '
+                f'position={self.position})')
+
+    def _read(self, body):
+        data = _read_fed3_csv(io.BytesIO(self._header_line + body),
+                              header=self._header,
+                              index_col=self.index_col,
+                              engine=self.engine,
+                              date_format=self.date_format,
+                              parse_dates=self._parse_dates)
+        if self.dropna:
+            data = data.dropna(how='all')
+        return data
+
+    def _start(self, parse_dates):
+        self.position = 0
+        self._parse_dates = parse_dates
+        self._header_line = None
+        self._header = None
+        self._chunks = []
+        self._empty = None
+        self._cleaner = _StreamCleaner(name=self.name, path=self.path,
+                                       **self._clean_args)
+        for state in self._states:
+            state.reset()
+
+    @property
+    def fed(self):
+        '''FEDFrame with all the data read so far.'''
+        if len(self._chunks) > 1:
+            full = pd.concat(self._chunks).__finalize__(self._chunks[0])
+            self._chunks = [full]
+        return self._chunks[0] if self._chunks else self._empty
+
+    def update(self):
+        '''
+        Read any lines appended to the file since the last update.  If the
+        file has become shorter, it is assumed to have been replaced, and
+        it is read again from the start.  The file is also read again if
+        new timestamps cannot be parsed as dates, in which case the index
+        is kept as text (as with `fed3.core.fedfuncs.load()`).
+
+        Returns
+        -------
+        new : fed3.FEDFrame
+            The newly read (and cleaned) rows, which have also been appended
+            to `fed`.  Empty when there are no new complete lines.
+
+        '''
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < self.position:
+                self._start(parse_dates=self._parse_dates)
+            if self._header_line is None:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    return self._empty
+                text = line.decode('utf-8-sig', errors='replace')
+                self._header_line = line
+                self._header = next(csv.reader([text]), [])
+                self.position = len(line)
+                _, self._empty = self._cleaner.clean(self._read(b''))
+            f.seek(self.position)
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return self._empty
+        data = self._read(data[:end])
+        if self._parse_dates and len(data) and not isinstance(data.index, pd.DatetimeIndex):
+            self._start(parse_dates=False)
+            return self.update()
+        self.position += end
+
+        retract, new = self._cleaner.clean(data)
+        if retract:
+            self._chunks = [self.fed.iloc[:-retract]]
+            for state in self._states:
+                state.reset()
+                state.update(self.fed)
+        if not new.empty:
+            self._chunks.append(new)
+            for state in self._states:
+                state.update(new)
+
+        return new
+
+    def track(self, metrics, bins=None, origin='start'):
+        '''
+        Keep some metrics updated with the data, as new rows are read.
+        Each update only computes the metrics for the new rows (see
+        `fed3.metrics.state.MetricState`).  If previous rows are removed
+        (e.g. duplicates found with the new rows) or the file is read
+        again, the metrics are recomputed.
+
+        ```python
+        state = follower.track(['pellets', 'left_pokes'], bins='1H')
+
+        # later...
+        follower.update()
+        state.to_frame()  # binned metrics, including the new rows
+        ```
+
+        Parameters
+        ----------
+        metrics : str or list-like
+            Key(s) of built-in metrics.
+        bins : pandas offset string or object, optional
+            Fixed frequency for binning the metrics. The default is None,
+            in which case data are not binned.
+        origin : str or datetime object, optional
+            Origin of the bins. The default is 'start'.
+
+        Returns
+        -------
+        state : fed3.metrics.state.MetricState
+            The metrics, for the data read so far.
+
+        '''
+        from fed3.metrics.state import MetricState
+
+        state = MetricState(metrics, bins=bins, origin=origin)
+        if self._chunks:
+            state.update(self.fed)
+        self._states.append(state)
+        return state
+
+def follow(path, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+           deduplicate_index=None, offset='1S', reset_counts=False,
+           reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+           engine=None, date_format=None):
+    '''
+    Start following a FED3 CSV file which is still being written, e.g. one
+    being synced from a device during an experiment.  The existing data are
+    read immediately; new rows are read when `FEDFollower.update()` is called:
+
+    ```python
+    import fed3
+
+    follower = fed3.follow('/some/file.csv')
+    follower.fed           # data so far
+
+    # later...
+    new = follower.update()  # only the rows added since the last update
+    follower.fed           # all data, including the new rows
+    ```
+
+    Metrics can be updated along with the data using `FEDFollower.track()`.
+
+    New rows are cleaned in the same way as `fed3.core.fedfuncs.load()`
+    (column names fixed, Retrieval_Time coerced, and duplicate timestamps
+    handled).  Duplicate timestamps are also checked against the rows
+    previously read, so the result matches loading the whole file (for data
+    in time order).  Lines which have not been completely written yet
+    are left for the next update.
+
+    Parameters
+    ----------
+    path : str
+        System path to FED3 CSV file.
+    index_col, dropna, engine, date_format : optional
+        Arguments used for reading, as in `fed3.core.fedfuncs.load()`.
+    deduplicate_index, offset, reset_counts, reset_columns: optional
+        Arguments passed to `fed3.FEDFrame.deduplicate_index()`, used
+        to remove duplicate timestamps as the data are read.  `'interpolate'`
+        is not available, as it depends on rows that have not yet been written.
+
+    Raises
+    ------
+    ValueError
+        Unsupported option for `deduplicate_index`.
+
+    Returns
+    -------
+    follower : fed3.core.stream.FEDFollower
+        Reader for the file.
+
+    '''
+    follower = FEDFollower(path,
+                           index_col=index_col,
+                           dropna=dropna,
+                           deduplicate_index=deduplicate_index,
+                           offset=offset,
+                           reset_counts=reset_counts,
+                           reset_columns=reset_columns,
+                           engine=engine,
+                           date_format=date_format)
+    follower.update()
+    return follower
+
+def iter_load(path, chunksize=100000, index_col='MM:DD:YYYY hh:mm:ss', dropna=True,
+              deduplicate_index=None, offset='1S', reset_counts=False,
+              reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+              engine=None, date_format=None):
+    '''
+    Load a FED3 CSV file in chunks, for files which are too large to
+    read comfortably at once.  Only about one chunk is held in memory
+    at a time:
+
+    ```python
+    import fed3
+
+    for chunk in fed3.iter_load('/some/large_file.csv', chunksize=50000):
+        ...
+    ```
+
+    Each chunk is cleaned in the same way as `fed3.core.fedfuncs.load()`.
+    Duplicate timestamps are also checked across the edges of chunks, and
+    counts are reset continuously when `reset_counts` is True, so the
+    concatenated chunks match loading the whole file (for data in time
+    order).  To load the whole file with the same memory savings, use
+    `fed3.core.fedfuncs.load()` with `chunksize`.
+
+    Parameters
+    ----------
+    path : str
+        System path to FED3 CSV file.
+    chunksize : int, optional
+        Number of lines to read at once. The default is 100000.  Chunks
+        may be smaller after removing empty rows or duplicates.
+    index_col, dropna, engine, date_format : optional
+        Arguments used for reading, as in `fed3.core.fedfuncs.load()`.  Note
+        that the `'pyarrow'` engine does not support reading in chunks.
+    deduplicate_index, offset, reset_counts, reset_columns: optional
+        Arguments passed to `fed3.FEDFrame.deduplicate_index()`, used
+        to remove duplicate timestamps as the data are loaded.  `'interpolate'`
+        is not available.
+
+    Raises
+    ------
+    ValueError
+        Unsupported option for `deduplicate_index`, or timestamps which can
+        only be parsed as dates in some chunks.
+
+    Yields
+    ------
+    chunk : fed3.FEDFrame
+        Consecutive (non-empty) portions of the data.
+
+    '''
+    yield from _iter_clean(path, chunksize,
+                           index_col=index_col,
+                           dropna=dropna,
+                           deduplicate_index=deduplicate_index,
+                           offset=offset,
+                           reset_counts=reset_counts,
+                           reset_columns=reset_columns,
+                           engine=engine,
+                           date_format=date_format)
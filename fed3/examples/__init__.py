@@ -74,7 +74,7 @@ import os
 import sys
 import warnings
 
-from fed3.core.fedfuncs import load
+from fed3.core.fedfuncs import load_many
 
 # module variables
 DATADIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
@@ -102,7 +102,8 @@ def list_examples():
 
 def load_examples(key, verbose=False, deduplicate_index=None, offset='1S',
                   reset_counts=False,
-                  reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count')):
+                  reset_columns=('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count'),
+                  workers=1, executor='process'):
     '''
     Load the example data linked to a given key.
 
@@ -115,6 +116,10 @@ def load_examples(key, verbose=False, deduplicate_index=None, offset='1S',
     deduplicate_index, offset, reset_counts, reset_columns: optional
         Arguments passed to `fed3.FEDFrame.deduplicate_index()`, used
         to remove duplicate timestamps as the data are loaded.
+    workers, executor : optional
+        Arguments passed to `fed3.core.fedfuncs.load_many()`, for loading
+        the example files in parallel.  The default is to load the files
+        serially (`workers=1`).
 
     Raises
     ------
@@ -131,7 +136,7 @@ def load_examples(key, verbose=False, deduplicate_index=None, offset='1S',
 
 
     example_path = os.path.join(DATADIR, key)
-    examples = []
+    paths = []
     vprint()
     vprint(f'Loading from data directory: {DATADIR}')
     vprint()
@@ -142,13 +147,16 @@ def load_examples(key, verbose=False, deduplicate_index=None, offset='1S',
         name, ext = os.path.splitext(file)
         if ext.lower() not in ['.csv', '.xlsx']: continue;
         vprint(f' - {file}...')
-        fullfile = os.path.join(example_path, file)
-        f = load(path=fullfile,
-                 deduplicate_index=deduplicate_index,
-                 offset=offset,
-                 reset_counts=reset_counts,
-                 reset_columns=reset_columns)
-        examples.append(f)
+        paths.append(os.path.join(example_path, file))
+
+    examples = load_many(paths,
+                         workers=workers,
+                         executor=executor,
+                         errors='raise',
+                         deduplicate_index=deduplicate_index,
+                         offset=offset,
+                         reset_counts=reset_counts,
+                         reset_columns=reset_columns)
 
     return examples
 
@@ -46,14 +46,15 @@ def set_lightcycle(on_hour, off_hour, on_minute=0, off_minute=0):
 
 def is_at_night(datetime, lights_on, lights_off):
     '''Returns `True` if an input timestamp is at night.  Note that `lights_on`
-    and `lights_off` should be `datetime.time` objects.'''
+    and `lights_off` should be `datetime.time` objects.  A pandas
+    DatetimeIndex can also be passed, returning an array of booleans.'''
     ashour = time_to_float(datetime)
     lights_on = time_to_float(lights_on)
     lights_off = time_to_float(lights_off)
     if lights_on > lights_off:
-        return (lights_off <= ashour < lights_on)
+        return (lights_off <= ashour) & (ashour < lights_on)
     else:
-        return (ashour < lights_on or ashour >= lights_off)
+        return (ashour < lights_on) | (ashour >= lights_off)
 
 def lightcycle_tuples(start_date, end_date, lights_on, lights_off, kind='nights',
                       pdconvert=True):
@@ -41,16 +41,60 @@ functions available in fed3:
  'battery',
  'ipi',
  'motor',
- 'rt']
+ 'rt',
+ 'rolling_pellets',
+ 'rolling_pokes',
+ 'rolling_left_pokes',
+ 'rolling_right_pokes',
+ 'rolling_left_percent',
+ 'rolling_right_percent',
+ 'rolling_correct_pokes',
+ 'rolling_error_pokes',
+ 'rolling_correct_percent',
+ 'rolling_error_percent']
 
 ```
 
+To compute several metrics for one or more FEDFrames at once (sharing the
+work which metrics have in common), use `fed3.metrics.compute_metrics()`:
+
+```python
+>>> fed3.compute_metrics(feds, ['pellets', 'pokes', 'cumulative_correct_percent'], bins='1H')
+```
+
+New metrics can be added with `fed3.metrics.register_metric()`, by declaring
+how their values are computed (from a FEDFrame, or from other metrics) and
+how they are binned:
+
+```python
+>>> fed3.register_metric('battery_drop', lambda volts: volts.iloc[0] - volts,
+...                      nicename='Battery Drop (V)', inputs=['battery'], agg='max')
+```
+
+The `rolling_*` metrics count events (or the percentage of pokes of one
+kind) in a trailing window at every event, e.g. the pellets retrieved in the
+last hour; their default window is `fed3.metrics.core.ROLLING_WINDOW`.  Any
+metric can be computed over a window with the `rolling` argument of
+`fed3.metrics.compute_metrics()`:
+
+```python
+>>> fed3.compute_metrics(fed, ['pellets', 'correct_pokes', 'cumulative_correct_percent'],
+...                      rolling='30min')
+```
+
+For live monitoring, `fed3.metrics.state.MetricState` computes the built-in
+metrics incrementally as new rows arrive (see also
+`fed3.core.stream.FEDFollower.track()`).
+
 '''
 
 #imports for package namespace
 
-from .core import get_metric, list_metrics
+from .core import (MetricEvaluator, compute_metrics, get_metric, list_metrics,
+                   register_metric, required_columns)
+from .state import MetricState
 
 __pdoc__ = {'tables': False}
 
-__all__ = ['get_metric', 'list_metrics']
\ No newline at end of file
+__all__ = ['MetricEvaluator', 'MetricState', 'compute_metrics', 'get_metric', 'list_metrics',
+           'register_metric', 'required_columns']
\ No newline at end of file
@@ -15,31 +15,216 @@ datetime index.
     `origin` arguments.  These arguments allow for the time series
     data to be downsampled.
     - By default, data are not downsampled.
+- The `rolling_*` metrics also accept a `window` argument, the length of
+the trailing window they are computed over (see `ROLLING_WINDOW`).
 
 """
 
 __pdoc__ = {'Metric': False,
+            'MetricEvaluator': False,
+            'compute_metrics': False,
             'get_metric': False,
-            'list_metrics': False}
+            'list_metrics': False,
+            'register_metric': False,
+            'required_columns': False}
 
 from collections import namedtuple
 import warnings
 
+import numpy as np
 import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+# ---- Binning
+
+_TimeBins = namedtuple('_TimeBins', ['ids', 'nbins', 'labels', 'ordered'])
+
+def _bin_edges(first, last, freq_ns, origin):
+    '''Return the left edge (int64 ns) of the first bin and the number of
+    bins needed to cover `first` to `last`, placing bins as `pandas.Grouper`
+    does for fixed frequencies (left-closed, left-labeled).  Returns None
+    for origins which are not handled.'''
+    if isinstance(origin, str):
+        if origin == 'start':
+            anchor = first
+        elif origin == 'start_day':
+            anchor = first - first % (24 * 3600 * 10**9)
+        elif origin == 'epoch':
+            anchor = 0
+        else:
+            try:
+                anchor = pd.Timestamp(origin)
+            except ValueError:
+                return None
+            if anchor.tz is not None:
+                return None
+            anchor = anchor.as_unit('ns').value
+    elif isinstance(origin, pd.Timestamp) and origin.tz is None:
+        anchor = origin.as_unit('ns').value
+    else:
+        return None
+
+    left = first - (first - anchor) % freq_ns
+    right = last - (last - anchor) % freq_ns + freq_ns
+    return left, (right - left) // freq_ns
+
+def _time_bins(index, bins, origin):
+    '''Return the integer bin ids of a DatetimeIndex, as a `_TimeBins`,
+    for use with `_binned()`.  Returns None when the bins cannot be
+    guaranteed to match `pandas.Grouper` (calendar frequencies, or
+    timezone-aware, missing, or no timestamps).'''
+    if (not len(index)
+        or not isinstance(index, pd.DatetimeIndex)
+        or index.dtype != 'datetime64[ns]'
+        or index.hasnans):
+        return None
+
+    try:
+        freq = to_offset(bins)
+        freq_ns = freq.nanos
+    except ValueError:
+        return None
+    if freq_ns <= 0:
+        return None
+
+    times = index.asi8
+    ordered = index.is_monotonic_increasing
+    first, last = (times[0], times[-1]) if ordered else (times.min(), times.max())
+    edges = _bin_edges(first, last, freq_ns, origin)
+    if edges is None:
+        return None
+    left, nbins = edges
+    ids = (times - left) // freq_ns
+    labels = pd.date_range(start=pd.Timestamp(left), periods=nbins, freq=freq,
+                           name=index.name)
+    return _TimeBins(ids=ids, nbins=nbins, labels=labels, ordered=ordered)
+
+def _binned(vals, bins, origin, agg, time_bins=None):
+    '''Aggregate a metric into time bins with integer bin ids, rather than
+    `pandas.Grouper`.  Timestamps are turned into bin ids by floor division
+    of their nanoseconds, and the values are reduced with NumPy.  The result
+    matches `vals.groupby(pd.Grouper(freq=bins, origin=origin)).agg(agg)`,
+    including empty bins and the resulting dtypes.  The bin ids can be
+    passed as `time_bins` (from `_time_bins()`), when they are shared by
+    several metrics.
+
+    Returns None when the result cannot be guaranteed to match, in which
+    case `pandas.Grouper` should be used: e.g. for calendar frequencies
+    (months, weeks), timezone-aware or missing timestamps, non-numeric
+    values, or sums and means of floats which are not whole numbers (pandas
+    uses compensated summation for these).'''
+    if agg not in ('sum', 'max', 'mean', 'last'):
+        return None
+
+    dtype = vals.dtype
+    if not (pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype)
+            or pd.api.types.is_float_dtype(dtype)):
+        return None
+    if not isinstance(dtype, np.dtype):
+        # nullable extension types
+        return None
+    is_float = dtype.kind == 'f'
+    if agg == 'sum' and dtype.kind in 'iu' and dtype != np.int64:
+        return None
+    if is_float and agg in ('sum', 'mean') and dtype != np.float64:
+        return None
+
+    if time_bins is None:
+        time_bins = _time_bins(vals.index, bins, origin)
+        if time_bins is None:
+            return None
+    ids, nbins, ordered = time_bins.ids, time_bins.nbins, time_bins.ordered
+    values = vals.to_numpy()
+
+    if agg in ('sum', 'mean'):
+        values = values.astype(np.float64)
+        if is_float:
+            keep = ~np.isnan(values)
+            ids, values = ids[keep], values[keep]
+            if not np.array_equal(values, np.floor(values)):
+                # pandas' compensated sums are only certain to match
+                # plain sums for whole numbers (e.g. counts of events)
+                return None
+        if np.abs(values).sum() >= 2 ** 53:
+            # sums may no longer be exact
+            return None
+        sums = np.bincount(ids, weights=values, minlength=nbins)
+        if agg == 'sum':
+            out = sums.astype(np.int64 if dtype.kind == 'b' else dtype)
+        else:
+            counts = np.bincount(ids, minlength=nbins)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out = sums / counts
+    else:
+        if not ordered:
+            if agg == 'last':
+                # pandas does not sort equal timestamps stably
+                return None
+            order = np.argsort(ids, kind='stable')
+            ids, values = ids[order], values[order]
+        if is_float:
+            keep = ~np.isnan(values)
+            ids, values = ids[keep], values[keep]
+        if len(ids):
+            starts = np.flatnonzero(np.diff(ids, prepend=-1))
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+        if agg == 'max':
+            reduced = np.maximum.reduceat(values, starts) if len(ids) else values
+            present = ids[starts]
+        else:
+            ends = np.append(starts[1:], len(ids)) - 1
+            reduced = values[ends]
+            present = ids[ends]
+        if len(present) == nbins:
+            out = reduced
+        else:
+            out = np.full(nbins, np.nan, dtype=np.float32 if dtype == np.float32 else np.float64)
+            out[present] = reduced
+
+    return pd.Series(out, index=time_bins.labels, name=vals.name)
+
+# ---- Rolling windows
+
+def _rolling(vals, window, agg):
+    '''Aggregate the values of a metric over a trailing time window, at
+    each of its timestamps.  The window is closed on the right, and includes
+    the previous rows with the same timestamp.  For time windows, pandas
+    moves both edges of the window forward over the sorted timestamps (a
+    two-pointer pass), so the cost is linear in the number of values.'''
+    return vals.rolling(window).agg(agg)
 
 # ---- General helpers
 
+def _apply_alignment(fed, vals):
+    '''Shift the timestamps of a metric by the offset of a lazy alignment
+    (see `fed3.core.fedframe.FEDFrame.set_alignment()`).'''
+    offset = getattr(fed, '_lazy_offset', None)
+    if not offset:
+        return vals
+    vals = vals.copy(deep=False)
+    vals.index = vals.index + offset
+    return vals
+
+def _bin_values(vals, bins, origin, agg):
+    '''Bin the values of a metric, with `_binned()` when possible and
+    `pandas.Grouper` otherwise.'''
+    out = _binned(vals, bins, origin, agg)
+    if out is None:
+        G = pd.Grouper(freq=bins, origin=origin)
+        out = vals.groupby(G).agg(agg)
+    return out
+
 def _default_metric(fed, func, bins=None, origin='start',
                     agg='sum'):
     '''Call a function of a FEDFrame in the "default manner".  It is
     so-called "default" in that most metrics can be constructed using
     this function.'''
     if bins is None:
-        out = func(fed)
+        out = _apply_alignment(fed, func(fed))
     else:
-        vals = func(fed)
-        G = pd.Grouper(freq=bins, origin=origin)
-        out = vals.groupby(G).agg(agg)
+        vals = _apply_alignment(fed, func(fed))
+        out = _bin_values(vals, bins, origin, agg)
 
     return out
 
@@ -57,6 +242,8 @@ def _filterout(series, dropna=False, dropzero=False, deduplicate=False):
 
 # ---- Helpers for computing metrics
 
+_OPPOSITE_POKES = {'left': 'right', 'right': 'left', 'correct': 'error', 'error': 'correct'}
+
 def _cumulative_poke_percentage_general(fed, kind):
     '''General function which is used to compute either the cumulative
     left, right, correct, or error poke percentage.'''
@@ -65,21 +252,33 @@ def _cumulative_poke_percentage_general(fed, kind):
     if kind not in kinds:
         raise ValueError(f'`kind` must be one of {kinds}')
 
-    if kind == 'left':
-        a = cumulative_left_pokes(fed)
-        b = cumulative_right_pokes(fed)
-    elif kind == 'right':
-        a = cumulative_right_pokes(fed)
-        b = cumulative_left_pokes(fed)
-    elif kind == 'correct':
-        a = cumulative_correct_pokes(fed)
-        b = cumulative_error_pokes(fed)
-    elif kind == 'error':
-        a = cumulative_error_pokes(fed)
-        b = cumulative_correct_pokes(fed)
+    # read from the FEDFrame rather than the cumulative metrics, as the
+    # result is passed through `_default_metric()` (and aligned) once more
+    a = fed.pokes(kind=kind, cumulative=True, condense=True)
+    b = fed.pokes(kind=_OPPOSITE_POKES[kind], cumulative=True, condense=True)
+
+    return _poke_percentage(a, b)
+
+def _poke_percentage(a, b):
+    '''Return the running percentage of the pokes counted by `a` (a
+    cumulative count) out of those of `a` and `b`.'''
 
     idx = a.index.union(b.index)
 
+    if (isinstance(idx, pd.DatetimeIndex) and a.index.is_unique and b.index.is_unique
+        and a.index.is_monotonic_increasing and b.index.is_monotonic_increasing
+        and not (a.isna().any() or b.isna().any())):
+        # forward fill by binary search, rather than reindexing
+        times = idx.asi8
+        filled = []
+        for y in (a, b):
+            pos = np.searchsorted(y.index.asi8, times, side='right') - 1
+            vals = y.to_numpy(dtype=np.float64)
+            filled.append(np.where(pos >= 0, vals[np.maximum(pos, 0)] if len(vals) else 0., 0.))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct = (filled[0] / (filled[0] + filled[1])) * 100
+        return pd.Series(pct, index=idx, name=a.name if a.name == b.name else None)
+
     try:
         a = a.reindex(idx)
         b = b.reindex(idx)
@@ -100,12 +299,69 @@ def _cumulative_poke_percentage_general(fed, kind):
 
     return (a / total) * 100
 
+# ---- Signals
+
+def _pellet_signal(cumulative):
+    '''Return a function getting the (condensed) pellets of a FEDFrame.'''
+    return lambda f: f.pellets(cumulative=cumulative, condense=True)
+
+def _poke_signal(kind, cumulative):
+    '''Return a function getting the (condensed) pokes of a FEDFrame.'''
+    return lambda f: f.pokes(kind=kind, cumulative=cumulative, condense=True)
+
+def _same(y):
+    '''Signal of a metric which has the same values as its input.'''
+    return y
+
+def _battery_signal(fed):
+    return fed['Battery_Voltage']
+
+def _ipi_signal(fed):
+    return fed.ipi(condense=True)
+
+def _motor_turns_signal(fed):
+    fed._require('Motor_Turns')
+    pellets = fed.pellets(cumulative=False).astype(bool)
+    y = fed.loc[pellets, 'Motor_Turns']
+    return y
+
+def _retrieval_time_signal(fed):
+    y = fed['Retrieval_Time']
+    y = _filterout(y, dropna=True)
+    return y
+
+def _rolling_signal(kind, window=None):
+    '''Return a function getting the number of events of one kind (`'pellet'`
+    or a kind of poke) in the trailing window, at every row of a FEDFrame.
+    The window defaults to `ROLLING_WINDOW`, read when called; it can also
+    be passed to the returned function.'''
+    def signal(fed, window=window):
+        if kind == 'pellet':
+            y = fed.pellets(cumulative=False)
+        else:
+            y = fed.pokes(kind=kind, cumulative=False)
+        return _rolling(y, ROLLING_WINDOW if window is None else window, 'sum')
+    return signal
+
+def _rolling_percent_signal(kind, window=None):
+    '''Return a function getting the percentage of pokes of one kind (out of
+    those of the kind and its opposite) in the trailing window.'''
+    a = _rolling_signal(kind, window)
+    b = _rolling_signal(_OPPOSITE_POKES[kind], window)
+    return lambda f: _rolling_percentage(a(f), b(f))
+
+def _rolling_percentage(a, b):
+    '''Percentage of the events counted by `a` out of those of `a` and `b`
+    (rolling counts at the same timestamps).  It is missing where there
+    are no events in the window.'''
+    return (a / (a + b)) * 100
+
 # ---- Pellets
 
 def binary_pellets(fed, bins=None, origin='start'):
     '''Returns a binary (0/1) indication of pellet retrieval.
     When binned, returns sum of pellets taken per bin.'''
-    func = lambda f: f.pellets(cumulative=False, condense=True)
+    func = _pellet_signal(cumulative=False)
     agg = 'sum'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
@@ -113,7 +369,7 @@ def cumulative_pellets(fed, bins=None, origin='start'):
     '''Returns a running total of pellet retrieval, essentially the FED3
     "Pellet_Count" column.  When binned, returns the maximum of the running
     total within each bin.'''
-    func = lambda f: f.pellets(cumulative=True, condense=True)
+    func = _pellet_signal(cumulative=True)
     agg = 'max'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
@@ -128,14 +384,14 @@ def pellets(fed, bins=None, origin='start'):
 def binary_pokes(fed, bins=None, origin='start'):
     '''Returns a binary (0/1) indication of pokes (of any kind).
     When binned, returns sum of pokes per bin.'''
-    func = lambda f: f.pokes(kind='any', cumulative=False, condense=True)
+    func = _poke_signal('any', cumulative=False)
     agg = 'sum'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def cumulative_pokes(fed, bins=None, origin='start'):
     '''Returns a running total of pokes (of any kind).  When binned,
     returns the maximum of the running total within each bin.'''
-    func = lambda f: f.pokes(kind='any', cumulative=True, condense=True)
+    func = _poke_signal('any', cumulative=True)
     agg = 'max'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
@@ -150,28 +406,28 @@ def pokes(fed, bins=None, origin='start'):
 def binary_left_pokes(fed, bins=None, origin='start'):
     '''Returns a binary (0/1) indication of left-sided pokes.
     When binned, returns sum of pokes per bin.'''
-    func = lambda f: f.pokes(kind='left', cumulative=False, condense=True)
+    func = _poke_signal('left', cumulative=False)
     agg = 'sum'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def binary_right_pokes(fed, bins=None, origin='start'):
     '''Returns a binary (0/1) indication of right-sided pokes.
     When binned, returns sum of pokes per bin.'''
-    func = lambda f: f.pokes(kind='right', cumulative=False, condense=True)
+    func = _poke_signal('right', cumulative=False)
     agg = 'sum'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def cumulative_left_pokes(fed, bins=None, origin='start'):
     '''Returns a running total of left pokes.  When binned,
     returns the maximum of the running total within each bin.'''
-    func = lambda f: f.pokes(kind='left', cumulative=True, condense=True)
+    func = _poke_signal('left', cumulative=True)
     agg = 'max'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def cumulative_right_pokes(fed, bins=None, origin='start'):
     '''Returns a running total of right pokes.  When binned,
     returns the maximum of the running total within each bin.'''
-    func = lambda f: f.pokes(kind='right', cumulative=True, condense=True)
+    func = _poke_signal('right', cumulative=True)
     agg = 'max'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
@@ -212,28 +468,28 @@ def right_pokes(fed, bins=None, origin='start'):
 def binary_correct_pokes(fed, bins=None, origin='start'):
     '''Returns a binary (0/1) indication of correct pokes.
     When binned, returns sum of pokes per bin.'''
-    func = lambda f: f.pokes(kind='correct', cumulative=False, condense=True)
+    func = _poke_signal('correct', cumulative=False)
     agg = 'sum'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def binary_error_pokes(fed, bins=None, origin='start'):
     '''Returns a binary (0/1) indication of error pokes.
     When binned, returns sum of pokes per bin.'''
-    func = lambda f: f.pokes(kind='error', cumulative=False, condense=True)
+    func = _poke_signal('error', cumulative=False)
     agg = 'sum'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def cumulative_correct_pokes(fed, bins=None, origin='start'):
     '''Returns a running total of correct pokes.  When binned,
     returns the maximum of the running total within each bin.'''
-    func = lambda f: f.pokes(kind='correct', cumulative=True, condense=True)
+    func = _poke_signal('correct', cumulative=True)
     agg = 'max'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def cumulative_error_pokes(fed, bins=None, origin='start'):
     '''Returns a running total of error pokes.  When binned,
     returns the maximum of the running total within each bin.'''
-    func = lambda f: f.pokes(kind='error', cumulative=True, condense=True)
+    func = _poke_signal('error', cumulative=True)
     agg = 'max'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
@@ -272,34 +528,115 @@ def error_pokes(fed, bins=None, origin='start'):
 def battery(fed, bins=None, origin='start'):
     '''Returns the battery voltage reading.  When binned, returns
     the mean within each bin.'''
-    func = lambda f: f['Battery_Voltage']
+    func = _battery_signal
     agg = 'mean'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def ipi(fed, bins=None, origin='start'):
     '''Returns the interpellet intervals (time between each successive pellet
     retrieval).  When binned, returns the mean within each bin.'''
-    func = lambda f: f.ipi(condense=True)
+    func = _ipi_signal
     agg = 'mean'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def motor_turns(fed, bins=None, origin='start'):
     '''Returns the number of motor turns for each pellet dispensal.
     When binned, returns the mean within each bin.'''
-    def func(fed):
-        pellets = fed.pellets(cumulative=False).astype(bool)
-        y = fed.loc[pellets, 'Motor_Turns']
-        return y
+    func = _motor_turns_signal
     agg = 'mean'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
 def retrival_time(fed, bins=None, origin='start'):
     '''Returns the time (seconds) any dispensed pellets remained in well before
     retrieval.  When binned, returns the mean within each bin.'''
-    def func(fed):
-        y = fed['Retrieval_Time']
-        y = _filterout(y, dropna=True)
-        return y
+    func = _retrieval_time_signal
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+# ---- Rolling
+
+ROLLING_WINDOW = '1H'
+'''Default trailing window of the rolling metrics (e.g. `rolling_pellets()`),
+as a fixed pandas offset.  It is used when the metrics are accessed through
+`METRICS` (e.g. for plotting) and no window is given.'''
+
+def rolling_pellets(fed, bins=None, origin='start', window=None):
+    '''Returns the number of pellets retrieved in the trailing `window`
+    (default `ROLLING_WINDOW`), at every event.  When binned, returns
+    the mean within each bin.'''
+    func = _rolling_signal('pellet', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_pokes(fed, bins=None, origin='start', window=None):
+    '''Returns the number of pokes in the trailing `window` (default
+    `ROLLING_WINDOW`), at every event.  When binned, returns the mean within
+    each bin.'''
+    func = _rolling_signal('any', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_left_pokes(fed, bins=None, origin='start', window=None):
+    '''Returns the number of left pokes in the trailing `window` (default
+    `ROLLING_WINDOW`), at every event.  When binned, returns the mean within
+    each bin.'''
+    func = _rolling_signal('left', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_right_pokes(fed, bins=None, origin='start', window=None):
+    '''Returns the number of right pokes in the trailing `window` (default
+    `ROLLING_WINDOW`), at every event.  When binned, returns the mean within
+    each bin.'''
+    func = _rolling_signal('right', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_correct_pokes(fed, bins=None, origin='start', window=None):
+    '''Returns the number of correct pokes in the trailing `window` (default
+    `ROLLING_WINDOW`), at every event.  When binned, returns the mean within
+    each bin.'''
+    func = _rolling_signal('correct', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_error_pokes(fed, bins=None, origin='start', window=None):
+    '''Returns the number of incorrect pokes in the trailing `window` (default
+    `ROLLING_WINDOW`), at every event.  When binned, returns the mean within
+    each bin.'''
+    func = _rolling_signal('error', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_left_percent(fed, bins=None, origin='start', window=None):
+    '''Returns the percentage of pokes which were left pokes in the trailing
+    `window` (default `ROLLING_WINDOW`), at every event (missing when there
+    were no pokes).  When binned, returns the mean within each bin.'''
+    func = _rolling_percent_signal('left', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_right_percent(fed, bins=None, origin='start', window=None):
+    '''Returns the percentage of pokes which were right pokes in the trailing
+    `window` (default `ROLLING_WINDOW`), at every event (missing when there
+    were no pokes).  When binned, returns the mean within each bin.'''
+    func = _rolling_percent_signal('right', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_correct_percent(fed, bins=None, origin='start', window=None):
+    '''Returns the percentage of pokes which were correct in the trailing
+    `window` (default `ROLLING_WINDOW`), at every event (missing when there
+    were no pokes).  When binned, returns the mean within each bin.'''
+    func = _rolling_percent_signal('correct', window)
+    agg = 'mean'
+    return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
+
+def rolling_error_percent(fed, bins=None, origin='start', window=None):
+    '''Returns the percentage of pokes which were incorrect in the trailing
+    `window` (default `ROLLING_WINDOW`), at every event (missing when there
+    were no pokes).  When binned, returns the mean within each bin.'''
+    func = _rolling_percent_signal('error', window)
     agg = 'mean'
     return _default_metric(fed=fed, func=func, bins=bins, origin=origin, agg=agg)
 
@@ -322,9 +659,11 @@ def get_metric(y):
     Returns
     -------
     namedtuple
-        Named tuple with a `func` and `nicename` attribute.  The `func`
-        is the actual metric function, which can be called on FEDFrames.
-        The `nicename` is a nicer version of the key, used for axis labels.
+        Named tuple of type `Metric`.  The `func` is the actual metric
+        function, which can be called on FEDFrames. The `nicename` is a
+        nicer version of the key, used for axis labels.  The `columns` are
+        the FED3 columns the metric uses.  The other attributes declare how
+        the metric is computed (see `METRICS`).
 
     '''
 
@@ -347,38 +686,543 @@ def list_metrics():
     '''
     return list(METRICS.keys())
 
+def register_metric(key, signal, nicename=None, columns=(), inputs=(), agg='mean',
+                    cumulative=False, overwrite=False):
+    '''
+    Add a metric to `METRICS`, so that it can be used like the built-in
+    metrics (e.g. with `fed3.plot` or `compute_metrics()`).
+
+    The metric is declared by a `signal` function which computes its
+    (unbinned) values, and an aggregation for binning them.  The signal is
+    either computed from a FEDFrame, or from the values of other metrics
+    (`inputs`), which are then only computed once when evaluated together
+    (see `MetricEvaluator`).  The metric function is created from these.
+
+    Parameters
+    ----------
+    key : str
+        Key for the metric.
+    signal : callable
+        Function returning the unbinned values of the metric, as a pandas
+        Series with a datetime index.  When there are no `inputs`, it is
+        called with a FEDFrame; otherwise, it is called with the unbinned
+        values of each input metric, in order.
+    nicename : str, optional
+        Readable name of the metric, used on axis labels. The default is
+        None, in which case the key is used.
+    columns : list-like, optional
+        FED3 columns used by `signal` (the columns of the `inputs` are
+        included automatically). The default is ().
+    inputs : list-like, optional
+        Keys of the metrics which `signal` is computed from. The default
+        is ().
+    agg : str or callable, optional
+        Aggregation of the values within each bin, as accepted by
+        `pandas.core.groupby.SeriesGroupBy.agg()`. The default is 'mean'.
+    cumulative : bool, optional
+        Whether the metric is a running total. The default is False.
+    overwrite : bool, optional
+        Replace an existing metric with the same key. The default is False.
+
+    Raises
+    ------
+    ValueError
+        The key is already used (and `overwrite` is False), or an input
+        metric is not recognized.
+
+    Returns
+    -------
+    fed3.metrics.core.Metric
+        The declaration of the metric.
+
+    '''
+    key = key.lower()
+    if key in METRICS and not overwrite:
+        raise ValueError(f'Metric key "{key}" is already used; pass '
+                         '`overwrite=True` to replace it.')
+    inputs = tuple(k.lower() for k in inputs)
+    for k in inputs:
+        get_metric(k)
+
+    def func(fed, bins=None, origin='start'):
+        return MetricEvaluator(fed, bins=bins, origin=origin).evaluate(key)
+    func.__name__ = key
+    func.__doc__ = f'''Metric "{key}", added with `register_metric()`.'''
+
+    METRICS[key] = Metric(func, key if nicename is None else nicename, tuple(columns),
+                          signal=signal, inputs=inputs, agg=agg,
+                          cumulative=cumulative)
+    return METRICS[key]
+
+def required_columns(metrics):
+    '''
+    Return the FED3 columns needed to compute some metrics.  This can
+    be used to only load these columns (see the `metrics` argument of
+    `fed3.core.load()`).  The columns of the metrics which others are
+    computed from are included.
+
+    Parameters
+    ----------
+    metrics : str or list-like
+        Metric key(s).
+
+    Returns
+    -------
+    list
+        Column names, in order of first use.
+
+    '''
+    from fed3.core.fedframe import FEDFrame
+
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    columns = []
+    for y in _metric_graph(metrics):
+        columns += get_metric(y).columns
+    if FEDFrame.LR_POKE_METHOD == 'from_events' and set(POKE_COLS) & set(columns):
+        columns.append('Event')
+
+    return list(dict.fromkeys(columns))
+
+# ---- Evaluation
+
+def _metric_graph(keys, binned=None):
+    '''Return the keys of the metrics needed to evaluate some metrics:
+    the metrics themselves, followed by those they are computed from (each
+    key is listed once).  `binned` selects the metrics used when binned
+    (True) or not (False); by default, both are included.  Raises a
+    ValueError for unknown keys, or metrics which depend on themselves.'''
+    order = {}
+    pending = set()
+
+    def visit(key):
+        key = key.lower()
+        if key in pending:
+            raise ValueError(f'Metric "{key}" depends on itself.')
+        if key in order:
+            return
+        metric = get_metric(key)
+        order[key] = None
+        pending.add(key)
+        deps = []
+        if metric.binned is not None and binned is not False:
+            deps.append(metric.binned)
+        if metric.binned is None or not binned:
+            deps += metric.inputs
+        for dep in deps:
+            visit(dep)
+        pending.discard(key)
+
+    for key in keys:
+        visit(key)
+    return list(order)
+
+class MetricEvaluator:
+    '''Lazy evaluation of metrics for one FEDFrame, following their
+    declarations in `METRICS`.
+
+    Metrics are evaluated when they are first requested, including the
+    metrics they are computed from (their `inputs`), and the values of each
+    are kept, so that metrics which share inputs only compute them once.
+    Metrics with the same timestamps also share their bin ids.  Metrics
+    which do not declare a `signal` are computed by calling their function.
+
+    With a `rolling` window, metrics are aggregated over a trailing window at
+    each of their timestamps rather than binned.  Metrics which declare a
+    `rolling` metric (e.g. `'rolling_pellets'` for `'pellets'`) are replaced
+    by it, computed with the window; others are aggregated with their `agg`
+    (e.g. the mean battery voltage in the window).
+
+    See `compute_metrics()` for evaluating metrics for several FEDFrames.'''
+
+    def __init__(self, fed, bins=None, origin='start', rolling=None):
+        '''
+        Create an evaluator for a FEDFrame.
+
+        Parameters
+        ----------
+        fed : fed3.FEDFrame
+            FED3 data.
+        bins : pandas offset string or object, optional
+            Frequency for binning the metrics. The default is None, in
+            which case data are not binned.
+        origin : str or datetime object, optional
+            Origin of the bins. The default is 'start'.
+        rolling : pandas offset string or object, optional
+            Trailing window for the metrics (e.g. '30min'). The default is
+            None, in which case the rolling metrics use `ROLLING_WINDOW`, and
+            other metrics are not rolled.
+
+        Raises
+        ------
+        ValueError
+            Both `bins` and `rolling` are given.
+
+        Returns
+        -------
+        None.
+
+        '''
+        if bins is not None and rolling is not None:
+            raise ValueError('Metrics can be binned (`bins`) or computed over a '
+                             'rolling window (`rolling`), but not both.')
+        self.fed = fed
+        self.bins = bins
+        self.origin = origin
+        self.rolling = rolling
+        self._signals = {}
+        self._values = {}
+        self._bins = {}
+        self._pending = set()
+
+    def _time_bins(self, index):
+        '''Return the bin ids for a set of timestamps, shared by signals
+        with the same index.'''
+        key = id(index)
+        if key not in self._bins:
+            # the index is kept so that its id is not reused
+            self._bins[key] = (index, _time_bins(index, self.bins, self.origin))
+        return self._bins[key][1]
+
+    def _rolled(self, key, metric):
+        '''Return the values of a metric over the rolling window.'''
+        if metric.rolling == key:
+            return self.signal(key)
+        if metric.rolling is not None:
+            return self.evaluate(metric.rolling)
+        if metric.signal is None or metric.agg is None:
+            raise ValueError(f'Metric "{key}" does not declare how to compute it '
+                             'over a rolling window.')
+        return _rolling(self.signal(key), self.rolling, metric.agg)
+
+    def evaluate(self, key):
+        '''
+        Return the values of a metric, binned if the evaluator has `bins`
+        (or over the `rolling` window).
+
+        Parameters
+        ----------
+        key : str
+            Metric key.
+
+        Raises
+        ------
+        ValueError
+            The metric is not recognized, depends on itself, or cannot be
+            binned (or rolled).
+
+        Returns
+        -------
+        pandas.Series
+            Values of the metric, as returned by its function.
+
+        '''
+        key = key.lower()
+        if key in self._values:
+            return self._values[key]
+
+        metric = get_metric(key)
+        if self.rolling is not None:
+            out = self._rolled(key, metric)
+        elif self.bins is None:
+            out = self.signal(key)
+        elif metric.binned is not None:
+            out = self.evaluate(metric.binned)
+        elif metric.signal is None:
+            out = metric.func(self.fed, bins=self.bins, origin=self.origin)
+        elif metric.agg is None:
+            raise ValueError(f'Metric "{key}" does not declare an aggregation '
+                             'for binning.')
+        else:
+            vals = self.signal(key)
+            time_bins = self._time_bins(vals.index)
+            out = None
+            if time_bins is not None:
+                out = _binned(vals, self.bins, self.origin, metric.agg, time_bins)
+            if out is None:
+                G = pd.Grouper(freq=self.bins, origin=self.origin)
+                out = vals.groupby(G).agg(metric.agg)
+
+        self._values[key] = out
+        return out
+
+    def signal(self, key):
+        '''
+        Return the unbinned values of a metric (aligned like the FEDFrame).
+
+        Parameters
+        ----------
+        key : str
+            Metric key.
+
+        Raises
+        ------
+        ValueError
+            The metric is not recognized, or depends on itself.
+
+        Returns
+        -------
+        pandas.Series
+            Unbinned values of the metric.
+
+        '''
+        key = key.lower()
+        if key in self._signals:
+            return self._signals[key]
+        if key in self._pending:
+            raise ValueError(f'Metric "{key}" depends on itself.')
+
+        metric = get_metric(key)
+        self._pending.add(key)
+        try:
+            if metric.signal is None:
+                vals = metric.func(self.fed)
+            elif metric.inputs:
+                vals = metric.signal(*[self.signal(k) for k in metric.inputs])
+            elif self.rolling is not None and metric.rolling == key:
+                vals = _apply_alignment(self.fed, metric.signal(self.fed, window=self.rolling))
+            else:
+                vals = _apply_alignment(self.fed, metric.signal(self.fed))
+        finally:
+            self._pending.discard(key)
+
+        self._signals[key] = vals
+        return vals
+
+def _join_metrics(columns):
+    '''Join metrics (a dict of Series) on their timestamps.  Repeated
+    timestamps are matched in their order of occurrence, rather than
+    producing every combination of the repeated rows.'''
+    if not columns:
+        return pd.DataFrame()
+    if any(not y.index.is_unique for y in columns.values()):
+        keyed = {}
+        for key, y in columns.items():
+            occurrence = y.groupby(level=0).cumcount().to_numpy()
+            y = y.copy(deep=False)
+            y.index = pd.MultiIndex.from_arrays([y.index, occurrence])
+            keyed[key] = y
+        df = pd.concat(keyed, axis=1, sort=True)
+        return df.droplevel(1)
+    return pd.concat(columns, axis=1, sort=True)
+
+def compute_metrics(feds, metrics, bins=None, origin='start', rolling=None):
+    '''
+    Compute several metrics at once, sharing their intermediates.
+
+    Each FEDFrame is processed once, with a `MetricEvaluator`: the metrics
+    which others are computed from (e.g. the cumulative left and right
+    pokes, for both the left and right poke percentages) are computed once,
+    and metrics with the same timestamps share their bin ids.  The values
+    match calling each metric function separately.
+
+    Parameters
+    ----------
+    feds : fed3.FEDFrame or list of such
+        FED3 data to compute metrics for.
+    metrics : str or list-like
+        Metric key(s); see `fed3.metrics.list_metrics()`.
+    bins : pandas offset string or object, optional
+        Frequency for binning the metrics, passed to each metric.  The
+        default is None, in which case data are not binned.
+    origin : str or datetime object, optional
+        Origin of the bins, passed to each metric. The default is 'start'.
+    rolling : pandas offset string or object, optional
+        Trailing window (e.g. '30min') over which the metrics are computed at
+        each of their timestamps, instead of binning them; e.g. `'pellets'`
+        gives the number of pellets in the window (see `MetricEvaluator`).
+        The default is None.
+
+    Raises
+    ------
+    ValueError
+        A metric key is not recognized, metrics depend on each other in
+        a cycle, or both `bins` and `rolling` are given.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One column per metric, joined on their timestamps (so there are
+        missing values where metrics have different timestamps; repeated
+        timestamps are matched in order of occurrence).  When a
+        list of FEDFrames is given, the tables for each are stacked, with
+        the name of the FEDFrame as an additional `'fed'` level of the index.
+
+    '''
+    from fed3.core.fedframe import FEDFrame
+    from fed3.core.lazy import LazyFEDFrame
+
+    single = isinstance(feds, (FEDFrame, LazyFEDFrame))
+    if single:
+        feds = [feds]
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    keys = list(dict.fromkeys(m.lower() for m in metrics))
+    _metric_graph(keys, binned=bins is not None)
+
+    tables = []
+    for fed in feds:
+        evaluator = MetricEvaluator(fed, bins=bins, origin=origin, rolling=rolling)
+        columns = {key: evaluator.evaluate(key) for key in keys}
+        tables.append(_join_metrics(columns))
+
+    if single:
+        return tables[0]
+    names = [fed.name if fed.name is not None else i for i, fed in enumerate(feds)]
+    return pd.concat(tables, keys=names, names=['fed'])
+
 # link keywords to their default function
-Metric = namedtuple("Metric", ['func', 'nicename'])
-"""Lightweight class for metric functions and their representation names."""
-
-METRICS = {'binary_pellets'             : Metric(binary_pellets, "Pellets"),
-           'cumulative_pellets'         : Metric(cumulative_pellets, "Pellets"),
-           'pellets'                    : Metric(pellets, "Pellets"),
-           'binary_pokes'               : Metric(binary_pokes, "Pokes"),
-           'cumulative_pokes'           : Metric(cumulative_pokes, "Pokes"),
-           'pokes'                      : Metric(pokes, "Pokes"),
-           'binary_left_pokes'          : Metric(binary_left_pokes, "Left Pokes"),
-           'binary_right_pokes'         : Metric(binary_right_pokes, "Right Pokes"),
-           'cumulative_left_pokes'      : Metric(cumulative_left_pokes, "Left Pokes"),
-           'cumulative_right_pokes'     : Metric(cumulative_right_pokes, "Right Pokes"),
-           'cumulative_left_percent'    : Metric(cumulative_left_percent, "Left Pokes (%)"),
-           'cumulative_right_percent'   : Metric(cumulative_right_percent, "Right Pokes (%)"),
-           'left_pokes'                 : Metric(left_pokes, "Left Pokes"),
-           'right_pokes'                : Metric(right_pokes, "Right Pokes"),
-           'binary_correct_pokes'       : Metric(binary_correct_pokes, "Correct Pokes"),
-           'binary_error_pokes'         : Metric(binary_error_pokes, "Incorrect Pokes"),
-           'cumulative_correct_pokes'   : Metric(cumulative_correct_pokes, "Correct Pokes"),
-           'cumulative_error_pokes'     : Metric(cumulative_error_pokes, "Incorrect Pokes"),
-           'cumulative_correct_percent' : Metric(cumulative_correct_percent, "Correct Pokes (%)"),
-           'cumulative_error_percent'   : Metric(cumulative_error_percent, "Incorrect Pokes (%)"),
-           'correct_pokes'              : Metric(correct_pokes, "Correct Pokes"),
-           'error_pokes'                : Metric(error_pokes, "Incorrect Pokes"),
-           'battery'                    : Metric(battery, "Battery Life (V)"),
-           'ipi'                        : Metric(ipi, "Interpellet Intervals"),
-           'motor'                      : Metric(motor_turns, "Motor Turns"),
-           'rt'                         : Metric(retrival_time, "Retrieval Time (s)")}
+Metric = namedtuple("Metric", ['func', 'nicename', 'columns', 'signal', 'inputs',
+                               'agg', 'cumulative', 'binned', 'rolling'],
+                    defaults=(None, (), None, False, None, None))
+"""Lightweight class for metric functions, their representation names, the
+columns they use, and how they are computed (see `METRICS`)."""
+
+POKE_COLS = ('Pellet_Count', 'Left_Poke_Count', 'Right_Poke_Count')
+ACTIVE_COLS = POKE_COLS + ('Active_Poke',)
+
+METRICS = {'binary_pellets'             : Metric(binary_pellets, "Pellets", POKE_COLS,
+                                                 signal=_pellet_signal(cumulative=False), agg='sum',
+                                                 rolling='rolling_pellets'),
+           'cumulative_pellets'         : Metric(cumulative_pellets, "Pellets", POKE_COLS,
+                                                 signal=_pellet_signal(cumulative=True), agg='max',
+                                                 cumulative=True,
+                                                 rolling='rolling_pellets'),
+           'pellets'                    : Metric(pellets, "Pellets", POKE_COLS,
+                                                 signal=_same, inputs=('cumulative_pellets',), cumulative=True,
+                                                 binned='binary_pellets',
+                                                 rolling='rolling_pellets'),
+           'binary_pokes'               : Metric(binary_pokes, "Pokes", POKE_COLS,
+                                                 signal=_poke_signal('any', cumulative=False), agg='sum',
+                                                 rolling='rolling_pokes'),
+           'cumulative_pokes'           : Metric(cumulative_pokes, "Pokes", POKE_COLS,
+                                                 signal=_poke_signal('any', cumulative=True), agg='max',
+                                                 cumulative=True,
+                                                 rolling='rolling_pokes'),
+           'pokes'                      : Metric(pokes, "Pokes", POKE_COLS,
+                                                 signal=_same, inputs=('cumulative_pokes',), cumulative=True,
+                                                 binned='binary_pokes',
+                                                 rolling='rolling_pokes'),
+           'binary_left_pokes'          : Metric(binary_left_pokes, "Left Pokes", POKE_COLS,
+                                                 signal=_poke_signal('left', cumulative=False), agg='sum',
+                                                 rolling='rolling_left_pokes'),
+           'binary_right_pokes'         : Metric(binary_right_pokes, "Right Pokes", POKE_COLS,
+                                                 signal=_poke_signal('right', cumulative=False), agg='sum',
+                                                 rolling='rolling_right_pokes'),
+           'cumulative_left_pokes'      : Metric(cumulative_left_pokes, "Left Pokes", POKE_COLS,
+                                                 signal=_poke_signal('left', cumulative=True), agg='max',
+                                                 cumulative=True,
+                                                 rolling='rolling_left_pokes'),
+           'cumulative_right_pokes'     : Metric(cumulative_right_pokes, "Right Pokes", POKE_COLS,
+                                                 signal=_poke_signal('right', cumulative=True), agg='max',
+                                                 cumulative=True,
+                                                 rolling='rolling_right_pokes'),
+           'cumulative_left_percent'    : Metric(cumulative_left_percent, "Left Pokes (%)", POKE_COLS,
+                                                 signal=_poke_percentage, agg='last', cumulative=True,
+                                                 inputs=('cumulative_left_pokes', 'cumulative_right_pokes'),
+                                                 rolling='rolling_left_percent'),
+           'cumulative_right_percent'   : Metric(cumulative_right_percent, "Right Pokes (%)", POKE_COLS,
+                                                 signal=_poke_percentage, agg='last', cumulative=True,
+                                                 inputs=('cumulative_right_pokes', 'cumulative_left_pokes'),
+                                                 rolling='rolling_right_percent'),
+           'left_pokes'                 : Metric(left_pokes, "Left Pokes", POKE_COLS,
+                                                 signal=_same, inputs=('cumulative_left_pokes',), cumulative=True,
+                                                 binned='binary_left_pokes',
+                                                 rolling='rolling_left_pokes'),
+           'right_pokes'                : Metric(right_pokes, "Right Pokes", POKE_COLS,
+                                                 signal=_same, inputs=('cumulative_right_pokes',), cumulative=True,
+                                                 binned='binary_right_pokes',
+                                                 rolling='rolling_right_pokes'),
+           'binary_correct_pokes'       : Metric(binary_correct_pokes, "Correct Pokes", ACTIVE_COLS,
+                                                 signal=_poke_signal('correct', cumulative=False), agg='sum',
+                                                 rolling='rolling_correct_pokes'),
+           'binary_error_pokes'         : Metric(binary_error_pokes, "Incorrect Pokes", ACTIVE_COLS,
+                                                 signal=_poke_signal('error', cumulative=False), agg='sum',
+                                                 rolling='rolling_error_pokes'),
+           'cumulative_correct_pokes'   : Metric(cumulative_correct_pokes, "Correct Pokes", ACTIVE_COLS,
+                                                 signal=_poke_signal('correct', cumulative=True), agg='max',
+                                                 cumulative=True,
+                                                 rolling='rolling_correct_pokes'),
+           'cumulative_error_pokes'     : Metric(cumulative_error_pokes, "Incorrect Pokes", ACTIVE_COLS,
+                                                 signal=_poke_signal('error', cumulative=True), agg='max',
+                                                 cumulative=True,
+                                                 rolling='rolling_error_pokes'),
+           'cumulative_correct_percent' : Metric(cumulative_correct_percent, "Correct Pokes (%)", ACTIVE_COLS,
+                                                 signal=_poke_percentage, agg='last', cumulative=True,
+                                                 inputs=('cumulative_correct_pokes', 'cumulative_error_pokes'),
+                                                 rolling='rolling_correct_percent'),
+           'cumulative_error_percent'   : Metric(cumulative_error_percent, "Incorrect Pokes (%)", ACTIVE_COLS,
+                                                 signal=_poke_percentage, agg='last', cumulative=True,
+                                                 inputs=('cumulative_error_pokes', 'cumulative_correct_pokes'),
+                                                 rolling='rolling_error_percent'),
+           'correct_pokes'              : Metric(correct_pokes, "Correct Pokes", ACTIVE_COLS,
+                                                 signal=_same, inputs=('cumulative_correct_pokes',), cumulative=True,
+                                                 binned='binary_correct_pokes',
+                                                 rolling='rolling_correct_pokes'),
+           'error_pokes'                : Metric(error_pokes, "Incorrect Pokes", ACTIVE_COLS,
+                                                 signal=_same, inputs=('cumulative_error_pokes',), cumulative=True,
+                                                 binned='binary_error_pokes',
+                                                 rolling='rolling_error_pokes'),
+           'battery'                    : Metric(battery, "Battery Life (V)", ('Battery_Voltage',),
+                                                 signal=_battery_signal, agg='mean'),
+           'ipi'                        : Metric(ipi, "Interpellet Intervals", POKE_COLS + ('Concat_#',),
+                                                 signal=_ipi_signal, agg='mean'),
+           'motor'                      : Metric(motor_turns, "Motor Turns", POKE_COLS + ('Motor_Turns',),
+                                                 signal=_motor_turns_signal, agg='mean'),
+           'rt'                         : Metric(retrival_time, "Retrieval Time (s)", ('Retrieval_Time',),
+                                                 signal=_retrieval_time_signal, agg='mean'),
+           'rolling_pellets'            : Metric(rolling_pellets, "Pellets (Rolling)", POKE_COLS,
+                                                 signal=_rolling_signal('pellet'), agg='mean',
+                                                 rolling='rolling_pellets'),
+           'rolling_pokes'              : Metric(rolling_pokes, "Pokes (Rolling)", POKE_COLS,
+                                                 signal=_rolling_signal('any'), agg='mean',
+                                                 rolling='rolling_pokes'),
+           'rolling_left_pokes'         : Metric(rolling_left_pokes, "Left Pokes (Rolling)", POKE_COLS,
+                                                 signal=_rolling_signal('left'), agg='mean',
+                                                 rolling='rolling_left_pokes'),
+           'rolling_right_pokes'        : Metric(rolling_right_pokes, "Right Pokes (Rolling)", POKE_COLS,
+                                                 signal=_rolling_signal('right'), agg='mean',
+                                                 rolling='rolling_right_pokes'),
+           'rolling_left_percent'       : Metric(rolling_left_percent, "Left Pokes (Rolling %)", POKE_COLS,
+                                                 signal=_rolling_percentage, agg='mean',
+                                                 inputs=('rolling_left_pokes', 'rolling_right_pokes'),
+                                                 rolling='rolling_left_percent'),
+           'rolling_right_percent'      : Metric(rolling_right_percent, "Right Pokes (Rolling %)", POKE_COLS,
+                                                 signal=_rolling_percentage, agg='mean',
+                                                 inputs=('rolling_right_pokes', 'rolling_left_pokes'),
+                                                 rolling='rolling_right_percent'),
+           'rolling_correct_pokes'      : Metric(rolling_correct_pokes, "Correct Pokes (Rolling)", ACTIVE_COLS,
+                                                 signal=_rolling_signal('correct'), agg='mean',
+                                                 rolling='rolling_correct_pokes'),
+           'rolling_error_pokes'        : Metric(rolling_error_pokes, "Incorrect Pokes (Rolling)", ACTIVE_COLS,
+                                                 signal=_rolling_signal('error'), agg='mean',
+                                                 rolling='rolling_error_pokes'),
+           'rolling_correct_percent'    : Metric(rolling_correct_percent, "Correct Pokes (Rolling %)", ACTIVE_COLS,
+                                                 signal=_rolling_percentage, agg='mean',
+                                                 inputs=('rolling_correct_pokes', 'rolling_error_pokes'),
+                                                 rolling='rolling_correct_percent'),
+           'rolling_error_percent'      : Metric(rolling_error_percent, "Incorrect Pokes (Rolling %)", ACTIVE_COLS,
+                                                 signal=_rolling_percentage, agg='mean',
+                                                 inputs=('rolling_error_pokes', 'rolling_correct_pokes'),
+                                                 rolling='rolling_error_percent')}
 '''Dictionary for storing all metrics.  Keys of the dictionary are the
 fed3 key for referring to the metric.  The values are a `namedtuple` of
-type `Metric`.  The `Metric` objects have two attributes: `func` and `nicename`;
-`func` is the metric function defined in this module, and `nicename` is a
-readable name for the metric, used on axis labels.'''
+type `Metric`.  The `Metric` objects have three main attributes: `func`,
+`nicename`, and `columns`; `func` is the metric function defined in this
+module, `nicename` is a readable name for the metric, used on axis labels, and
+`columns` are the FED3 columns used to compute the metric.
+
+The other attributes declare how the metric is computed, which is used by
+`MetricEvaluator` (and `compute_metrics()`) to share work between metrics:
+
+- `signal`: function returning the unbinned values of the metric; it is
+called with a FEDFrame, or with the values of the `inputs` if there are any
+- `inputs`: keys of the metrics the `signal` is computed from
+- `agg`: aggregation of the values within each bin
+- `cumulative`: whether the metric is a running total
+- `binned`: key of the metric used instead when binned (e.g.
+`'binary_pellets'` for `'pellets'`)
+- `rolling`: key of the rolling metric used instead with a rolling window
+(e.g. `'rolling_pellets'` for `'pellets'`; see `MetricEvaluator`)
+
+Metrics can be added with `register_metric()`.'''
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module defines MetricState, which computes the built-in metrics of
+`fed3.metrics` incrementally, as new rows of FED3 data arrive (e.g. from
+`fed3.core.stream.FEDFollower.update()`).  Rather than recomputing metrics
+from the full data, the state keeps what is needed to continue them: the
+last row, running counts, the last pellet (for `'ipi'`), and the values of
+the bin which is still open.
+"""
+
+__all__ = ['MetricState']
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from fed3.core.fedframe import _interpellet_minutes
+from fed3.metrics.core import (_OPPOSITE_POKES, METRICS, _apply_alignment, _bin_edges,
+                               _bin_values, _filterout, _join_metrics, _poke_percentage,
+                               get_metric)
+
+# ---- "Private"
+
+def _state_signals():
+    '''Return the signal used by `MetricState` for each built-in metric,
+    mapped to its aggregation.'''
+    signals = {'binary_pellets': ('binary', 'pellet'),
+               'cumulative_pellets': ('cumulative', 'pellet'),
+               'binary_pokes': ('binary', 'any'),
+               'cumulative_pokes': ('cumulative', 'any'),
+               'battery': ('battery',),
+               'ipi': ('ipi',),
+               'motor': ('motor',),
+               'rt': ('rt',)}
+    for kind in _OPPOSITE_POKES:
+        signals[f'binary_{kind}_pokes'] = ('binary', kind)
+        signals[f'cumulative_{kind}_pokes'] = ('cumulative', kind)
+        signals[f'cumulative_{kind}_percent'] = ('percent', kind)
+    return signals
+
+_SIGNALS = _state_signals()
+
+def _is_na(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+class _Bins:
+    '''Incremental binning of one signal, for one aggregation.
+
+    Bins before the last one with values are closed: they are aggregated
+    once (with pandas, as with a full computation), and only their
+    results are kept.  When binned values are requested, the aggregate of
+    each bin is binned once more, which gives the same result as binning
+    all the values (for the 'sum', 'max', 'mean', and 'last' of a single
+    value per bin).  If values arrive out of time order, all the values
+    are binned instead.'''
+
+    def __init__(self, bins, origin, agg):
+        self.bins = bins
+        self.origin = origin
+        self.agg = agg
+        self.freq_ns = to_offset(bins).nanos
+        self.left = None
+        self.last_time = None
+        self.closed = []
+        self.open_ids = None
+        self.open_values = None
+        self.ordered = True
+
+    def add(self, vals):
+        if not self.ordered or not len(vals):
+            return
+        index = vals.index
+        if (not isinstance(index, pd.DatetimeIndex) or index.tz is not None
+            or index.hasnans or not index.is_monotonic_increasing):
+            self.ordered = False
+            return
+        times = index.asi8
+        if self.last_time is not None and times[0] < self.last_time:
+            self.ordered = False
+            return
+        if self.left is None:
+            edges = _bin_edges(times[0], times[0], self.freq_ns, self.origin)
+            if edges is None:
+                self.ordered = False
+                return
+            self.left = edges[0]
+        self.last_time = times[-1]
+
+        ids = (times - self.left) // self.freq_ns
+        values = vals.reset_index(drop=True)
+        if self.open_ids is not None:
+            ids = np.concatenate([self.open_ids, ids])
+            values = pd.concat([self.open_values, values], ignore_index=True)
+        closing = ids < ids[-1]
+        if closing.any():
+            done = values[closing].groupby(ids[closing]).agg(self.agg)
+            self.closed.append(done)
+        self.open_ids = ids[~closing]
+        self.open_values = values[~closing].reset_index(drop=True)
+
+    def result(self, signal):
+        '''Return the binned values of a `_Signal`.'''
+        if not self.ordered or self.open_ids is None:
+            return _bin_values(signal.values(), self.bins, self.origin, self.agg)
+        if len(self.closed) > 1:
+            self.closed = [pd.concat(self.closed)]
+        last = self.open_values.groupby(self.open_ids).agg(self.agg)
+        compact = pd.concat(self.closed + [last])
+        labels = (compact.index.to_numpy() * self.freq_ns + self.left).view('datetime64[ns]')
+        compact = pd.Series(compact.to_numpy(), name=signal.empty.name,
+                            index=pd.DatetimeIndex(labels, name=signal.empty.index.name))
+        return _bin_values(compact, self.bins, self.origin, self.agg)
+
+class _Signal:
+    '''The unbinned values of a signal, kept as the pieces computed for
+    each update, and their incremental bins.'''
+
+    def __init__(self):
+        self.pieces = []
+        self.bins = {}
+        self.full = None
+        self.empty = None
+
+    def add(self, piece):
+        if self.empty is None:
+            self.empty = piece.iloc[:0]
+        if len(piece):
+            self.pieces.append(piece)
+            self.full = None
+            for b in self.bins.values():
+                b.add(piece)
+
+    def values(self):
+        if self.full is None:
+            if not self.pieces:
+                return self.empty
+            self.full = self.pieces[0] if len(self.pieces) == 1 else pd.concat(self.pieces)
+            self.pieces = [self.full]
+        return self.full
+
+# ---- Public
+
+class MetricState:
+    '''Incremental computation of the built-in metrics of `fed3.metrics`,
+    for live monitoring of FED3 data.
+
+    New rows are added with `update()`; the values of the metrics are then
+    available with `state[key]`, or as a table with `to_frame()`.  They
+    match computing each metric from all the rows added so far (e.g. with
+    `fed3.metrics.compute_metrics()`), for rows in time order.
+
+    Each update only processes the new rows, with the last row seen
+    before them.  The state keeps the running counts of pellets and pokes,
+    the last pellet (for the interpellet intervals), and, when binned, the
+    values of the last (open) bin; earlier bins are only aggregated once.
+    The cumulative percentages are updated incrementally when the
+    timestamps of pokes are distinct; otherwise (e.g. for duplicated
+    timestamps), they are recomputed from the stored cumulative pokes.
+
+    Use `fed3.core.stream.FEDFollower.track()` to keep a state updated with
+    a file which is being written.'''
+
+    def __init__(self, metrics, bins=None, origin='start'):
+        '''
+        Create an empty state for some metrics.
+
+        Parameters
+        ----------
+        metrics : str or list-like
+            Key(s) of built-in metrics.
+        bins : pandas offset string or object, optional
+            Fixed frequency for binning the metrics (e.g. '1H'). The default
+            is None, in which case data are not binned.
+        origin : str or datetime object, optional
+            Origin of the bins. The default is 'start'.
+
+        Raises
+        ------
+        ValueError
+            A metric is not recognized or not supported, or `bins` is not
+            a fixed frequency (e.g. months).
+
+        Returns
+        -------
+        None.
+
+        '''
+        if isinstance(metrics, str):
+            metrics = [metrics]
+        self.metrics = list(dict.fromkeys(m.lower() for m in metrics))
+        self.bins = bins
+        self.origin = origin
+        if bins is not None:
+            try:
+                to_offset(bins).nanos
+            except ValueError:
+                raise ValueError(f'MetricState requires a fixed frequency for `bins`, '
+                                 f'not "{bins}".')
+
+        self._plan = {}
+        for key in self.metrics:
+            metric = get_metric(key)
+            used = key
+            if bins is not None and metric.binned is not None:
+                used = metric.binned
+            elif bins is None and metric.binned is not None:
+                used = metric.inputs[0]
+            if used not in _SIGNALS or METRICS[used].agg is None:
+                supported = ', '.join(f"'{m}'" for m in METRICS if m in _SIGNALS)
+                raise ValueError(f'Metric "{key}" is not supported by MetricState. '
+                                 f'Supported metrics are: {supported}, and their '
+                                 f'defaults (e.g. "pellets").')
+            self._plan[key] = (_SIGNALS[used], METRICS[used].agg)
+
+        self.reset()
+
+    def __getitem__(self, key):
+        key = key.lower()
+        if key not in self._plan:
+            raise KeyError(f'"{key}" is not tracked; metrics are {self.metrics}')
+        name, agg = self._plan[key]
+        signal = self._signals[name]
+        if self.bins is None:
+            return signal.values()
+        return signal.bins[agg].result(signal)
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(metrics={self.metrics}, bins={self.bins!r}, '
+                f'rows={self.rows})')
+
+    def _cumulative(self, ext, n_tail, kind):
+        '''New cumulative counts (condensed), continuing the running count.'''
+        if kind == 'pellet':
+            y = ext.pellets(cumulative=True)
+        else:
+            y = ext.pokes(kind=kind, cumulative=True)
+        if n_tail:
+            # continue from the count of the last row, e.g. for counts
+            # which are sums of binary events
+            last, first = self._counts[kind], y.iloc[0]
+            if not (last == first or (_is_na(last) and _is_na(first))):
+                y = y + (last - first)
+            y = y.iloc[n_tail:]
+        if len(y):
+            self._counts[kind] = y.iloc[-1]
+
+        # condense as `FEDFrame.pokes()`: drop zeros, and values seen before
+        y = y[y != 0]
+        seen = self._seen[kind]
+        keep = np.ones(len(y), dtype=bool)
+        for i, value in enumerate(y.tolist()):
+            value = 'nan' if _is_na(value) else value
+            if value in seen:
+                keep[i] = False
+            else:
+                seen.add(value)
+        return y[keep]
+
+    def _ipi(self, ext, n_tail):
+        '''New interpellet intervals, continuing from the last pellet.'''
+        positions = np.flatnonzero(ext.pellets(cumulative=False).to_numpy() == 1)
+        positions = positions[positions >= n_tail]
+        times = ext.decode_events().time
+        if times is None:
+            times = pd.DatetimeIndex(ext.index).values.astype('datetime64[ns]').view(np.int64)
+        times = times[positions]
+        segments = None
+        if 'Concat_#' in ext.columns:
+            segments = ext['Concat_#'].to_numpy()[positions]
+        if self._last_pellet is not None and len(positions):
+            last_time, last_segment = self._last_pellet
+            times = np.concatenate([[last_time], times])
+            if segments is not None:
+                segments = np.concatenate([np.array([last_segment], dtype=segments.dtype),
+                                           segments])
+            values = _interpellet_minutes(times, segments)[1:]
+            times = times[1:]
+        else:
+            values = _interpellet_minutes(times, segments)
+        if len(positions):
+            self._last_pellet = (times[-1], None if segments is None else segments[-1])
+        keep = ~np.isnan(values)
+        return pd.Series(values[keep], index=ext.index[positions[keep]])
+
+    def _percent(self, kind, pieces):
+        '''New cumulative percentages, from the new cumulative pokes of
+        the kind and its opposite.'''
+        other = _OPPOSITE_POKES[kind]
+        a, b = pieces[('cumulative', kind)], pieces[('cumulative', other)]
+        state = self._percents.get(kind)
+        if state is not None and state != 'recompute':
+            (a_last, b_last, union_last) = state
+            new = a.index.append(b.index)
+            distinct = (a.index.is_unique and b.index.is_unique
+                        and a.index.is_monotonic_increasing
+                        and b.index.is_monotonic_increasing
+                        and not (a.isna().any() or b.isna().any())
+                        and (not len(new) or union_last is None or new.min() > union_last))
+            if distinct:
+                if a_last is not None:
+                    a = pd.concat([a_last, a])
+                if b_last is not None:
+                    b = pd.concat([b_last, b])
+                pct = _poke_percentage(a, b)
+                if union_last is not None:
+                    pct = pct[pct.index > union_last]
+                if len(a):
+                    a_last = a.iloc[-1:]
+                if len(b):
+                    b_last = b.iloc[-1:]
+                if len(pct):
+                    union_last = pct.index[-1]
+                self._percents[kind] = (a_last, b_last, union_last)
+                return pct, False
+            self._percents[kind] = 'recompute'
+
+        # recompute from all the cumulative pokes (also for the first update)
+        a = self._signals[('cumulative', kind)].values()
+        b = self._signals[('cumulative', other)].values()
+        pct = _poke_percentage(a, b)
+        if state is None:
+            if (a.index.is_unique and b.index.is_unique and a.index.is_monotonic_increasing
+                and b.index.is_monotonic_increasing and not (a.isna().any() or b.isna().any())):
+                self._percents[kind] = (a.iloc[-1:] if len(a) else None,
+                                        b.iloc[-1:] if len(b) else None,
+                                        pct.index[-1] if len(pct) else None)
+            else:
+                self._percents[kind] = 'recompute'
+        return pct, True
+
+    def reset(self):
+        '''
+        Remove all the data added to the state.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.rows = 0
+        self._tail = None
+        self._counts = {}
+        self._seen = {}
+        self._last_pellet = None
+        self._percents = {}
+        self._signals = {}
+
+        names = {}
+        for name, agg in self._plan.values():
+            names.setdefault(name, set()).add(agg)
+            if name[0] == 'percent':
+                # percentages are computed from the cumulative pokes
+                names.setdefault(('cumulative', name[1]), set())
+                names.setdefault(('cumulative', _OPPOSITE_POKES[name[1]]), set())
+        for name, aggs in names.items():
+            signal = _Signal()
+            if self.bins is not None:
+                signal.bins = {agg: _Bins(self.bins, self.origin, agg) for agg in aggs}
+            self._signals[name] = signal
+            if name[0] == 'cumulative':
+                self._counts[name[1]] = None
+                self._seen[name[1]] = set()
+
+    def to_frame(self):
+        '''
+        Return the values of all the metrics, as with
+        `fed3.metrics.compute_metrics()`.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One column per metric, joined on their timestamps.
+
+        '''
+        return _join_metrics({key: self[key] for key in self.metrics})
+
+    def update(self, new_rows):
+        '''
+        Add new rows of data to the state.  Only the new rows (and the
+        last row added before them) are processed.
+
+        Parameters
+        ----------
+        new_rows : fed3.FEDFrame
+            The rows of FED3 data added since the last update, e.g. as
+            returned by `fed3.core.stream.FEDFollower.update()`.
+
+        Returns
+        -------
+        None.
+
+        '''
+        if not len(new_rows):
+            return
+        if self._tail is None:
+            ext, n_tail = new_rows, 0
+        else:
+            ext, n_tail = pd.concat([self._tail, new_rows]), 1
+
+        # order matters: percentages use the new cumulative pokes
+        names = sorted(self._signals, key=lambda name: name[0] == 'percent')
+        pieces = {}
+        for name in names:
+            signal = self._signals[name]
+            if name[0] == 'binary':
+                kind = name[1]
+                if kind == 'pellet':
+                    y = ext.pellets(cumulative=False)
+                else:
+                    y = ext.pokes(kind=kind, cumulative=False)
+                y = _filterout(y.iloc[n_tail:], dropzero=True)
+            elif name[0] == 'cumulative':
+                y = self._cumulative(ext, n_tail, name[1])
+            elif name[0] == 'percent':
+                y, rebuilt = self._percent(name[1], pieces)
+                if rebuilt:
+                    # the values so far are replaced
+                    aggs = list(signal.bins)
+                    signal = _Signal()
+                    if self.bins is not None:
+                        signal.bins = {agg: _Bins(self.bins, self.origin, agg) for agg in aggs}
+                    self._signals[name] = signal
+                    signal.add(y)
+                    continue
+            elif name[0] == 'battery':
+                y = ext['Battery_Voltage'].iloc[n_tail:]
+            elif name[0] == 'ipi':
+                y = self._ipi(ext, n_tail)
+            elif name[0] == 'motor':
+                ext._require('Motor_Turns')
+                mask = ext.pellets(cumulative=False).astype(bool).to_numpy()
+                mask[:n_tail] = False
+                y = ext.loc[mask, 'Motor_Turns']
+            elif name[0] == 'rt':
+                y = _filterout(ext['Retrieval_Time'].iloc[n_tail:], dropna=True)
+
+            if name[0] != 'percent':
+                y = _apply_alignment(new_rows, y)
+            pieces[name] = y
+            signal.add(y)
+
+        self.rows += len(new_rows)
+        self._tail = new_rows.iloc[-1:]
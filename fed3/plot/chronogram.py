@@ -15,6 +15,7 @@ import numpy as np
 import pandas as pd
 
 from fed3.core.fedfuncs import screen_mixed_alignment
+from fed3.core.lazy import LazyFEDFrame
 
 from fed3.lightcycle import LIGHTCYCLE, time_to_float
 
@@ -273,7 +274,7 @@ def _parse_feds_spiny_chronogram(feds, raise_name_clash=True):
 
     name_ddict = defaultdict(int)
 
-    if isinstance(feds, pd.DataFrame):
+    if isinstance(feds, (pd.DataFrame, LazyFEDFrame)):
         feds = [feds]
 
     if not isinstance(feds, dict):
@@ -281,7 +282,7 @@ def _parse_feds_spiny_chronogram(feds, raise_name_clash=True):
         feds = {'group' : feds}
     else:
         for k, v in feds.items():
-            if isinstance(v, pd.DataFrame):
+            if isinstance(v, (pd.DataFrame, LazyFEDFrame)):
                 feds[k] = [v]
             _assign_plot_names(feds=v, name_ddict=name_ddict)
 
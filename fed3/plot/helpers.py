@@ -12,10 +12,12 @@ from matplotlib import colors
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from fed3.core.lazy import LazyFEDFrame
+
 # ---- 'Private'
 
 def _assign_plot_names(feds, name_ddict):
-    if isinstance(feds, pd.DataFrame):
+    if isinstance(feds, (pd.DataFrame, LazyFEDFrame)):
         feds = [feds]
 
     for fed in feds:
@@ -62,7 +64,7 @@ def _parse_feds(feds):
 
     name_ddict = defaultdict(int)
 
-    if isinstance(feds, pd.DataFrame):
+    if isinstance(feds, (pd.DataFrame, LazyFEDFrame)):
         feds = [feds]
 
     if not isinstance(feds, dict):
@@ -71,7 +73,7 @@ def _parse_feds(feds):
 
     else:
         for k, v in feds.items():
-            if isinstance(v, pd.DataFrame):
+            if isinstance(v, (pd.DataFrame, LazyFEDFrame)):
                 feds[k] = [v]
             _assign_plot_names(feds=v, name_ddict=name_ddict)
 